@@ -0,0 +1,73 @@
+import argparse
+import random
+import time
+
+from services.aggregation import EXPENSE, INCOME, TransactionFrame
+
+CATEGORIES = ["Groceries", "Dining", "Shopping", "Bills", "Transportation", "Subscriptions", "Travel & Vacations", "Others"]
+
+
+def synthetic_transactions(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    transactions = []
+    for i in range(count):
+        income = rng.random() < 0.1
+        transactions.append({
+            "date": f"{2020 + i * 5 // count}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "merchant": f"MERCHANT {rng.randint(1, 500)}",
+            "amount": round(rng.uniform(1000, 4000) if income else rng.uniform(3, 250), 2),
+            "type": "income" if income else "expense",
+            "category": "Income" if income else rng.choice(CATEGORIES),
+            "description": "",
+        })
+    return transactions
+
+
+def loop_aggregates(transactions):
+    """The per-prompt dict loops the frame replaces: totals, expense categories, all categories, months."""
+    total_income = sum(float(t["amount"]) for t in transactions if t.get("type") == "income")
+    total_expense = sum(float(t["amount"]) for t in transactions if t.get("type") == "expense")
+    expense_categories, all_categories, monthly = {}, {}, {}
+    for t in transactions:
+        cat = t.get("category", "Other")
+        amount = float(t.get("amount", 0))
+        all_categories[cat] = all_categories.get(cat, 0) + amount
+        if t.get("type") == "expense":
+            expense_categories[cat] = expense_categories.get(cat, 0) + amount
+        month = monthly.setdefault(t.get("date", "")[:7], {"income": 0, "expense": 0, "categories": {}})
+        if t.get("type") == "income":
+            month["income"] += amount
+        else:
+            month["expense"] += amount
+            month["categories"][cat] = month["categories"].get(cat, 0) + amount
+    return total_income, total_expense, expense_categories, all_categories, monthly
+
+
+def frame_aggregates(transactions):
+    frame = TransactionFrame(transactions)
+    return frame.total(INCOME), frame.total(EXPENSE), frame.category_totals(EXPENSE), frame.category_totals(), frame.monthly()
+
+
+def best_of(func, *args, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dict-loop aggregation vs the columnar TransactionFrame.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    transactions = synthetic_transactions(args.rows)
+    loops = best_of(loop_aggregates, transactions)
+    build = best_of(TransactionFrame, transactions)
+    frame = TransactionFrame(transactions)
+    aggregate = best_of(lambda: (frame.total(INCOME), frame.total(EXPENSE), frame.category_totals(EXPENSE),
+                                 frame.category_totals(), frame.monthly()))
+    print(f"{args.rows} transactions")
+    print(f"dict loops:          {loops * 1000:.1f}ms")
+    print(f"frame (build + all): {(build + aggregate) * 1000:.1f}ms  (build {build * 1000:.1f}ms, aggregates {aggregate * 1000:.2f}ms)")
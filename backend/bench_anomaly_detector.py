@@ -0,0 +1,23 @@
+import argparse
+import time
+
+from bench_aggregation import synthetic_transactions
+from services.anomaly_detector import AnomalyDetector
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time of the statistical anomaly detector on a synthetic history.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    transactions = synthetic_transactions(args.rows)
+    # A few planted problems
+    transactions.append({**transactions[0], "amount": 4999.0, "id": "outlier"})
+    transactions.append({**transactions[1], "id": "duplicate"})
+
+    detector = AnomalyDetector()
+    start = time.perf_counter()
+    findings = detector.detect(transactions)
+    elapsed = time.perf_counter() - start
+    print(f"{len(transactions)} transactions: {len(findings)} findings in {elapsed * 1000:.1f}ms")
+    for finding in findings[:5]:
+        print(f"  [{finding['severity']}] {finding['description']}")
@@ -0,0 +1,55 @@
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+from services.bulk_insert import insert_returning
+
+
+def rows(count: int):
+    return [{"date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "merchant": f"MERCHANT {i % 500}", "amount": round(i * 0.37 % 250, 2),
+             "type": "expense", "category": "Shopping", "description": f"PURCHASE {i}"} for i in range(count)]
+
+
+def fresh_session():
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def per_row(db, data):
+    """The previous POST /transactions: one ORM object per row, then a refresh (SELECT) per row."""
+    objects = []
+    for r in data:
+        t = models.Transaction(**r)
+        db.add(t)
+        objects.append(t)
+    db.commit()
+    for t in objects:
+        db.refresh(t)
+    return objects
+
+
+def bulk(db, data):
+    created = insert_returning(db, models.Transaction, data)
+    db.commit()
+    return created
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="POST /transactions storage: per-row ORM inserts vs batched INSERT ... RETURNING.")
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    data = rows(args.rows)
+    for name, func in (("per-row add + refresh", per_row), ("batched INSERT ... RETURNING", bulk)):
+        db = fresh_session()
+        start = time.perf_counter()
+        func(db, data)
+        elapsed = time.perf_counter() - start
+        db.close()
+        print(f"{name:<30} {args.rows} rows in {elapsed * 1000:,.0f}ms")
@@ -0,0 +1,24 @@
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from bench_aggregation import synthetic_transactions
+from services.chunking import count_tokens
+from services.llm_service import _build_chat_chain
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat prompt size and build time as transaction history grows.")
+    parser.add_argument("--query", default="How much did I spend on Dining in June 2023?")
+    args = parser.parse_args()
+
+    for count in (500, 5_000, 50_000):
+        transactions = synthetic_transactions(count)
+        start = time.perf_counter()
+        chain, inputs = _build_chat_chain(args.query, transactions, [], [], "", os.environ["OPENAI_API_KEY"], None)
+        elapsed = time.perf_counter() - start
+        prompt = "\n".join(message.content for message in chain.first.format_messages(**inputs))
+        # The unbounded prompt listed every row
+        raw_rows = sum(len(f"- {t['date']}: {t['merchant']} ({t['category']}) - ${t['amount']}") + 1 for t in transactions) / 4
+        print(f"{count:>6} transactions: prompt ~{count_tokens(prompt):,} tokens (all rows would add ~{raw_rows:,.0f}), built in {elapsed * 1000:.1f}ms")
@@ -0,0 +1,71 @@
+"""
+Load test: GET /transactions latency while /analyze requests are in flight.
+
+    python bench_openai_stub.py &                      # fake LLM, 0.5s per call
+    OPENAI_API_KEY=sk-test OPENAI_BASE_URL=http://127.0.0.1:8001/v1 \
+        python -m uvicorn main:app --port 8000 &
+    python bench_event_loop.py --concurrency 20
+
+If /analyze blocked the event loop, p99 for /transactions would jump to the
+LLM latency while the analyze requests run.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def probe_transactions(client: httpx.AsyncClient, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/transactions")
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+def report(label: str, samples: list):
+    print(f"{label:>22} | n={len(samples):4d} | p50 {statistics.median(samples):7.1f}ms | "
+          f"p99 {percentile(samples, 99):7.1f}ms | max {max(samples):7.1f}ms")
+
+
+async def main(base_url: str, concurrency: int, lines: int):
+    # Date after the amount: no parser layout matches, so every line goes to the LLM
+    statement = [f"MERCHANT {i} {10 + i % 90}.00 ON 2024-01-{(i % 28) + 1:02d}" for i in range(lines)]
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        idle = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_transactions(client, stop, idle))
+        await asyncio.sleep(3)
+        stop.set()
+        await probe
+        report("idle", idle)
+
+        loaded = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_transactions(client, stop, loaded))
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/analyze", json={"text": statement}) for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe
+        report(f"{concurrency} x /analyze", loaded)
+        ok = sum(1 for r in responses if r.status_code == 200)
+        print(f"/analyze: {ok}/{concurrency} succeeded in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=600, help="Statement lines per /analyze request")
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.concurrency, args.lines))
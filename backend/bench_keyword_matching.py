@@ -0,0 +1,57 @@
+import random
+import re
+import sys
+import time
+
+from services.classification_service import KEYWORD_MAP
+from services.keyword_matcher import KeywordMatcher
+
+MERCHANTS = [
+    "Uber * Trip", "Walmart Store #1234", "Netflix Subscription", "Salary Deposit ACME Corp",
+    "Starbucks Coffee 0045", "CVS Pharmacy", "Coursera Inc", "Whole Foods Market",
+    "POS DEBIT SHELL OIL 5732", "AMZN Mktp US*2K4", "PG&E WEB ONLINE", "Trader Joes #552",
+    "ACH TRANSFER REF 99812", "ZELLE TO JOHN SMITH", "CHECK 1043", "Local Hardware Co",
+]
+
+
+def make_descriptions(n: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [f"{rng.choice(MERCHANTS)} {rng.randint(1000, 99999)}" for _ in range(n)]
+
+
+def legacy_match(text_upper: str):
+    # The per-keyword loop classify_batch used before the compiled matcher.
+    for category, keywords in KEYWORD_MAP.items():
+        for keyword in keywords:
+            if len(keyword) <= 3:
+                pattern = r'\b' + re.escape(keyword) + r'\b'
+                if re.search(pattern, text_upper):
+                    return category
+            elif keyword in text_upper:
+                return category
+    return None
+
+
+def run(n: int, matcher: KeywordMatcher):
+    texts = [t.upper() for t in make_descriptions(n)]
+
+    start = time.perf_counter()
+    legacy = [legacy_match(t) for t in texts]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = matcher.match_batch(texts)
+    compiled_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(legacy, compiled) if a != b)
+    print(f"{n:>7} descriptions | legacy {legacy_time:.3f}s | compiled {compiled_time:.3f}s | "
+          f"speedup {legacy_time / compiled_time:.1f}x | mismatches {mismatches}")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000]
+    start = time.perf_counter()
+    matcher = KeywordMatcher.from_keyword_map(KEYWORD_MAP)
+    print(f"Compiled {sum(len(v) for v in KEYWORD_MAP.values())} keywords in {(time.perf_counter() - start) * 1000:.1f}ms")
+    for n in sizes:
+        run(n, matcher)
@@ -0,0 +1,84 @@
+"""
+Per-call overhead of building a fresh LLM client vs. the pooled get_llm registry.
+
+    STUB_LATENCY=0 python bench_openai_stub.py &
+    python bench_llm_clients.py --calls 200
+
+Both modes send the same structured-output request to the stub, so the
+difference is client construction plus connection setup.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+
+from services.llm_service import LLM_MODEL, CategoryList, get_llm
+
+PROMPT = ChatPromptTemplate.from_messages([("user", "Classify these:\n- BLUE BOTTLE COFFEE")])
+
+
+def fresh_llm(api_key, base_url):
+    # What get_llm did before: a new client, SDK client and connection pool per call
+    return ChatOpenAI(api_key=api_key, base_url=base_url, model=LLM_MODEL, temperature=0)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label, samples):
+    print(f"{label:>34} | mean {statistics.mean(samples):6.2f}ms | p50 {statistics.median(samples):6.2f}ms | "
+          f"p99 {percentile(samples, 99):6.2f}ms")
+
+
+def run_sync(factory, calls, api_key, base_url):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        (PROMPT | factory(api_key, base_url).with_structured_output(CategoryList)).invoke({})
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def run_async(factory, calls, concurrency, api_key, base_url):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await (PROMPT | factory(api_key, base_url).with_structured_output(CategoryList)).ainvoke({})
+            return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    samples = await asyncio.gather(*[one() for _ in range(calls)])
+    return samples, calls / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001/v1")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    api_key = "sk-bench"
+
+    for label, factory in (("fresh client per call", fresh_llm), ("pooled get_llm", get_llm)):
+        samples = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            factory(api_key, args.base_url).with_structured_output(CategoryList)
+            samples.append((time.perf_counter() - start) * 1000)
+        report(f"{label} (build only)", samples)
+
+    for label, factory in (("fresh client per call", fresh_llm), ("pooled get_llm", get_llm)):
+        run_sync(factory, 5, api_key, args.base_url)  # Warm-up
+        report(f"{label} (sync)", run_sync(factory, args.calls, api_key, args.base_url))
+
+    for label, factory in (("fresh client per call", fresh_llm), ("pooled get_llm", get_llm)):
+        samples, throughput = asyncio.run(run_async(factory, args.calls, args.concurrency, api_key, args.base_url))
+        report(f"{label} (async)", samples)
+        print(f"{'':>34} | {throughput:6.1f} calls/s at concurrency {args.concurrency}")
@@ -0,0 +1,95 @@
+"""
+Minimal OpenAI-compatible server for load tests and benchmarks.
+
+Answers /v1/chat/completions after STUB_LATENCY seconds with the smallest
+JSON that satisfies the requested structured-output schema, and
+/v1/embeddings with deterministic vectors. Point the backend at it with
+OPENAI_BASE_URL=http://127.0.0.1:8001/v1 and any OPENAI_API_KEY.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", "0.5"))
+EMBEDDING_DIM = int(os.getenv("STUB_EMBEDDING_DIM", "64"))
+
+app = FastAPI()
+
+
+def minimal_instance(schema: dict, defs: dict):
+    if "$ref" in schema:
+        return minimal_instance(defs[schema["$ref"].split("/")[-1]], defs)
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [o for o in schema[key] if o.get("type") != "null"]
+            return minimal_instance(options[0], defs) if options else None
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: minimal_instance(prop, defs) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return []
+    if kind in ("number", "integer"):
+        return 0
+    if kind == "boolean":
+        return False
+    if kind == "null":
+        return None
+    return ""
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await asyncio.sleep(STUB_LATENCY)
+
+    message = {"role": "assistant", "content": "ok"}
+    finish_reason = "stop"
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        schema = response_format["json_schema"]["schema"]
+        message["content"] = json.dumps(minimal_instance(schema, schema.get("$defs", {})))
+    elif body.get("tools"):
+        function = body["tools"][0]["function"]
+        schema = function.get("parameters", {})
+        message = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": "call_stub",
+                "type": "function",
+                "function": {"name": function["name"], "arguments": json.dumps(minimal_instance(schema, schema.get("$defs", {})))},
+            }],
+        }
+        finish_reason = "tool_calls"
+
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body.get("input") or []
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    data = []
+    for i, text in enumerate(inputs):
+        digest = hashlib.sha256(str(text).encode()).digest()
+        vector = [digest[j % len(digest)] / 255.0 for j in range(EMBEDDING_DIM)]
+        data.append({"object": "embedding", "index": i, "embedding": vector})
+    return {"object": "list", "data": data, "model": body.get("model", "stub"), "usage": {"prompt_tokens": 0, "total_tokens": 0}}
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("STUB_PORT", "8001")), log_level="warning")
@@ -0,0 +1,29 @@
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency of /savings-scenario/sweep for a slider-sized grid.")
+    parser.add_argument("--goals", type=int, default=8)
+    parser.add_argument("--values", type=int, default=101, help="extra_savings values (0, 10, 20, ...)")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    goals = [{"name": f"Goal {i}", "targetAmount": 1000 * (i + 1), "currentAmount": 100 * i,
+              "deadline": f"{2027 + i % 4}-0{i % 9 + 1}-15"} for i in range(args.goals)]
+    payload = {"goals": goals, "start": 0, "stop": 10 * (args.values - 1), "step": 10, "strategies": ["even", "nearest_deadline"]}
+
+    client = TestClient(main.app)
+    client.post("/savings-scenario/sweep", json=payload)
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        response = client.post("/savings-scenario/sweep", json=payload)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    points = len(response.json()["points"])
+    print(f"{points} scenarios x {args.goals} goals: median {timings[len(timings) // 2] * 1000:.1f}ms, "
+          f"p95 {timings[int(len(timings) * 0.95)] * 1000:.1f}ms per request (in-process client)")
@@ -0,0 +1,52 @@
+import argparse
+import random
+import time
+
+from services.statement_parser import parse_statement
+
+MERCHANTS = ["WHOLE FOODS MARKET #123", "SHELL OIL 5742", "NETFLIX.COM", "UBER *TRIP", "STARBUCKS STORE 0411",
+             "AMAZON MKTP US*2K4", "CITY OF AUSTIN UTIL", "TRADER JOE'S #552", "DELTA AIR 0062", "CVS/PHARMACY #0099"]
+
+
+def synthetic_statement(rows: int, wrapped_ratio: float, seed: int = 7):
+    """A checking statement in withdrawal/deposit/balance columns, with some wrapped rows the parser can't read."""
+    rng = random.Random(seed)
+    balance = 5000.0
+    lines = ["FIRST NATIONAL BANK", "Date        Description        Withdrawals   Deposits     Balance",
+             f"01/01/2024  Opening Balance                                  {balance:,.2f}"]
+    for i in range(rows):
+        date = f"{(i // 28) % 12 + 1:02d}/{i % 28 + 1:02d}/2024"
+        merchant = rng.choice(MERCHANTS)
+        amount = round(rng.uniform(3, 250), 2)
+        if rng.random() < 0.1:
+            balance += amount
+            lines.append(f"{date}  ACME PAYROLL       -             {amount:,.2f}     {balance:,.2f}")
+        elif rng.random() < wrapped_ratio:
+            balance -= amount
+            lines.append(f"{date}  {merchant}")
+            lines.append(f"            REF {rng.randint(1000, 9999)} {amount:,.2f}")
+        else:
+            balance -= amount
+            lines.append(f"{date}  {merchant}    {amount:,.2f}      -         {balance:,.2f}")
+    lines.append(f"Closing Balance {balance:,.2f}")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="How much of a statement the deterministic parser keeps away from the LLM.")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--wrapped", type=float, default=0.05, help="Share of rows wrapped over two lines")
+    args = parser.parse_args()
+
+    lines = synthetic_statement(args.rows, args.wrapped)
+    start = time.perf_counter()
+    parsed = parse_statement(lines)
+    elapsed = time.perf_counter() - start
+
+    # ~4 characters per token for the statement text sent to the LLM
+    before = sum(len(line) + 1 for line in lines) / 4
+    after = sum(len(line) + 1 for line in parsed.unparsed_lines) / 4
+    print(f"{len(lines)} lines parsed in {elapsed * 1000:.1f}ms ({len(lines) / elapsed:,.0f} lines/s)")
+    print(f"parsed transactions: {len(parsed.transactions)} | layouts: {parsed.layout_counts}")
+    print(f"lines sent to the LLM: {len(parsed.unparsed_lines)} / {len(lines)}")
+    print(f"LLM input tokens (est.): {before:,.0f} -> {after:,.0f} ({before / max(after, 1):.1f}x fewer)")
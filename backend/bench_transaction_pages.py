@@ -0,0 +1,53 @@
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+from bench_bulk_insert import rows
+from services.bulk_insert import insert_count
+from services.transaction_query import page_transactions
+
+
+def offset_page(db, skip: int, limit: int):
+    """The previous GET /transactions, given the same stable (date, id) order."""
+    t = models.Transaction
+    return db.query(t).order_by(t.date.desc(), t.id.desc()).offset(skip).limit(limit).all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GET /transactions: OFFSET pages vs keyset pages at increasing depth.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    insert_count(db, models.Transaction, rows(args.rows))
+    db.commit()
+
+    # Walk the keyset pages once, keeping the cursors of the depths measured below
+    depths = [d for d in (0, args.rows // 10, args.rows // 2, args.rows - args.limit) if d % args.limit == 0]
+    cursors, cursor, depth = {0: None}, None, 0
+    while depth < max(depths):
+        _, cursor = page_transactions(db, args.limit, cursor)
+        depth += args.limit
+        cursors[depth] = cursor
+
+    print(f"{args.rows} rows, {args.limit} per page")
+    for depth in depths:
+        start = time.perf_counter()
+        offset_page(db, depth, args.limit)
+        offset_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        page_transactions(db, args.limit, cursors[depth])
+        keyset_ms = (time.perf_counter() - start) * 1000
+        print(f"page at row {depth:>7}: OFFSET {offset_ms:7.1f}ms   keyset {keyset_ms:7.1f}ms")
+
+    start = time.perf_counter()
+    page_transactions(db, args.limit, category="Shopping", merchant="merchant 4", min_amount=100)
+    print(f"filtered first page (category + merchant prefix + amount): {(time.perf_counter() - start) * 1000:.1f}ms")
@@ -0,0 +1,76 @@
+import argparse
+import csv
+import time
+
+from services.classification_service import KEYWORD_MAP
+from services.zero_shot import ENGINES
+
+# Small built-in labeled sample: descriptions the keyword stage doesn't catch.
+SAMPLE = [
+    ("Blue Bottle Coffee Oakland", "Dining"),
+    ("Chipotle Online Order", "Dining"),
+    ("Sweetgreen 1123", "Dining"),
+    ("Trader Vic's Bar", "Dining"),
+    ("Home Depot #0621", "Shopping"),
+    ("Nordstrom Rack", "Shopping"),
+    ("Etsy.com Purchase", "Shopping"),
+    ("Comcast Xfinity", "Bills"),
+    ("Verizon Wireless", "Bills"),
+    ("City of Austin Utilities", "Bills"),
+    ("Lime Scooter Ride", "Transportation"),
+    ("Clipper Card Reload", "Transportation"),
+    ("Marriott Bonvoy Stay", "Travel & Vacations"),
+    ("Alaska Air 0272", "Travel & Vacations"),
+    ("YouTube Premium", "Subscriptions"),
+    ("Audible Monthly", "Subscriptions"),
+    ("ACME Corp Direct Dep", "Income"),
+    ("Venmo Cashout", "Income"),
+    ("Chase Autopay Thank You", "Credit Card Payments"),
+    ("Discover E-Payment", "Credit Card Payments"),
+    ("H Mart Flushing", "Groceries"),
+    ("Instacart", "Groceries"),
+    ("Walgreen Co. Rx", "Others"),
+    ("Planet Fitness Club Fees", "Others"),
+]
+
+
+def load_labeled(path: str):
+    with open(path, newline="") as f:
+        return [(row["description"], row["category"]) for row in csv.DictReader(f)]
+
+
+def run(engine_name: str, labeled, repeat: int):
+    categories = list(dict.fromkeys(list(KEYWORD_MAP.keys()) + ["Income", "Miscellaneous"]))
+    engine = ENGINES[engine_name](categories)
+
+    start = time.perf_counter()
+    engine.load()
+    load_time = time.perf_counter() - start
+
+    texts = [d for d, _ in labeled] * repeat
+    engine.predict(texts[:8])  # Warm-up
+
+    start = time.perf_counter()
+    predicted = engine.predict(texts)
+    elapsed = time.perf_counter() - start
+
+    correct = sum(1 for p, (_, label) in zip(predicted, labeled * repeat) if p == label)
+    # Cross-encoders score one (text, hypothesis) pair per category; the bi-encoder encodes each text once
+    pairs = len(texts) * (len(categories) if engine_name != "bi-encoder" else 1)
+    print(f"{engine_name:>14} | load {load_time:5.1f}s | {len(texts) / elapsed:8.1f} texts/s | "
+          f"{pairs / elapsed:9.1f} pairs/s | accuracy {correct / len(texts):.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare zero-shot engines on a labeled set.")
+    parser.add_argument("--labeled", help="CSV with 'description' and 'category' columns (default: built-in sample)")
+    parser.add_argument("--repeat", type=int, default=10, help="Repeat the set to get stable throughput numbers")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    args = parser.parse_args()
+
+    labeled = load_labeled(args.labeled) if args.labeled else SAMPLE
+    for name in args.engines:
+        try:
+            run(name, labeled, args.repeat)
+        except ImportError as e:
+            print(f"{name:>14} | skipped ({e})")
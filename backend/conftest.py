@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """Engine of an empty SQLite file database with the current schema."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_sessions(db_engine):
+    """Session factory bound to `db_engine`."""
+    return sessionmaker(bind=db_engine)
+
+
+@pytest.fixture
+def api_client(db_sessions):
+    """TestClient whose endpoints get their sessions (main.get_db) from `db_sessions`."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    def get_db():
+        db = db_sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[main.get_db] = get_db
+    try:
+        yield TestClient(main.app)
+    finally:
+        main.app.dependency_overrides.pop(main.get_db, None)
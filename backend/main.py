@@ -1,32 +1,64 @@
 import uvicorn
 import shutil
 import os
+import json
+import math
+import csv
+import codecs
+import collections
+import hashlib
+import uuid
+import datetime
+from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Literal, Optional
 
 import models
 from database import SessionLocal, engine
 from services.llm_service import (
-    extract_transactions_from_text,
-    chat_with_data,
-    generate_financial_insight,
-    generate_budget_suggestion,
-    detect_anomalies,
-    generate_savings_scenario,
-    ingest_documents
+    aextract_transactions_from_text,
+    astream_transactions_from_text,
+    achat_with_data,
+    agenerate_financial_insight,
+    agenerate_budget_suggestion,
+    adetect_anomalies,
+    agenerate_savings_scenario,
+    savings_sweep
 )
+from services.bulk_insert import (
+    INSERT_BATCH_SIZE, IdempotencyMismatch, commit_with_response, insert_count, insert_returning, key_is_used,
+    request_hash, stored_response,
+)
+from services.concurrency import run_blocking
+from services.datasets import load_transactions
+from services.ingestion import ANALYZE_DEFER_INGEST, ingestion_jobs
+from services.migrations import migrate, with_typed_columns
+from services.transaction_query import page_transactions
+from services.transaction_summary import summarize
 
 # Load environment variables
 load_dotenv()
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables, and bring databases from earlier versions up to the models
+    await run_blocking(migrate, engine)
+    # Warm the CrossEncoder in the background so the API accepts requests immediately
+    if os.getenv("CLASSIFIER_WARMUP", "1") != "0":
+        from services.classification_service import classifier
+        classifier.warm_up()
+    # Open the persistent vector store in the background as well
+    if os.getenv("OPENAI_API_KEY") or os.getenv("EMBEDDINGS_BACKEND") == "local":
+        from services.vector_store import statement_store
+        statement_store.warm_up(os.getenv("OPENAI_API_KEY"))
+    yield
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +66,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Dependency
@@ -49,26 +82,52 @@ def get_db():
 class AnalyzeRequest(BaseModel):
     text: List[str]
 
+class DatasetRef(BaseModel):
+    """Stored transactions to analyze: all of them, or a date range and/or categories."""
+    date_from: Optional[datetime.date] = None  # YYYY-MM-DD, inclusive
+    date_to: Optional[datetime.date] = None  # YYYY-MM-DD, inclusive
+    categories: Optional[List[str]] = None
+
+# Analysis requests take either the transactions themselves or, when `transactions`
+# is omitted, a `dataset` reference (default: everything stored) that the server loads.
+
 class ChatRequest(BaseModel):
     query: str
-    transactions: List[dict]
+    transactions: Optional[List[dict]] = None
+    dataset: Optional[DatasetRef] = None
     budgets: List[dict] = []
     goals: List[dict] = []
+    upload_id: Optional[str] = None  # Limit document context to one uploaded statement
 
 class InsightRequest(BaseModel):
-    transactions: List[dict]
+    transactions: Optional[List[dict]] = None
+    dataset: Optional[DatasetRef] = None
     goals: List[dict]
 
 class BudgetRequest(BaseModel):
-    transactions: List[dict]
+    transactions: Optional[List[dict]] = None
+    dataset: Optional[DatasetRef] = None
 
 class AnomalyRequest(BaseModel):
-    transactions: List[dict]
+    transactions: Optional[List[dict]] = None
+    dataset: Optional[DatasetRef] = None
+    narrate: bool = False  # Have the LLM reword the top findings
 
 class WhatIfRequest(BaseModel):
-    transactions: List[dict]
+    transactions: Optional[List[dict]] = None
+    dataset: Optional[DatasetRef] = None
     goals: List[dict]
     extra_savings: float
+    strategy: str = Field("even", pattern="^(even|nearest_deadline)$")  # How the extra is split across goals
+    narrate: bool = False  # Have the LLM write the trade-off suggestion
+
+class SweepRequest(BaseModel):
+    goals: List[dict]
+    extra_savings: Optional[List[float]] = None  # Explicit amounts; otherwise start..stop (inclusive) by step
+    start: float = 0
+    stop: float = 500
+    step: float = Field(50, gt=0)
+    strategies: List[Literal["even", "nearest_deadline"]] = ["even"]
 
 class TransactionCreate(BaseModel):
     date: str
@@ -91,8 +150,43 @@ class GoalCreate(BaseModel):
 def read_root():
     return {"message": "Finance AI Backend is running"}
 
+async def _request_transactions(request) -> List[dict]:
+    """The request's own transactions, or the stored rows its dataset reference selects."""
+    if request.transactions is not None:
+        return request.transactions
+    dataset = request.dataset or DatasetRef()
+    return await run_blocking(load_transactions, dataset.date_from, dataset.date_to, dataset.categories)
+
+def _model_health() -> dict:
+    from services.classification_service import classifier
+    return {
+        "status": classifier.model_status,
+        "ready": classifier.is_model_ready,
+        "error": classifier.model_error,
+    }
+
+@app.get("/health")
+def health():
+    """Liveness. Always 200 while the process serves requests; reports model warm-up state."""
+    return {"status": "ok", "model": _model_health()}
+
+@app.get("/health/ready")
+def health_ready():
+    """Readiness for zero-shot traffic: 503 until the CrossEncoder is warm."""
+    model = _model_health()
+    if not model["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming", "model": model})
+    return {"status": "ready", "model": model}
+
 @app.post("/analyze")
-async def analyze_statement(request: AnalyzeRequest):
+async def analyze_statement(request: AnalyzeRequest, defer_ingest: Optional[bool] = None):
+    """
+    Extracts the statement's transactions while it is ingested for chat retrieval.
+    By default (ANALYZE_DEFER_INGEST) the response doesn't wait for embedding: its
+    "ingestion" field holds the status so far (running, done or failed) and
+    GET /analyze/{upload_id}/ingestion reports the rest. With defer_ingest=false
+    it waits and reports the outcome; a failed embedding never fails the upload.
+    """
     try:
         # Get API key from env
         api_key = os.getenv("OPENAI_API_KEY")
@@ -103,17 +197,70 @@ async def analyze_statement(request: AnalyzeRequest):
 
         text_lines = request.text
 
-        # 1. Ingest for RAG
-        ingest_documents(text_lines, api_key)
-        
-        # 2. Extract Structured Data
-        result = extract_transactions_from_text(text_lines, api_key, base_url)
-        
+        upload_id = uuid.uuid4().hex
+
+        # 1. Ingest for RAG in the background (embedding + Chroma indexing run on the blocking pool)
+        ingestion_jobs.start(text_lines, api_key, upload_id)
+
+        # 2. Extract Structured Data meanwhile
+        result = await aextract_transactions_from_text(text_lines, api_key, base_url)
+        result["upload_id"] = upload_id
+
+        if defer_ingest if defer_ingest is not None else ANALYZE_DEFER_INGEST:
+            result["ingestion"] = ingestion_jobs.status(upload_id)
+        else:
+            result["ingestion"] = await ingestion_jobs.wait(upload_id)
+
         return result
     except Exception as e:
         print(f"Error in analyze_statement: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/analyze/{upload_id}/ingestion")
+def analyze_ingestion_status(upload_id: str):
+    """Status of an upload's RAG ingestion: running, done (with chunk counts) or failed (with the error)."""
+    status = ingestion_jobs.status(upload_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown upload_id")
+    return status
+
+def _format_event(event: dict, fmt: str) -> str:
+    if fmt == "sse":
+        return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+@app.post("/analyze/stream")
+async def analyze_statement_stream(request: AnalyzeRequest, format: str = Query("ndjson", pattern="^(ndjson|sse)$")):
+    """
+    Same extraction as /analyze, but streams each chunk's classified
+    transactions as soon as it finishes ("transactions" events), then a "summary"
+    event with the closing balance. format=ndjson (one JSON object per line) or sse.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    base_url = os.getenv("OPENAI_BASE_URL")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="Server misconfiguration: OPENAI_API_KEY not set.")
+
+    text_lines = request.text
+    upload_id = uuid.uuid4().hex
+
+    async def events():
+        # Ingest for RAG alongside extraction so it doesn't delay the first transactions
+        ingestion = ingestion_jobs.start(text_lines, api_key, upload_id)
+        try:
+            async for event in astream_transactions_from_text(text_lines, api_key, base_url):
+                if event["event"] == "summary":
+                    event["upload_id"] = upload_id
+                    # Like /analyze, the summary doesn't wait for embedding unless ANALYZE_DEFER_INGEST=0
+                    event["ingestion"] = ingestion_jobs.status(upload_id) if ANALYZE_DEFER_INGEST else await ingestion
+                yield _format_event(event, format)
+        except Exception as e:
+            print(f"Error in analyze_statement_stream: {e}")
+            yield _format_event({"event": "error", "detail": str(e)}, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
     try:
@@ -122,7 +269,7 @@ async def chat(request: ChatRequest):
         if not api_key:
              raise HTTPException(status_code=500, detail="Server misconfiguration: OPENAI_API_KEY not set.")
 
-        response = chat_with_data(request.query, request.transactions, request.budgets, request.goals, api_key, base_url)
+        response = await achat_with_data(request.query, await _request_transactions(request), request.budgets, request.goals, api_key, base_url, request.upload_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -135,7 +282,7 @@ async def get_insight(request: InsightRequest):
         if not api_key:
              raise HTTPException(status_code=500, detail="Server misconfiguration: OPENAI_API_KEY not set.")
 
-        insight = generate_financial_insight(request.transactions, request.goals, api_key, base_url)
+        insight = await agenerate_financial_insight(await _request_transactions(request), request.goals, api_key, base_url)
         return insight
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -148,7 +295,7 @@ async def get_budget_suggestion(request: BudgetRequest):
         if not api_key:
              raise HTTPException(status_code=500, detail="Server misconfiguration: OPENAI_API_KEY not set.")
 
-        suggestions = generate_budget_suggestion(request.transactions, api_key, base_url)
+        suggestions = await agenerate_budget_suggestion(await _request_transactions(request), api_key, base_url)
         return {"suggestions": suggestions}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -158,10 +305,11 @@ async def get_anomalies(request: AnomalyRequest):
     try:
         api_key = os.getenv("OPENAI_API_KEY")
         base_url = os.getenv("OPENAI_BASE_URL")
-        if not api_key:
+        # Detection itself is local; only narration needs the LLM
+        if request.narrate and not api_key:
              raise HTTPException(status_code=500, detail="Server misconfiguration: OPENAI_API_KEY not set.")
 
-        anomalies = detect_anomalies(request.transactions, api_key, base_url)
+        anomalies = await adetect_anomalies(await _request_transactions(request), api_key, base_url, request.narrate)
         return {"anomalies": anomalies}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -171,43 +319,245 @@ async def what_if_analysis(request: WhatIfRequest):
     try:
         api_key = os.getenv("OPENAI_API_KEY")
         base_url = os.getenv("OPENAI_BASE_URL")
-        if not api_key:
+        # The projection is computed locally; only narration needs the LLM
+        if request.narrate and not api_key:
              raise HTTPException(status_code=500, detail="Server misconfiguration: OPENAI_API_KEY not set.")
 
-        scenario = generate_savings_scenario(request.transactions, request.goals, request.extra_savings, api_key, base_url)
+        scenario = await agenerate_savings_scenario(await _request_transactions(request), request.goals, request.extra_savings, api_key, base_url, request.strategy, request.narrate)
         return scenario
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+SWEEP_MAX_POINTS = 5000
+
+@app.post("/savings-scenario/sweep")
+def savings_scenario_sweep(request: SweepRequest):
+    """
+    Goal completion dates for a whole grid of extra monthly savings × allocation
+    strategies in one call (e.g. to draw the savings slider's sensitivity curve).
+    Computed locally, without transactions or LLM calls.
+    """
+    if request.extra_savings is not None:
+        count = len(request.extra_savings)
+    else:
+        ratio = (request.stop - request.start) / request.step
+        if not math.isfinite(ratio):
+            raise HTTPException(status_code=400, detail="start, stop and step must be finite numbers.")
+        count = max(math.floor(ratio + 1e-9) + 1, 0)
+    if not count or not request.strategies:
+        raise HTTPException(status_code=400, detail="No extra_savings values or strategies to simulate.")
+    # Checked before the range is built: the grid size comes straight from the request
+    if count * len(request.strategies) > SWEEP_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"Too many scenarios (max {SWEEP_MAX_POINTS}).")
+    if request.extra_savings is not None:
+        amounts = request.extra_savings
+    else:
+        amounts = [round(request.start + i * request.step, 2) for i in range(count)]
+    try:
+        # Already plain JSON types: skip FastAPI's per-field re-encoding of the (large) grid
+        return JSONResponse(content=savings_sweep(request.goals, amounts, request.strategies))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # --- Database Endpoints (Optional, for persistence) ---
 
 @app.post("/transactions")
-def create_transactions(transactions: List[TransactionCreate], db: Session = Depends(get_db)):
+def create_transactions(transactions: List[TransactionCreate], db: Session = Depends(get_db),
+                        idempotency_key: Optional[str] = Header(None)):
+    """
+    Stores the transactions with batched INSERT ... RETURNING in one database
+    transaction. A retried request with the same Idempotency-Key header gets the
+    first response back instead of inserting the rows again; reusing the key
+    with a different body is rejected with 422.
+    """
+    endpoint = "POST /transactions"
+    rows = [t.model_dump() for t in transactions]
+    body_hash = request_hash(rows)
     try:
-        db_transactions = []
-        for t in transactions:
-            db_t = models.Transaction(
-                date=t.date,
-                merchant=t.merchant,
-                amount=t.amount,
-                type=t.type,
-                category=t.category,
-                description=t.description
-            )
-            db.add(db_t)
-            db_transactions.append(db_t)
-        db.commit()
-        for t in db_transactions:
-            db.refresh(t)
-        return db_transactions
+        earlier = stored_response(db, endpoint, idempotency_key, body_hash)
+        if earlier is not None:
+            return earlier
+        created = insert_returning(db, models.Transaction, (with_typed_columns(row) for row in rows))
+        return commit_with_response(db, endpoint, idempotency_key, body_hash, created)
+    except IdempotencyMismatch as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+class _LineFeed:
+    """Lines handed to a csv.reader as they arrive; raises StopIteration while empty instead of ending."""
+
+    def __init__(self):
+        self.lines = collections.deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+async def _body_lines(request: Request, digest):
+    """The request body as text lines (line ends kept), decoded as it arrives; raw bytes go to `digest`."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in request.stream():
+        digest.update(chunk)
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def _import_rows(request: Request, is_csv: bool, digest):
+    """
+    Validated transaction dicts from an NDJSON or CSV request body, parsed as it
+    arrives. CSV goes through one csv.reader, so quoted fields may span lines.
+    """
+    def validated(row: dict, line_number: int) -> dict:
+        try:
+            return with_typed_columns(TransactionCreate.model_validate(row).model_dump())
+        except ValidationError as e:
+            raise ValueError(f"Line {line_number}: {e}")
+
+    if not is_csv:
+        line_number = 0
+        async for line in _body_lines(request, digest):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {line_number}: {e}")
+            yield validated(row, line_number)
+        return
+
+    # The reader only gets whole records: lines are held back until their quotes
+    # balance, so it never runs out of input inside a quoted field.
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    header = None
+    record, quotes = [], 0
+
+    def read_record():
+        nonlocal header
+        try:
+            values = next(reader)
+        except csv.Error as e:
+            raise ValueError(f"Line {reader.line_num}: {e}")
+        if not any(value.strip() for value in values):
+            return None
+        if header is None:
+            header = [name.strip() for name in values]
+            return None
+        return validated(dict(zip(header, values)), reader.line_num)
+
+    async for line in _body_lines(request, digest):
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            feed.lines.extend(record)
+            record, quotes = [], 0
+            row = read_record()
+            if row is not None:
+                yield row
+    if record:
+        # Unbalanced quotes at the end: the reader takes the rest as one field
+        feed.lines.extend(record)
+        row = read_record()
+        if row is not None:
+            yield row
+
+@app.post("/transactions/import")
+async def import_transactions(request: Request, db: Session = Depends(get_db),
+                              idempotency_key: Optional[str] = Header(None)):
+    """
+    Streaming bulk import for large uploads: the body is NDJSON (one transaction
+    object per line) or, with Content-Type text/csv, CSV with a header row
+    (date,merchant,amount,type,category,description). Rows are validated and
+    inserted in batches as the body arrives, all in one database transaction;
+    returns {"inserted": n}. Honors Idempotency-Key like POST /transactions;
+    the key is matched to the SHA-256 of the raw body.
+    """
+    endpoint = "POST /transactions/import"
+    is_csv = request.headers.get("content-type", "").startswith("text/csv")
+    digest = hashlib.sha256()
+    try:
+        if await run_blocking(key_is_used, db, endpoint, idempotency_key):
+            # A retry: only hash the body to check it is the same upload
+            async for chunk in request.stream():
+                digest.update(chunk)
+            return await run_blocking(stored_response, db, endpoint, idempotency_key, digest.hexdigest())
+        inserted = 0
+        batch = []
+        async for row in _import_rows(request, is_csv, digest):
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                inserted += await run_blocking(insert_count, db, models.Transaction, batch)
+                batch = []
+        if batch:
+            inserted += await run_blocking(insert_count, db, models.Transaction, batch)
+        return await run_blocking(commit_with_response, db, endpoint, idempotency_key, digest.hexdigest(),
+                                  {"inserted": inserted})
+    except IdempotencyMismatch as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/transactions")
-def read_transactions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    transactions = db.query(models.Transaction).offset(skip).limit(limit).all()
-    return transactions
+def read_transactions(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    order: Literal["desc", "asc"] = "desc",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    category: Optional[str] = None,
+    type: Optional[str] = None,
+    merchant: Optional[str] = Query(None, description="Merchant prefix, case-insensitive"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    skip: int = Query(0, ge=0, le=10000, deprecated=True, description="Rows to skip; use `cursor` instead"),
+    db: Session = Depends(get_db),
+):
+    """
+    Transactions ordered by (date, id), newest first unless `order=asc`. When
+    more match, the `X-Next-Cursor` header holds the `cursor` for the next page.
+    `skip` is kept for older clients: the skipped rows are still read, so deep
+    offsets cost what OFFSET did.
+    """
+    try:
+        rows, next_cursor = page_transactions(
+            db, skip + limit, cursor, order, date_from=date_from, date_to=date_to, category=category,
+            type=type, merchant=merchant, min_amount=min_amount, max_amount=max_amount,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = rows[skip:]
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+@app.get("/transactions/summary/{group}")
+def summarize_transactions(group: Literal["month", "category", "type"], date_from: Optional[str] = None,
+                           date_to: Optional[str] = None, type: Optional[str] = None,
+                           category: Optional[str] = None, db: Session = Depends(get_db)):
+    """Totals by month (income/expense), category or type, aggregated in SQL."""
+    try:
+        return summarize(db, group, date_from, date_to, type=type, category=category)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/goals")
 def read_goals(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
@@ -215,22 +565,20 @@ def read_goals(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return goals
 
 @app.post("/goals")
-def create_goals(goals: List[GoalCreate], db: Session = Depends(get_db)):
+def create_goals(goals: List[GoalCreate], db: Session = Depends(get_db),
+                 idempotency_key: Optional[str] = Header(None)):
+    endpoint = "POST /goals"
+    rows = [g.model_dump() for g in goals]
+    body_hash = request_hash(rows)
     try:
-        db_goals = []
-        for g in goals:
-            db_g = models.Goal(
-                name=g.name,
-                target_amount=g.target_amount,
-                current_amount=g.current_amount,
-                deadline=g.deadline
-            )
-            db.add(db_g)
-            db_goals.append(db_g)
-        db.commit()
-        for g in db_goals:
-            db.refresh(g)
-        return db_goals
+        earlier = stored_response(db, endpoint, idempotency_key, body_hash)
+        if earlier is not None:
+            return earlier
+        created = insert_returning(db, models.Goal, rows)
+        return commit_with_response(db, endpoint, idempotency_key, body_hash, created)
+    except IdempotencyMismatch as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -256,6 +604,9 @@ def clear_data(db: Session = Depends(get_db)):
         # Delete all goals (optional, but "clear everything" implies this)
         db.query(models.Goal).delete()
         db.commit()
+        # Then the uploaded statement text used as chat context, once the rows are really gone
+        from services.vector_store import statement_store
+        statement_store.clear()
         return {"message": "All data cleared successfully"}
     except Exception as e:
         db.rollback()
@@ -290,5 +641,24 @@ def update_transaction_category(transaction_id: int, update: CategoryUpdate, db:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/classification/cache-stats")
+def classification_cache_stats():
+    """Hit/miss counters for the classification cache, incl. LLM and CrossEncoder calls saved."""
+    from services.classification_service import classifier
+    return classifier.cache.stats()
+
+@app.get("/llm/cache-stats")
+def llm_cache_stats():
+    """Hit rates of the on-disk LLM result cache (statement extraction chunks and LLM classification)."""
+    from services.llm_cache import llm_cache
+    return llm_cache.stats()
+
+@app.get("/embeddings/cache-stats")
+def embeddings_cache_stats():
+    """Hit rate of the on-disk embedding cache used for statement retrieval (null until the store is opened or if disabled)."""
+    from services.vector_store import statement_store
+    stats = getattr(statement_store.embedding, "stats", None)
+    return stats() if stats else None
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean
+import datetime
+
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, Index
 from database import Base
 
 class Transaction(Base):
@@ -12,6 +14,19 @@ class Transaction(Base):
     category = Column(String)
     type = Column(String)          # Added this (income/expense)
     is_recurring = Column(Boolean, default=False) # Added this
+    posted_on = Column(Date) # `date` parsed, NULL if it isn't YYYY-MM-DD; kept in sync by the writers
+    amount_cents = Column(Integer) # `amount` in integer cents, so SQL sums don't drift
+    merchant_key = Column(String) # `merchant` casefolded, for case-insensitive prefix search; kept in sync by the writers
+
+    # Keyset pagination walks (date, id): the date index above already ends in the
+    # rowid (= id), and each filter gets an index that keeps that order
+    __table_args__ = (
+        Index("ix_transactions_category_date_id", "category", "date", "id"),
+        Index("ix_transactions_type_date_id", "type", "date", "id"),
+        Index("ix_transactions_merchant_key_date_id", "merchant_key", "date", "id"),
+        # Covers the summary GROUP BY queries (month, type, category) without touching the table
+        Index("ix_transactions_summary", "posted_on", "type", "category", "amount_cents"),
+    )
 
 class Goal(Base):
     __tablename__ = "goals"
@@ -28,4 +43,21 @@ class ClassificationRule(Base):
     id = Column(Integer, primary_key=True, index=True)
     pattern = Column(String, index=True) # The text/merchant to match
     category = Column(String) # The target category
-    match_type = Column(String, default="contains") # exact, contains
\ No newline at end of file
+    match_type = Column(String, default="contains") # exact, contains
+
+class ClassificationCacheEntry(Base):
+    __tablename__ = "classification_cache"
+
+    description = Column(String, primary_key=True) # Normalized description
+    category = Column(String)
+    source = Column(String) # Tier that produced the category: llm, zero_shot
+    version = Column(String, index=True) # Keyword map / category version the entry was computed with
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    endpoint = Column(String, primary_key=True) # e.g. "POST /transactions"
+    key = Column(String, primary_key=True) # Client-chosen Idempotency-Key header
+    request_hash = Column(String) # SHA-256 of the request body first sent with this key
+    response = Column(String) # JSON of the response first returned for this key
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
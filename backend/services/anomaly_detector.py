@@ -0,0 +1,203 @@
+import datetime
+import os
+from typing import List, Optional
+
+import numpy as np
+
+from services.aggregation import EXPENSE, TransactionFrame
+
+_SEVERITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+
+def _group_median(codes: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Median of `values` per group code (NaN for empty groups), by one sort on (code, value)."""
+    order = np.lexsort((values, codes))
+    ordered = values[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    last = max(len(ordered) - 1, 0)
+    lo = np.clip(starts + (counts - 1) // 2, 0, last)
+    hi = np.clip(starts + counts // 2, 0, last)
+    if not len(ordered):
+        return np.full(n_groups, np.nan)
+    return np.where(counts > 0, (ordered[lo] + ordered[hi]) / 2, np.nan)
+
+
+def robust_z(codes: np.ndarray, values: np.ndarray, n_groups: int) -> tuple:
+    """
+    Modified z-score of each value within its group, 0.6745 * (x - median) / MAD,
+    with the mean absolute deviation standing in when more than half the group
+    is identical (MAD = 0). Returns (z, group median per row).
+    """
+    median = _group_median(codes, values, n_groups)
+    deviation = np.abs(values - median[codes])
+    mad = _group_median(codes, deviation, n_groups)
+    counts = np.maximum(np.bincount(codes, minlength=n_groups), 1)
+    mean_ad = np.bincount(codes, weights=deviation, minlength=n_groups) / counts
+    scale = np.where(mad > 0, mad / 0.6745, mean_ad * 1.253314)[codes]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(scale > 0, (values - median[codes]) / scale, 0.0)
+    return z, median[codes]
+
+
+def _day_numbers(dates: List) -> np.ndarray:
+    """Proleptic ordinal per distinct YYYY-MM-DD date; -1 where the date can't be read."""
+    days = np.full(len(dates), -1, dtype=np.int64)
+    for i, date in enumerate(dates):
+        try:
+            days[i] = datetime.date.fromisoformat(str(date)[:10]).toordinal()
+        except ValueError:
+            pass
+    return days
+
+
+class AnomalyDetector:
+    """
+    Statistical checks of a transaction history, returned as Anomaly dicts
+    (description, type, severity, transaction_id):
+
+    - unusual amounts: expenses whose robust z-score (median/MAD) within their
+      merchant or their category exceeds `z_threshold`, in groups of at least
+      `min_group` expenses, so one large purchase doesn't hide in a mean it inflated;
+    - duplicate charges: same merchant and amount in cents within `duplicate_days`
+      days, found by sorting on (merchant/amount bucket, day) and comparing
+      neighbours; merchants typically visited that often are left out;
+    - recurring charges: a merchant billed the same amount at least `recurring_min`
+      times about a month apart.
+
+    Everything is sorts and bincounts over columns of the request's
+    TransactionFrame (O(n log n)); no LLM is involved.
+    """
+
+    def __init__(self, z_threshold: float = 3.5, min_group: int = 5, duplicate_days: int = 3,
+                 recurring_min: int = 3, max_findings: int = None):
+        self.z_threshold = z_threshold
+        self.min_group = min_group
+        self.duplicate_days = duplicate_days
+        self.recurring_min = recurring_min
+        self.max_findings = max_findings or int(os.getenv("ANOMALY_MAX_FINDINGS", "20"))
+
+    @staticmethod
+    def _finding(description: str, kind: str, severity: str, t: dict, score: float) -> dict:
+        transaction_id = t.get("id")
+        return {
+            "description": description,
+            "type": kind,
+            "severity": severity,
+            "transaction_id": str(transaction_id) if transaction_id is not None else None,
+            "_score": score,
+        }
+
+    def _severity(self, z: float) -> str:
+        if z >= 2 * self.z_threshold:
+            return "high"
+        if z >= 1.5 * self.z_threshold:
+            return "medium"
+        return "low"
+
+    def _outliers(self, transactions, rows, amount, merchant, n_merchants, category, n_categories) -> List[dict]:
+        findings = []
+        best_z = np.zeros(len(rows))
+        best_median = np.zeros(len(rows))
+        best_by_merchant = np.zeros(len(rows), dtype=bool)
+        for by_merchant, codes, n_groups in ((True, merchant, n_merchants), (False, category, n_categories)):
+            z, median = robust_z(codes, amount, n_groups)
+            large = np.bincount(codes, minlength=n_groups)[codes] >= self.min_group
+            better = large & (z > best_z)
+            best_z = np.where(better, z, best_z)
+            best_median = np.where(better, median, best_median)
+            best_by_merchant = np.where(better, by_merchant, best_by_merchant)
+
+        for i in np.flatnonzero(best_z > self.z_threshold):
+            t = transactions[rows[i]]
+            group = "this merchant" if best_by_merchant[i] else f"{t.get('category', 'Other')}"
+            ratio = f"{amount[i] / best_median[i]:.1f}x " if best_median[i] > 0 else ""
+            findings.append(self._finding(
+                f"Unusually high charge: {t.get('merchant')} ${amount[i]:.2f} on {t.get('date')} is "
+                f"{ratio}the usual ${best_median[i]:.2f} for {group}.",
+                "anomaly", self._severity(best_z[i]), t, float(best_z[i]),
+            ))
+        return findings
+
+    def _habitual(self, merchant, n_merchants, day) -> np.ndarray:
+        """Per row: whether its merchant is usually visited within `duplicate_days` (the daily coffee)."""
+        order = np.lexsort((day, merchant))
+        m, d = merchant[order], day[order]
+        follows = (m[1:] == m[:-1]) & (d[:-1] >= 0)
+        if not follows.any():
+            return np.zeros(len(merchant), dtype=bool)
+        typical_gap = _group_median(m[1:][follows], (d[1:] - d[:-1])[follows].astype(np.float64), n_merchants)
+        return (typical_gap <= self.duplicate_days)[merchant]
+
+    def _duplicates(self, transactions, rows, bucket, day, habitual) -> List[dict]:
+        findings = []
+        order = np.lexsort((day, bucket))
+        same = (bucket[order][1:] == bucket[order][:-1]) & (day[order][:-1] >= 0) & ~habitual[order][1:]
+        gap = day[order][1:] - day[order][:-1]
+        for j in np.flatnonzero(same & (gap <= self.duplicate_days)):
+            first, second = transactions[rows[order[j]]], transactions[rows[order[j + 1]]]
+            when = "on the same day" if gap[j] == 0 else f"{gap[j]} day{'s' if gap[j] > 1 else ''} apart"
+            findings.append(self._finding(
+                f"Possible duplicate charge: {second.get('merchant')} ${float(second.get('amount')):.2f} "
+                f"on {first.get('date')} and {second.get('date')} ({when}).",
+                "anomaly", "medium" if gap[j] == 0 else "low", second, float(self.duplicate_days + 1 - gap[j]),
+            ))
+        return findings
+
+    def _recurring(self, transactions, rows, bucket, day) -> List[dict]:
+        findings = []
+        known = day >= 0
+        rows, bucket, day = rows[known], bucket[known], day[known]
+        order = np.lexsort((day, bucket))
+        bucket, day = bucket[order], day[order]
+        if not len(bucket):
+            return findings
+        starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+        ends = np.concatenate((starts[1:], [len(bucket)]))
+        for start, end in zip(starts, ends):
+            if end - start < self.recurring_min:
+                continue
+            gaps = np.diff(day[start:end])
+            # About monthly, allowing for month lengths and weekends
+            if np.all((gaps >= 26) & (gaps <= 35)):
+                t = transactions[rows[order[end - 1]]]
+                findings.append(self._finding(
+                    f"Recurring charge: {t.get('merchant')} ${float(t.get('amount')):.2f} monthly "
+                    f"({end - start} payments, last on {t.get('date')}).",
+                    "recurring", "low", t, float(end - start),
+                ))
+        return findings
+
+    def detect(self, transactions: List[dict], frame: Optional[TransactionFrame] = None) -> List[dict]:
+        """Findings ordered by severity and strength, at most `max_findings`."""
+        if not transactions:
+            return []
+        frame = frame or TransactionFrame(transactions)
+        rows = np.flatnonzero(frame.valid & (frame.type == EXPENSE))
+        if not len(rows):
+            return []
+        amount = np.abs(frame.amount[rows])
+
+        # Merchants compared with case and spacing folded
+        merchant_of_code, merchant_index = [], {}
+        for m in frame.merchants:
+            merchant_of_code.append(merchant_index.setdefault(" ".join(str(m or "").split()).casefold(), len(merchant_index)))
+        merchant = np.asarray(merchant_of_code, dtype=np.int64)[frame.merchant[rows]]
+        category = frame.category[rows].astype(np.int64)
+        day = _day_numbers(frame.dates)[frame.date[rows]]
+        # Hash bucket of (merchant, amount in cents)
+        cents = np.round(amount * 100).astype(np.int64)
+        _, bucket = np.unique(merchant * (cents.max() + 1) + cents, return_inverse=True)
+
+        findings = (
+            self._outliers(transactions, rows, amount, merchant, len(merchant_index), category, len(frame.categories))
+            + self._duplicates(transactions, rows, bucket, day, self._habitual(merchant, len(merchant_index), day))
+            + self._recurring(transactions, rows, bucket, day)
+        )
+        findings.sort(key=lambda f: (_SEVERITY_RANK[f["severity"]], -f["_score"]))
+        for f in findings:
+            del f["_score"]
+        return findings[:self.max_findings]
+
+
+anomaly_detector = AnomalyDetector()
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+from typing import Any, Iterable, Iterator, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import IdempotencyKey
+
+# Rows per execute(); SQLAlchemy sends each batch as multi-row INSERT ... RETURNING
+# statements (or executemany without RETURNING), not one round trip per row.
+INSERT_BATCH_SIZE = int(os.getenv("INSERT_BATCH_SIZE", "500"))
+
+
+def batched(rows: Iterable[dict], size: int = None) -> Iterator[List[dict]]:
+    size = size or INSERT_BATCH_SIZE
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert_returning(db: Session, model, rows: Iterable[dict], batch_size: int = None) -> List[dict]:
+    """
+    Inserts `rows` in batches with INSERT ... RETURNING and returns the stored rows
+    (generated ids and column defaults included) as dicts, in input order. No ORM
+    objects and no SELECT per row; the caller commits, so all batches form one
+    transaction.
+    """
+    table = model.__table__
+    # sort_by_parameter_order=True would make SQLite fall back to one INSERT per
+    # row; rowids of one multi-row INSERT ascend in VALUES order, so sort by them.
+    statement = insert(table).returning(*table.columns)
+    key = table.primary_key.columns.values()[0].name
+    created = []
+    for batch in batched(rows, batch_size):
+        stored = [dict(row._mapping) for row in db.execute(statement, batch)]
+        created.extend(sorted(stored, key=lambda row: row[key]))
+    return created
+
+
+def insert_count(db: Session, model, rows: Iterable[dict], batch_size: int = None) -> int:
+    """Like insert_returning, but for streamed imports: only the number of rows is kept."""
+    statement = insert(model.__table__)
+    count = 0
+    for batch in batched(rows, batch_size):
+        db.execute(statement, batch)
+        count += len(batch)
+    return count
+
+
+class IdempotencyMismatch(Exception):
+    """An Idempotency-Key was reused with a different request body."""
+
+
+def request_hash(payload: Any) -> str:
+    """SHA-256 of a parsed request body, independent of key order and whitespace."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def key_is_used(db: Session, endpoint: str, key: Optional[str]) -> bool:
+    """Whether an earlier request recorded a response for `key` on `endpoint`."""
+    if not key:
+        return False
+    return db.execute(
+        select(IdempotencyKey.key).where(IdempotencyKey.endpoint == endpoint, IdempotencyKey.key == key)
+    ).first() is not None
+
+
+def stored_response(db: Session, endpoint: str, key: Optional[str], body_hash: str) -> Optional[Any]:
+    """
+    The response recorded for `key` on `endpoint` by an earlier request, if any.
+    Raises IdempotencyMismatch if that request's body hash wasn't `body_hash`;
+    records stored before hashes were kept have none and match any body.
+    """
+    if not key:
+        return None
+    record = db.execute(
+        select(IdempotencyKey.response, IdempotencyKey.request_hash)
+        .where(IdempotencyKey.endpoint == endpoint, IdempotencyKey.key == key)
+    ).first()
+    if record is None:
+        return None
+    if record.request_hash is not None and record.request_hash != body_hash:
+        raise IdempotencyMismatch(f"Idempotency-Key '{key}' was already used with a different request body.")
+    return json.loads(record.response)
+
+
+def remember_response(db: Session, endpoint: str, key: Optional[str], body_hash: str, response: Any):
+    """
+    Records the response for `key` in the caller's transaction, so it commits or
+    rolls back together with the rows. A concurrent request with the same key
+    fails on the primary key at commit instead of inserting the rows twice.
+    """
+    if key:
+        db.add(IdempotencyKey(endpoint=endpoint, key=key, request_hash=body_hash,
+                              response=json.dumps(response, default=str)))
+
+
+def commit_with_response(db: Session, endpoint: str, key: Optional[str], body_hash: str, response: Any) -> Any:
+    """
+    Commits the caller's inserts together with the idempotency record for `key`.
+    If a concurrent request with the same key committed first, the inserts are
+    rolled back and that request's response is returned instead.
+    """
+    remember_response(db, endpoint, key, body_hash, response)
+    try:
+        db.commit()
+        return response
+    except IntegrityError:
+        db.rollback()
+        earlier = stored_response(db, endpoint, key, body_hash)
+        if earlier is None:
+            raise
+        return earlier
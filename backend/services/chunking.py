@@ -0,0 +1,113 @@
+import math
+import os
+import re
+import threading
+from typing import Callable, List, Optional
+
+from services.statement_parser import DATE
+
+# A line starting with a date opens a new transaction row; chunks are only cut there.
+_ROW_START_RE = re.compile(rf"^\s*(?:{DATE})(?:\s|$)")
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Tokens in `text` for `model` using tiktoken when its encoding is available;
+    otherwise (no tiktoken, or the BPE file can't be downloaded) ~4 characters per token.
+    """
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        with _encoding_lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.encoding_for_model(model)
+                except Exception as e:
+                    print(f"Token counting: tiktoken unavailable ({e}); estimating 4 chars/token")
+                    _encoding_failed = True
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, math.ceil(len(text) / 4))
+
+
+class TokenBudgetChunker:
+    """
+    Splits statement lines into chunks of about `budget` tokens, cutting only
+    before transaction rows (lines that start with a date), so no overlap is
+    needed. If the text has no dated rows at all, any line is a cut point.
+
+    The budget adapts to observed latency: `observe(tokens, seconds)` keeps an
+    EWMA of seconds per input token and the budget becomes the token count
+    expected to finish in `target_seconds`, clamped to [min_tokens, max_tokens].
+    The maximum also keeps the structured output (several times the input for
+    transaction rows) under the model's output limit.
+    """
+
+    def __init__(self, target_tokens: int = None, min_tokens: int = None, max_tokens: int = None,
+                 target_seconds: float = None, count: Callable[[str], int] = None, alpha: float = 0.3):
+        self.target_tokens = target_tokens or int(os.getenv("EXTRACTION_CHUNK_TOKENS", "2500"))
+        self.min_tokens = min_tokens or int(os.getenv("EXTRACTION_CHUNK_MIN_TOKENS", "500"))
+        self.max_tokens = max_tokens or int(os.getenv("EXTRACTION_CHUNK_MAX_TOKENS", "4000"))
+        self.target_seconds = target_seconds or float(os.getenv("EXTRACTION_CHUNK_TARGET_SECONDS", "30"))
+        self.count = count or count_tokens
+        self.alpha = alpha
+        self._seconds_per_token: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def budget(self) -> int:
+        with self._lock:
+            if self._seconds_per_token is None:
+                return self.target_tokens
+            budget = int(self.target_seconds / self._seconds_per_token)
+        return max(self.min_tokens, min(self.max_tokens, budget))
+
+    def observe(self, tokens: int, seconds: float):
+        """Records one chunk's LLM latency."""
+        if tokens <= 0 or seconds <= 0:
+            return
+        sample = seconds / tokens
+        with self._lock:
+            if self._seconds_per_token is None:
+                self._seconds_per_token = sample
+            else:
+                self._seconds_per_token = self.alpha * sample + (1 - self.alpha) * self._seconds_per_token
+
+    def split(self, text_lines: List[str]) -> List[List[str]]:
+        if not text_lines:
+            return []
+        # +1 for the newline joining the lines
+        costs = [self.count(line) + 1 for line in text_lines]
+        total = sum(costs)
+        budget = self.budget
+        # Spread the text evenly over the fewest chunks that fit the budget
+        n_chunks = math.ceil(total / budget)
+        target = total / n_chunks
+
+        is_row_start = [bool(_ROW_START_RE.match(line)) for line in text_lines]
+        if not any(is_row_start):
+            is_row_start = [True] * len(text_lines)
+        # A run of lines with no row start still has to be cut somewhere
+        hard_limit = self.max_tokens * 1.5
+
+        chunks, current, size, consumed = [], [], 0, 0
+        for line, cost, row_start in zip(text_lines, costs, is_row_start):
+            # Cut at the row boundary nearest the next multiple of the target size; the last chunk takes the rest
+            boundary = (len(chunks) + 1) * target
+            at_boundary = row_start and len(chunks) < n_chunks - 1 and consumed + cost / 2 > boundary
+            if current and (at_boundary or size + cost > hard_limit):
+                chunks.append(current)
+                current, size = [], 0
+            current.append(line)
+            size += cost
+            consumed += cost
+        if current:
+            chunks.append(current)
+        return chunks
+
+
+chunker = TokenBudgetChunker()
@@ -0,0 +1,175 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from database import engine
+from models import ClassificationCacheEntry
+
+# SQLite's default limit on bound parameters is 999 on older builds.
+_SQL_CHUNK = 500
+
+
+def normalize_description(text: str) -> str:
+    """Cache key for a description: upper-cased with whitespace collapsed."""
+    return " ".join((text or "").upper().split())
+
+
+class ClassificationCache:
+    """
+    Two-tier cache of expensive classification results (LLM / CrossEncoder).
+
+    Tier 1 is an in-process LRU, tier 2 the `classification_cache` table in
+    sql_app.db so results survive restarts. Entries are keyed by normalized
+    description and tagged with `version`; entries written under a different
+    version (e.g. after the keyword map or category list changed) are misses.
+    `bind` is the database of the SQLite tier (sql_app.db by default); its
+    table is created on first use, so constructing a cache writes nothing.
+    """
+
+    def __init__(self, version: str, max_entries: int = None, bind: Engine = None):
+        self.version = version
+        self.max_entries = max_entries or int(os.getenv("CLASSIFICATION_CACHE_SIZE", "10000"))
+        self._lru: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "invalidations": 0}
+        self._saved_calls: Dict[str, int] = {}
+        self._bind = bind or engine
+        self._disk_enabled = True
+        self._table_ready = False
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+        """Returns {key: (category, source)} for every cached key."""
+        found: Dict[str, Tuple[str, str]] = {}
+        pending: List[str] = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._lru.get(key)
+                if entry is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = entry
+                    self._stats["memory_hits"] += 1
+                    self._count_saved(entry[1])
+                else:
+                    pending.append(key)
+
+        if pending and self._disk_ready():
+            disk_hits = self._load(pending)
+            with self._lock:
+                for key, entry in disk_hits.items():
+                    self._remember(key, entry)
+                    self._stats["disk_hits"] += 1
+                    self._count_saved(entry[1])
+            found.update(disk_hits)
+
+        with self._lock:
+            self._stats["misses"] += sum(1 for key in pending if key not in found)
+        return found
+
+    def put_many(self, entries: Dict[str, Tuple[str, str]]):
+        """Stores {key: (category, source)} in both tiers."""
+        if not entries:
+            return
+        with self._lock:
+            for key, entry in entries.items():
+                self._remember(key, entry)
+            self._stats["writes"] += len(entries)
+
+        if not self._disk_ready():
+            return
+        rows = [
+            {"description": key, "category": category, "source": source, "version": self.version}
+            for key, (category, source) in entries.items()
+        ]
+        db = Session(bind=self._bind)
+        try:
+            for i in range(0, len(rows), _SQL_CHUNK):
+                db.execute(insert(ClassificationCacheEntry).prefix_with("OR REPLACE"), rows[i:i + _SQL_CHUNK])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Classification cache: write failed ({e})")
+        finally:
+            db.close()
+
+    def invalidate(self, description: str):
+        """Drops the entry for a description, e.g. after a user correction."""
+        key = normalize_description(description)
+        self._delete(lambda query: query.filter(ClassificationCacheEntry.description == key), [key])
+
+    def clear(self):
+        self._delete(lambda query: query, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hits = lookups - self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "saved_calls": dict(self._saved_calls),
+                "memory_entries": len(self._lru),
+                "version": self.version,
+            }
+
+    def _disk_ready(self) -> bool:
+        """Whether the SQLite tier can be used, creating its table the first time."""
+        with self._lock:
+            if self._disk_enabled and not self._table_ready:
+                try:
+                    ClassificationCacheEntry.__table__.create(bind=self._bind, checkfirst=True)
+                    self._table_ready = True
+                except Exception as e:
+                    print(f"Classification cache: SQLite tier disabled ({e})")
+                    self._disk_enabled = False
+            return self._disk_enabled
+
+    def _remember(self, key: str, entry: Tuple[str, str]):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _count_saved(self, source: str):
+        self._saved_calls[source] = self._saved_calls.get(source, 0) + 1
+
+    def _load(self, keys: List[str]) -> Dict[str, Tuple[str, str]]:
+        found = {}
+        db = Session(bind=self._bind)
+        try:
+            for i in range(0, len(keys), _SQL_CHUNK):
+                rows = db.query(ClassificationCacheEntry).filter(
+                    ClassificationCacheEntry.description.in_(keys[i:i + _SQL_CHUNK]),
+                    ClassificationCacheEntry.version == self.version
+                ).all()
+                for row in rows:
+                    found[row.description] = (row.category, row.source)
+        except Exception as e:
+            print(f"Classification cache: read failed ({e})")
+        finally:
+            db.close()
+        return found
+
+    def _delete(self, apply_filter, keys):
+        with self._lock:
+            if keys is None:
+                removed = len(self._lru)
+                self._lru.clear()
+            else:
+                removed = sum(1 for key in keys if self._lru.pop(key, None) is not None)
+            self._stats["invalidations"] += removed
+
+        if not self._disk_ready():
+            return
+        db = Session(bind=self._bind)
+        try:
+            apply_filter(db.query(ClassificationCacheEntry)).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Classification cache: invalidation failed ({e})")
+        finally:
+            db.close()
@@ -1,88 +1,116 @@
-from sentence_transformers import CrossEncoder
-import torch
-import re
-
-class TransactionClassifier:
-    def __init__(self, model_name: str = "cross-encoder/nli-distilroberta-base"):
-        """
-        Initialize the CrossEncoder model.
-        """
-        with open("backend_debug.log", "a") as f:
-            f.write(f"Loading CrossEncoder model: {model_name}...\n")
-        print(f"Loading CrossEncoder model: {model_name}...")
-        self.model = CrossEncoder(model_name)
-        with open("backend_debug.log", "a") as f:
-            f.write("CrossEncoder model loaded successfully.\n")
-        
-        # Define keyword mapping for fast and accurate classification
-        # ORDER MATTERS: Specific categories first, generic ones last.
-        self.keyword_map = {
-            'Subscriptions': ['MEMBERSHIP', 'ANNUAL FEE', 'SUBSCRIPTION', 'MEMBER','NETFLIX', 'HULU', 'DISNEY+', 'HBO', 'HBO MAX', 'PRIME VIDEO','SPOTIFY', 'APPLE MUSIC', 'AMAZON MUSIC', 'TIDAL','MEMBERSHIP', 'ANNUAL FEE', 'SUBSCRIPTION', 'MEMBER','MICROSOFT', 'ADOBE', 'JETBRAINS', 'ATLASSIAN', 'ATLASIAN', 'SOFTWARE', 'GITHUB', 'NOTION', 'SLACK', 'TRELLO', 'ASAANA', 'ASANA','DROPBOX', 'GOOGLE DRIVE', 'GOOGLEDRIVE', 'ONE DRIVE', 'ONE-DRIVE', 'ONEDRIVE', 'ICLOUD', 'CLOUD STORAGE', 'GOOGLE ONE'],
-            'Transportation': ['UBER', 'LYFT', 'SHELL', 'CHEVRON', 'BP', 'AMTRAK', 'METRO', 'TAXI', 'TOLL', 'TRANSPORT'],
-            'Travel & Vacations': ['AIRBNB', 'EXPEDIA', 'DELTA', 'UNITED', 'SOUTHWEST', 'HOTEL', 'BOOKING.COM', 'BOOKING', 'TRAVEL', 'AIRLINE', 'AVION', 'MAKING TRAVEL', 'HOTELS.COM'],
-            'Credit Card Payments': ['CARD PAYMENT', 'CREDIT CARD PAYMENT', 'AMEX PAYMENT', 'VISA PAYMENT', 'MASTERCARD PAYMENT', 'CC PAYMENT'],
-            'Income': ['SALARY', 'PAYCHECK', 'DEPOSIT', 'INCOME', 'DIVIDEND', 'INTEREST', 'REFUND', 'REIMBURSEMENT'],
-            'Others': ['PHARMACY', 'CVS', 'WALGREENS', 'KAISER', 'HOSPITAL', 'CLINIC', 'DOCTOR', 'MEDICINE','VANGUARD', 'SCHWAB', 'FIDELITY', 'ROBINHOOD', 'MUTUAL FUND', 'ETF', 'SIP', 'INVEST', 'BROKERAGE', 'ZERODHA', 'UPSTOX','LOAN PAYMENT', 'EMI', 'HOME LOAN', 'AUTO LOAN', 'PERSONAL LOAN', 'LOAN','TAX', 'IRS', 'HMRC', 'TDS', 'PAYROLL TAX', 'INCOME TAX','INSURANCE', 'PREMIUM', 'GEICO', 'AETNA', 'BLUE CROSS', 'PRUDENTIAL', 'HDFC ERGO', 'LIC','GYM', 'CLASSPASS', 'FITBIT', 'YOGA', 'PILATES', 'PERSONAL TRAI','DAYCARE', 'NANNY', 'SITTER', 'PRESCHOOL', 'CHILDCARE','VET', 'PETCO', 'PETSMART', 'PET', 'ANIMAL', 'GROOMING','EDU', 'COURSE', 'UDEMY', 'COURSERA', 'SCHOOL', 'UNIVERSITY', 'COLLEGE', 'TUITION', 'LEARNING', 'BOOTCAMP', 'K12'],
-            'Groceries': ['WHOLEFOODS', 'WHOLEFDS', 'TRADER JOE', 'TRADER JOES', 'SAFEWAY', 'KROGER', 'ALDI', 'COSTCO', 'WALMART', 'PUBLIX', 'SPROUTS', 'GROCERY', 'SUPERMARKET', 'MARKET', 'BIG BASKET', 'GROCER', 'INSTA MART'],
-            'Dining': ['STARBUCKS', 'MCDONALD', 'MCDONALDS', 'MCD', 'BURGER', 'PIZZA', 'PIZZA HUT', 'DOMINOS', 'PAPA JOHN', 'RESTAURANT', 'CAFE', 'DOORDASH', 'UBEREATS', 'GRUBHUB', 'ZOMATO', 'SWIGGY', 'DINING', 'FOOD', 'DINING OUT', 'DINING-OUT'],
-            'Shopping': ['AMZN', 'AMAZON', 'TARGET', 'WALMART', 'BEST BUY', 'EBAY', 'TJMAXX', 'IKEA', 'SEPHORA', 'SHOP', 'MALL', 'FLIPKART'],
-            'Bills': ['RENT','ELECTRIC', 'WATER', 'GAS', 'UTILITY', 'PG&E', 'PGE', 'CON EDISON', 'CONED', 'SCE', 'DOMINION', 'WATER BILL', 'ELECTRICITY', 'TELECOM', 'INTERNET', 'BILL']
-        }
-        
-        self.categories = list(self.keyword_map.keys()) + ["Income", "Miscellaneous"]
-        print("CrossEncoder model loaded successfully.")
-
-from sentence_transformers import CrossEncoder
-import torch
-import re
-from typing import List
+import hashlib
+import json
+import threading
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
 from database import SessionLocal
 from models import ClassificationRule
+from services.keyword_matcher import KeywordMatcher
+from services.rule_index import RuleIndex
+from services.classification_cache import ClassificationCache, normalize_description
+from services.concurrency import run_blocking
+from services.zero_shot import create_engine
+
+# Keyword mapping for fast and accurate classification.
+# ORDER MATTERS: Specific categories first, generic ones last.
+KEYWORD_MAP = {
+    'Subscriptions': ['MEMBERSHIP', 'ANNUAL FEE', 'SUBSCRIPTION', 'MEMBER','NETFLIX', 'HULU', 'DISNEY+', 'HBO', 'HBO MAX', 'PRIME VIDEO','SPOTIFY', 'APPLE MUSIC', 'AMAZON MUSIC', 'TIDAL','MEMBERSHIP', 'ANNUAL FEE', 'SUBSCRIPTION', 'MEMBER','MICROSOFT', 'ADOBE', 'JETBRAINS', 'ATLASSIAN', 'ATLASIAN', 'SOFTWARE', 'GITHUB', 'NOTION', 'SLACK', 'TRELLO', 'ASAANA', 'ASANA','DROPBOX', 'GOOGLE DRIVE', 'GOOGLEDRIVE', 'ONE DRIVE', 'ONE-DRIVE', 'ONEDRIVE', 'ICLOUD', 'CLOUD STORAGE', 'GOOGLE ONE'],
+    'Transportation': ['UBER', 'LYFT', 'SHELL', 'CHEVRON', 'BP', 'AMTRAK', 'METRO', 'TAXI', 'TOLL', 'TRANSPORT'],
+    'Travel & Vacations': ['AIRBNB', 'EXPEDIA', 'DELTA', 'UNITED', 'SOUTHWEST', 'HOTEL', 'BOOKING.COM', 'BOOKING', 'TRAVEL', 'AIRLINE', 'AVION', 'MAKING TRAVEL', 'HOTELS.COM'],
+    'Credit Card Payments': ['CARD PAYMENT', 'CREDIT CARD PAYMENT', 'AMEX PAYMENT', 'VISA PAYMENT', 'MASTERCARD PAYMENT', 'CC PAYMENT'],
+    'Income': ['SALARY', 'PAYCHECK', 'DEPOSIT', 'INCOME', 'DIVIDEND', 'INTEREST', 'REFUND', 'REIMBURSEMENT'],
+    'Others': ['PHARMACY', 'CVS', 'WALGREENS', 'KAISER', 'HOSPITAL', 'CLINIC', 'DOCTOR', 'MEDICINE','VANGUARD', 'SCHWAB', 'FIDELITY', 'ROBINHOOD', 'MUTUAL FUND', 'ETF', 'SIP', 'INVEST', 'BROKERAGE', 'ZERODHA', 'UPSTOX','LOAN PAYMENT', 'EMI', 'HOME LOAN', 'AUTO LOAN', 'PERSONAL LOAN', 'LOAN','TAX', 'IRS', 'HMRC', 'TDS', 'PAYROLL TAX', 'INCOME TAX','INSURANCE', 'PREMIUM', 'GEICO', 'AETNA', 'BLUE CROSS', 'PRUDENTIAL', 'HDFC ERGO', 'LIC','GYM', 'CLASSPASS', 'FITBIT', 'YOGA', 'PILATES', 'PERSONAL TRAI','DAYCARE', 'NANNY', 'SITTER', 'PRESCHOOL', 'CHILDCARE','VET', 'PETCO', 'PETSMART', 'PET', 'ANIMAL', 'GROOMING','EDU', 'COURSE', 'UDEMY', 'COURSERA', 'SCHOOL', 'UNIVERSITY', 'COLLEGE', 'TUITION', 'LEARNING', 'BOOTCAMP', 'K12'],
+    'Groceries': ['WHOLEFOODS', 'WHOLEFDS', 'TRADER JOE', 'TRADER JOES', 'SAFEWAY', 'KROGER', 'ALDI', 'COSTCO', 'WALMART', 'PUBLIX', 'SPROUTS', 'GROCERY', 'SUPERMARKET', 'MARKET', 'BIG BASKET', 'GROCER', 'INSTA MART'],
+    'Dining': ['STARBUCKS', 'MCDONALD', 'MCDONALDS', 'MCD', 'BURGER', 'PIZZA', 'PIZZA HUT', 'DOMINOS', 'PAPA JOHN', 'RESTAURANT', 'CAFE', 'DOORDASH', 'UBEREATS', 'GRUBHUB', 'ZOMATO', 'SWIGGY', 'DINING', 'FOOD', 'DINING OUT', 'DINING-OUT'],
+    'Shopping': ['AMZN', 'AMAZON', 'TARGET', 'WALMART', 'BEST BUY', 'EBAY', 'TJMAXX', 'IKEA', 'SEPHORA', 'SHOP', 'MALL', 'FLIPKART'],
+    'Bills': ['RENT','ELECTRIC', 'WATER', 'GAS', 'UTILITY', 'PG&E', 'PGE', 'CON EDISON', 'CONED', 'SCE', 'DOMINION', 'WATER BILL', 'ELECTRICITY', 'TELECOM', 'INTERNET', 'BILL']
+}
 
 class TransactionClassifier:
-    def __init__(self, model_name: str = "cross-encoder/nli-distilroberta-base"):
+    def __init__(self, model_name: str = None, engine: str = None):
         """
-        Initialize the CrossEncoder model and load custom rules.
+        Load custom rules and compile the keyword matcher.
+        The zero-shot engine (ZERO_SHOT_ENGINE: cross-encoder or bi-encoder) is loaded
+        lazily on first use, or ahead of time via warm_up().
         """
-        with open("backend_debug.log", "a") as f:
-            f.write(f"Loading CrossEncoder model: {model_name}...\n")
-        print(f"Loading CrossEncoder model: {model_name}...")
-        self.model = CrossEncoder(model_name)
-        with open("backend_debug.log", "a") as f:
-            f.write("CrossEncoder model loaded successfully.\n")
+        self.keyword_map = KEYWORD_MAP
+        self.keyword_matcher = KeywordMatcher.from_keyword_map(self.keyword_map)
         
-        self.keyword_map = {
-            'Subscriptions': ['MEMBERSHIP', 'ANNUAL FEE', 'SUBSCRIPTION', 'MEMBER','NETFLIX', 'HULU', 'DISNEY+', 'HBO', 'HBO MAX', 'PRIME VIDEO','SPOTIFY', 'APPLE MUSIC', 'AMAZON MUSIC', 'TIDAL','MEMBERSHIP', 'ANNUAL FEE', 'SUBSCRIPTION', 'MEMBER','MICROSOFT', 'ADOBE', 'JETBRAINS', 'ATLASSIAN', 'ATLASIAN', 'SOFTWARE', 'GITHUB', 'NOTION', 'SLACK', 'TRELLO', 'ASAANA', 'ASANA','DROPBOX', 'GOOGLE DRIVE', 'GOOGLEDRIVE', 'ONE DRIVE', 'ONE-DRIVE', 'ONEDRIVE', 'ICLOUD', 'CLOUD STORAGE', 'GOOGLE ONE'],
-            'Transportation': ['UBER', 'LYFT', 'SHELL', 'CHEVRON', 'BP', 'AMTRAK', 'METRO', 'TAXI', 'TOLL', 'TRANSPORT'],
-            'Travel & Vacations': ['AIRBNB', 'EXPEDIA', 'DELTA', 'UNITED', 'SOUTHWEST', 'HOTEL', 'BOOKING.COM', 'BOOKING', 'TRAVEL', 'AIRLINE', 'AVION', 'MAKING TRAVEL', 'HOTELS.COM'],
-            'Credit Card Payments': ['CARD PAYMENT', 'CREDIT CARD PAYMENT', 'AMEX PAYMENT', 'VISA PAYMENT', 'MASTERCARD PAYMENT', 'CC PAYMENT'],
-            'Income': ['SALARY', 'PAYCHECK', 'DEPOSIT', 'INCOME', 'DIVIDEND', 'INTEREST', 'REFUND', 'REIMBURSEMENT'],
-            'Others': ['PHARMACY', 'CVS', 'WALGREENS', 'KAISER', 'HOSPITAL', 'CLINIC', 'DOCTOR', 'MEDICINE','VANGUARD', 'SCHWAB', 'FIDELITY', 'ROBINHOOD', 'MUTUAL FUND', 'ETF', 'SIP', 'INVEST', 'BROKERAGE', 'ZERODHA', 'UPSTOX','LOAN PAYMENT', 'EMI', 'HOME LOAN', 'AUTO LOAN', 'PERSONAL LOAN', 'LOAN','TAX', 'IRS', 'HMRC', 'TDS', 'PAYROLL TAX', 'INCOME TAX','INSURANCE', 'PREMIUM', 'GEICO', 'AETNA', 'BLUE CROSS', 'PRUDENTIAL', 'HDFC ERGO', 'LIC','GYM', 'CLASSPASS', 'FITBIT', 'YOGA', 'PILATES', 'PERSONAL TRAI','DAYCARE', 'NANNY', 'SITTER', 'PRESCHOOL', 'CHILDCARE','VET', 'PETCO', 'PETSMART', 'PET', 'ANIMAL', 'GROOMING','EDU', 'COURSE', 'UDEMY', 'COURSERA', 'SCHOOL', 'UNIVERSITY', 'COLLEGE', 'TUITION', 'LEARNING', 'BOOTCAMP', 'K12'],
-            'Groceries': ['WHOLEFOODS', 'WHOLEFDS', 'TRADER JOE', 'TRADER JOES', 'SAFEWAY', 'KROGER', 'ALDI', 'COSTCO', 'WALMART', 'PUBLIX', 'SPROUTS', 'GROCERY', 'SUPERMARKET', 'MARKET', 'BIG BASKET', 'GROCER', 'INSTA MART'],
-            'Dining': ['STARBUCKS', 'MCDONALD', 'MCDONALDS', 'MCD', 'BURGER', 'PIZZA', 'PIZZA HUT', 'DOMINOS', 'PAPA JOHN', 'RESTAURANT', 'CAFE', 'DOORDASH', 'UBEREATS', 'GRUBHUB', 'ZOMATO', 'SWIGGY', 'DINING', 'FOOD', 'DINING OUT', 'DINING-OUT'],
-            'Shopping': ['AMZN', 'AMAZON', 'TARGET', 'WALMART', 'BEST BUY', 'EBAY', 'TJMAXX', 'IKEA', 'SEPHORA', 'SHOP', 'MALL', 'FLIPKART'],
-            'Bills': ['RENT','ELECTRIC', 'WATER', 'GAS', 'UTILITY', 'PG&E', 'PGE', 'CON EDISON', 'CONED', 'SCE', 'DOMINION', 'WATER BILL', 'ELECTRICITY', 'TELECOM', 'INTERNET', 'BILL']
-        }
-        
-        self.categories = list(self.keyword_map.keys()) + ["Income", "Miscellaneous"]
+        # dict.fromkeys keeps order and drops the duplicate "Income"
+        self.categories = list(dict.fromkeys(list(self.keyword_map.keys()) + ["Income", "Miscellaneous"]))
+
+        self.engine = create_engine(self.categories, engine=engine, model_name=model_name)
+        self.model_name = self.engine.model_name
+        self._model_loaded = False
+        self._model_lock = threading.Lock()
+        self.model_status = "cold" # cold, loading, ready, failed
+        self.model_error = None
         
         # Load rules from DB
-        self.rules = []
+        self.rule_index = RuleIndex()
         self.reload_rules()
-        print("CrossEncoder model loaded successfully.")
+
+        # Cache for LLM / CrossEncoder results, invalidated when the keyword map or categories change
+        fingerprint = json.dumps([self.keyword_map, self.categories, self.engine.name, self.model_name], sort_keys=True)
+        self.cache = ClassificationCache(version=hashlib.sha1(fingerprint.encode()).hexdigest()[:16])
+
+    @property
+    def model(self):
+        """The zero-shot engine's model. Loads it on first access and blocks until it is ready."""
+        if not self._model_loaded:
+            self._load_model()
+        return self.engine.model
+
+    @property
+    def is_model_ready(self) -> bool:
+        return self._model_loaded
+
+    def _load_model(self):
+        with self._model_lock:
+            if self._model_loaded:
+                return
+            self.model_status = "loading"
+            try:
+                # The engine imports sentence_transformers (and torch) here, not at module import
+                with open("backend_debug.log", "a") as f:
+                    f.write(f"Loading {self.engine.name} model: {self.model_name}...\n")
+                print(f"Loading {self.engine.name} model: {self.model_name}...")
+                self.engine.load()
+                self._model_loaded = True
+                self.model_status = "ready"
+                self.model_error = None
+                with open("backend_debug.log", "a") as f:
+                    f.write(f"{self.engine.name} model loaded successfully.\n")
+                print(f"{self.engine.name} model loaded successfully.")
+            except Exception as e:
+                self.model_status = "failed"
+                self.model_error = str(e)
+                print(f"Error loading {self.engine.name} model: {e}")
+                raise
+
+    def warm_up(self) -> threading.Thread:
+        """Loads the zero-shot model in a background thread. Rules and keywords keep working meanwhile."""
+        def _warm():
+            try:
+                self._load_model()
+            except Exception:
+                pass # Status and error are recorded by _load_model
+
+        thread = threading.Thread(target=_warm, name="classifier-warmup", daemon=True)
+        thread.start()
+        return thread
 
     def reload_rules(self):
-        """Reloads classification rules from the database."""
+        """Reloads all classification rules from the database into the rule index."""
         try:
             db = SessionLocal()
-            rules = db.query(ClassificationRule).all()
-            self.rules = rules
+            rules = db.query(ClassificationRule).order_by(ClassificationRule.id).all()
+            self.rule_index.load(rules)
             print(f"Loaded {len(rules)} classification rules.")
             db.close()
         except Exception as e:
             print(f"Error loading rules: {e}")
-            self.rules = []
+            self.rule_index.load([])
 
     def learn_correction(self, description: str, category: str):
         """
@@ -98,19 +126,20 @@ class TransactionClassifier:
             
             if existing_rule:
                 existing_rule.category = category
+                rule = existing_rule
             else:
-                new_rule = ClassificationRule(
+                rule = ClassificationRule(
                     pattern=description,
                     category=category,
                     match_type="exact" # Default to exact match for corrections to be safe
                 )
-                db.add(new_rule)
+                db.add(rule)
             
             db.commit()
+            # Update the in-memory index for this rule only, instead of reloading the table
+            self.rule_index.upsert(rule.id, rule.pattern, rule.category, rule.match_type)
             db.close()
-            
-            # Reload rules
-            self.reload_rules()
+            self.cache.invalidate(description)
             return True
         except Exception as e:
             print(f"Error learning correction: {e}")
@@ -120,9 +149,51 @@ class TransactionClassifier:
         """
         Classify a batch of transaction descriptions.
         """
-        if not texts:
-            return []
-            
+        results, texts_to_predict, indices_to_predict = self._classify_known(texts)
+        new_entries = {}
+
+        # 2. LLM Fallback (If API Key provided)
+        if texts_to_predict and api_key:
+            try:
+                # Import here to avoid circular dependency at module level
+                from services.llm_service import classify_transactions_with_llm
+
+                print(f"Falling back to LLM for {len(texts_to_predict)} transactions...")
+                llm_categories = classify_transactions_with_llm(texts_to_predict, api_key, base_url)
+                new_entries = self._apply_llm(results, texts_to_predict, indices_to_predict, llm_categories)
+                # Clear texts_to_predict as they are now handled
+                texts_to_predict, indices_to_predict = [], []
+            except Exception as e:
+                print(f"LLM Fallback failed: {e}")
+                # Fall through to CrossEncoder if LLM fails
+
+        return self._predict_rest(results, texts_to_predict, indices_to_predict, new_entries)
+
+    async def aclassify_batch(self, texts: List[str], api_key: str = None, base_url: str = None) -> List[str]:
+        """
+        classify_batch for the event loop: rule, keyword and cache lookups and
+        zero-shot inference run on the blocking executor, while the LLM fallback
+        is awaited on the loop instead of holding an executor thread.
+        """
+        results, texts_to_predict, indices_to_predict = await run_blocking(self._classify_known, texts)
+        new_entries = {}
+        if texts_to_predict and api_key:
+            try:
+                from services.llm_service import aclassify_transactions_with_llm
+
+                print(f"Falling back to LLM for {len(texts_to_predict)} transactions...")
+                llm_categories = await aclassify_transactions_with_llm(texts_to_predict, api_key, base_url)
+                new_entries = self._apply_llm(results, texts_to_predict, indices_to_predict, llm_categories)
+                texts_to_predict, indices_to_predict = [], []
+            except Exception as e:
+                print(f"LLM Fallback failed: {e}")
+        return await run_blocking(self._predict_rest, results, texts_to_predict, indices_to_predict, new_entries)
+
+    def _classify_known(self, texts: List[str]) -> Tuple[List[Optional[str]], List[str], List[int]]:
+        """
+        Custom rules, keywords and cached results. Returns the results so far
+        (None where undecided) and the texts, with their indices, still to classify.
+        """
         results = [None] * len(texts) # Initialize results with None placeholders
         texts_to_predict = []
         indices_to_predict = []
@@ -132,101 +203,74 @@ class TransactionClassifier:
                 results[i] = "Miscellaneous"
                 continue
 
-            match_found = False
             text_upper = text.upper()
             
             # 0. Check Custom Rules (Highest Priority)
-            for rule in self.rules:
-                if rule.match_type == "exact":
-                    if rule.pattern.upper() == text_upper:
-                        results[i] = rule.category
-                        match_found = True
-                        break
-                elif rule.match_type == "contains":
-                    if rule.pattern.upper() in text_upper:
-                        results[i] = rule.category
-                        match_found = True
-                        break
-            
-            if match_found:
+            category = self.rule_index.match(text_upper)
+            if category is not None:
+                results[i] = category
                 continue
 
-            # 1. Fast Keyword Matching
-            for category, keywords in self.keyword_map.items():
-                for keyword in keywords:
-                    # Use regex word boundary for short keywords (<= 3 chars) to avoid false positives (e.g. ETF in NETFLIX)
-                    if len(keyword) <= 3:
-                        # Escape keyword just in case, though they are mostly alphanumeric
-                        pattern = r'\b' + re.escape(keyword) + r'\b'
-                        if re.search(pattern, text_upper):
-                            results[i] = category
-                            match_found = True
-                            break
-                    else:
-                        # Standard substring match for longer keywords
-                        if keyword in text_upper:
-                            results[i] = category
-                            match_found = True
-                            break
-                if match_found:
-                    break
-            
-            if not match_found:
-                texts_to_predict.append(text)
-                indices_to_predict.append(i)
-        
-        # 2. LLM Fallback (If API Key provided)
-        if texts_to_predict and api_key:
-            try:
-                # Import here to avoid circular dependency at module level
-                from services.llm_service import classify_transactions_with_llm
-                
-                print(f"Falling back to LLM for {len(texts_to_predict)} transactions...")
-                llm_categories = classify_transactions_with_llm(texts_to_predict, api_key, base_url)
-                
-                for idx, category in enumerate(llm_categories):
-                    original_idx = indices_to_predict[idx]
-                    results[original_idx] = category
-                    
-                # Clear texts_to_predict as they are now handled
-                texts_to_predict = []
-                indices_to_predict = []
-                
-            except Exception as e:
-                print(f"LLM Fallback failed: {e}")
-                # Fall through to CrossEncoder if LLM fails
-        
-        # 3. Batch CrossEncoder Prediction for remaining (if any)
+            # 1. Fast Keyword Matching (single pass over the text, first category in dict order wins)
+            category = self.keyword_matcher.best(text_upper)
+            if category is not None:
+                results[i] = category
+                continue
+
+            texts_to_predict.append(text)
+            indices_to_predict.append(i)
+
+        # Descriptions already classified by the LLM or CrossEncoder in an earlier batch
         if texts_to_predict:
-            pairs = []
-            for text in texts_to_predict:
-                for category in self.categories:
-                    pairs.append([text, f"This transaction is for {category}."])
-            
-            # Predict scores (N, 3)
-            scores = self.model.predict(pairs, batch_size=32, show_progress_bar=False) # Changed show_progress_bar to False for cleaner output
-            
-            # Reshape to (Num_Texts, Num_Categories, 3)
-            num_categories = len(self.categories)
-            scores_reshaped = scores.reshape(len(texts_to_predict), num_categories, 3)
-            
-            # Extract entailment scores (index 1) -> (Num_Texts, Num_Categories)
-            entailment_scores = scores_reshaped[:, :, 1]
-            
-            # Find max score index for each text
-            max_indices = entailment_scores.argmax(axis=1)
-            
-            for idx, max_score_idx in enumerate(max_indices):
-                best_category = self.categories[max_score_idx]
+            cached = self.cache.get_many(normalize_description(t) for t in texts_to_predict)
+            remaining_texts, remaining_indices = [], []
+            for text, original_idx in zip(texts_to_predict, indices_to_predict):
+                hit = cached.get(normalize_description(text))
+                if hit is not None:
+                    results[original_idx] = hit[0]
+                else:
+                    remaining_texts.append(text)
+                    remaining_indices.append(original_idx)
+            texts_to_predict, indices_to_predict = remaining_texts, remaining_indices
+        return results, texts_to_predict, indices_to_predict
+
+    def _apply_llm(self, results: List[Optional[str]], texts: List[str], indices: List[int],
+                   llm_categories: List[str]) -> dict:
+        """Fills in the LLM's categories; returns the cache entries to store for them."""
+        new_entries = {}
+        for idx, category in enumerate(llm_categories):
+            results[indices[idx]] = category
+            # 'Others' is also what the LLM helper returns on failure, so don't cache it
+            if category and category != "Others":
+                new_entries[normalize_description(texts[idx])] = (category, "llm")
+        return new_entries
+
+    def _predict_rest(self, results: List[Optional[str]], texts_to_predict: List[str], indices_to_predict: List[int],
+                      new_entries: dict) -> List[str]:
+        """3. Batch zero-shot prediction (CrossEncoder or bi-encoder) for what is left, then caches the new results."""
+        if texts_to_predict:
+            try:
+                self.model
+            except Exception:
+                # Model unavailable: don't fail the whole batch, and don't cache the fallback
+                for original_idx in indices_to_predict:
+                    results[original_idx] = "Miscellaneous"
+                self.cache.put_many(new_entries)
+                return results
+
+            predicted = self.engine.predict(texts_to_predict)
+            for idx, best_category in enumerate(predicted):
                 original_idx = indices_to_predict[idx]
                 results[original_idx] = best_category
-                
+                new_entries[normalize_description(texts_to_predict[idx])] = (best_category, "zero_shot")
+
+        self.cache.put_many(new_entries)
         return results
 
     def classify(self, description: str) -> str:
         """
         Classify a single transaction description.
-        Uses keyword matching first, then falls back to Zero-Shot CrossEncoder.
+        Uses keyword matching first, then falls back to the zero-shot engine.
         """
         return self.classify_batch([description])[0]
 
@@ -0,0 +1,17 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Bounded pool for blocking work called from async endpoints (model inference,
+# vector store ingestion/retrieval, large prompt formatting), so it never runs
+# on the event loop and can't grow an unbounded number of threads.
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "4"))
+
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Runs `func(*args, **kwargs)` on the bounded blocking executor and awaits the result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,148 @@
+import calendar
+import os
+import re
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from services.aggregation import TransactionFrame
+from services.chunking import count_tokens
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+_YEAR_MONTH_RE = re.compile(r"\b((?:19|20)\d{2})-(\d{2})\b")
+
+_MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3, "apr": 4, "april": 4,
+    "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7, "aug": 8, "august": 8,
+    "sep": 9, "sept": 9, "september": 9, "oct": 10, "october": 10, "nov": 11, "november": 11,
+    "dec": 12, "december": 12,
+}
+
+_STOPWORDS = {
+    "the", "and", "for", "how", "much", "many", "did", "does", "spend", "spent", "what", "was", "were",
+    "with", "from", "this", "that", "last", "month", "year", "all", "any", "have", "had", "show",
+    "list", "total", "money", "transaction", "transactions", "are", "can", "you", "your", "about",
+}
+
+
+def _words(text: str) -> Set[str]:
+    # Trailing "s" dropped on both sides so "groceries"/"Groceries" and "coffees"/"COFFEE" meet
+    return {word.rstrip("s") or word for word in _WORD_RE.findall(str(text).casefold())}
+
+
+def format_transaction(t: dict) -> str:
+    return f"- {t['date']}: {t['merchant']} ({t['category']}) - ${t['amount']}"
+
+
+class ContextSelector:
+    """
+    Picks the raw transactions worth showing the chat model for a query, within
+    a token budget (CHAT_CONTEXT_TOKENS, default 3000).
+
+    Rows are ranked by what the query mentions: the merchant or category (by
+    word) and the month or year ("June", "2024-06", "2024"); ties and queries
+    that mention none of these go to the most recent rows. The category and month
+    columns come from the request's TransactionFrame; merchants are matched once
+    per distinct merchant, not per row. Only the selected rows are formatted and
+    counted, so prompt size and selection cost don't grow with history; totals
+    and monthly figures for everything else come from the precomputed summaries.
+    """
+
+    def __init__(self, budget_tokens: int = None):
+        self.budget_tokens = budget_tokens or int(os.getenv("CHAT_CONTEXT_TOKENS", "3000"))
+
+    @staticmethod
+    def _query_months(query: str) -> Optional[Set[str]]:
+        """Month patterns ("2024-06", "*-06", "2024-*") named in the query, or None."""
+        text = query.casefold()
+        patterns = {f"{year}-{month}" for year, month in _YEAR_MONTH_RE.findall(text)}
+        text = _YEAR_MONTH_RE.sub(" ", text)
+        months = {_MONTHS[word] for word in _WORD_RE.findall(text) if word in _MONTHS and word != "may"}
+        # "may" is usually the verb; only count it next to a year
+        if re.search(r"\bmay\s+(?:19|20)\d{2}\b", text):
+            months.add(5)
+        years = set(_YEAR_RE.findall(text))
+        if months:
+            patterns |= {f"{year}-{month:02d}" for month in months for year in (years or {"*"})}
+        elif years:
+            patterns |= {f"{year}-*" for year in years}
+        return patterns or None
+
+    @classmethod
+    def date_range(cls, query: str) -> Optional[Tuple[int, int]]:
+        """
+        The YYYYMMDD span of the months or years the query names, for filtering
+        statement chunks; None unless every one of them comes with a year.
+        """
+        patterns = cls._query_months(query)
+        if not patterns or any(p.startswith("*") for p in patterns):
+            return None
+        starts, ends = [], []
+        for pattern in patterns:
+            year, _, month = pattern.partition("-")
+            first, last = (1, 12) if month == "*" else (int(month), int(month))
+            if not 1 <= last <= 12:
+                continue
+            starts.append(int(year) * 10000 + first * 100 + 1)
+            ends.append(int(year) * 10000 + last * 100 + calendar.monthrange(int(year), last)[1])
+        return (min(starts), max(ends)) if starts else None
+
+    @staticmethod
+    def _month_matches(month: str, patterns: Set[str]) -> bool:
+        year, _, number = month.partition("-")
+        return any(p == month or p == f"*-{number}" or p == f"{year}-*" for p in patterns)
+
+    def scores(self, query: str, frame: TransactionFrame) -> np.ndarray:
+        """Relevance per row: 2 per matching merchant or category, 1 for a matching month."""
+        words = {word for word in _words(query) if len(word) >= 3 and word not in _STOPWORDS and word not in _MONTHS}
+        score = np.zeros(frame.size, dtype=np.int32)
+        if words:
+            category_hit = np.array([bool(words & _words(c)) for c in frame.categories], dtype=bool)
+            if len(category_hit):
+                score += 2 * category_hit[frame.category]
+            merchant_hit = np.array([bool(words & _words(m)) for m in frame.merchants], dtype=bool)
+            if len(merchant_hit):
+                score += 2 * merchant_hit[frame.merchant]
+        patterns = self._query_months(query)
+        if patterns:
+            month_hit = np.array([bool(m) and self._month_matches(m, patterns) for m in frame.months], dtype=bool)
+            if len(month_hit):
+                score += month_hit[frame.month]
+        return score
+
+    def select(self, query: str, transactions: List[dict], frame: TransactionFrame = None) -> List[dict]:
+        """Transactions to show, most relevant first, then newest first, within the token budget."""
+        if not transactions:
+            return []
+        frame = frame or TransactionFrame(transactions)
+        score = self.scores(query, frame)
+        # Rank of each row's date (YYYY-MM-DD sorts chronologically; undated rows last)
+        date_rank = np.empty(len(frame.dates), dtype=np.int64)
+        date_rank[sorted(range(len(frame.dates)), key=lambda i: frame.dates[i] or "")] = np.arange(len(frame.dates))
+        order = np.lexsort((-date_rank[frame.date], -score))
+
+        selected, used = [], 0
+        for i in order:
+            t = transactions[i]
+            try:
+                cost = count_tokens(format_transaction(t)) + 1
+            except KeyError:
+                continue
+            if used + cost > self.budget_tokens:
+                continue
+            selected.append(t)
+            used += cost
+        return selected
+
+    def context(self, query: str, transactions: List[dict], frame: TransactionFrame = None) -> str:
+        """The selected rows as prompt lines, with a note when rows were left out."""
+        selected = self.select(query, transactions, frame)
+        lines = [format_transaction(t) for t in selected]
+        if len(selected) < len(transactions):
+            lines.append(f"({len(selected)} of {len(transactions)} transactions shown: those matching the query, "
+                         "most recent first. Use the Financial Summary and Monthly Breakdown for totals.)")
+        return "\n".join(lines)
+
+
+context_selector = ContextSelector()
@@ -0,0 +1,46 @@
+import datetime
+from typing import List, Optional, Union
+
+from sqlalchemy import select
+
+import models
+from database import SessionLocal
+from services.migrations import posted_on
+
+# Columns the analysis endpoints read; descriptions and flags stay in the database
+ANALYSIS_COLUMNS = ("id", "date", "merchant", "amount", "type", "category")
+
+
+def _as_date(value: Union[datetime.date, str], name: str) -> datetime.date:
+    if isinstance(value, datetime.date):
+        return value
+    parsed = posted_on(value)
+    if parsed is None or len(value) != 10:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date")
+    return parsed
+
+
+def load_transactions(date_from: Optional[Union[datetime.date, str]] = None,
+                      date_to: Optional[Union[datetime.date, str]] = None,
+                      categories: Optional[List[str]] = None) -> List[dict]:
+    """
+    Stored transactions as plain dicts with only ANALYSIS_COLUMNS, optionally
+    limited to a date range (inclusive, dates or YYYY-MM-DD strings; compared on
+    the typed posted_on column, so rows without a valid date fall outside any
+    range) and/or categories. One SELECT of tuples, no ORM objects; blocking, so
+    call it through run_blocking from async code. ValueError for a malformed date.
+    """
+    columns = [getattr(models.Transaction, name) for name in ANALYSIS_COLUMNS]
+    query = select(*columns)
+    if date_from:
+        query = query.where(models.Transaction.posted_on >= _as_date(date_from, "date_from"))
+    if date_to:
+        query = query.where(models.Transaction.posted_on <= _as_date(date_to, "date_to"))
+    if categories:
+        query = query.where(models.Transaction.category.in_(categories))
+
+    db = SessionLocal()
+    try:
+        return [dict(zip(ANALYSIS_COLUMNS, row)) for row in db.execute(query)]
+    finally:
+        db.close()
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    sentence-transformers model on CPU, loaded on first use and encoding in
+    batches. Vectors are L2-normalized, so Chroma's distances rank like cosine.
+    """
+
+    default_model = "sentence-transformers/all-MiniLM-L6-v2"
+
+    def __init__(self, model_name: str = None, batch_size: int = 64):
+        self.model_name = model_name or self.default_model
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._get_model().encode(
+            texts, batch_size=self.batch_size, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=False
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-hash cache in front of another Embeddings.
+
+    Vectors are appended to a float32 memory-mapped NumPy file (vectors.f32)
+    and their sha256 keys, one per line, to keys.txt in the same directory; the
+    row number is the line number. A vector is flushed before its key is
+    written, so a crash can only lose the tail, never misalign rows. Repeat
+    chunks and repeat chat queries are served from the file without encoding.
+    """
+
+    def __init__(self, inner: Embeddings, directory: str):
+        self.inner = inner
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._keys_path = os.path.join(directory, "keys.txt")
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self._keys_path):
+            return
+        with open(self._keys_path) as f:
+            lines = f.read().splitlines()
+        if not lines:
+            return
+        # First line records the vector width
+        self._dim = int(lines[0])
+        available = os.path.getsize(self._vectors_path) // (4 * self._dim) if os.path.exists(self._vectors_path) else 0
+        keys = lines[1:1 + available]
+        self._rows = {key: row for row, key in enumerate(keys)}
+        if keys:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(len(keys), self._dim))
+
+    def _append(self, keys: List[str], vectors: np.ndarray):
+        if self._dim is None:
+            self._dim = vectors.shape[1]
+            with open(self._keys_path, "w") as f:
+                f.write(f"{self._dim}\n")
+        start = len(self._rows)
+        with open(self._vectors_path, "r+b" if os.path.exists(self._vectors_path) else "wb") as f:
+            f.seek(start * 4 * self._dim)
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._keys_path, "a") as f:
+            f.write("".join(f"{key}\n" for key in keys))
+        for offset, key in enumerate(keys):
+            self._rows[key] = start + offset
+        # Re-map to cover the appended rows
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(len(self._rows), self._dim))
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            missing = {key: text for key, text in zip(keys, texts) if key not in self._rows}
+            self.hits += len(texts) - sum(1 for key in keys if key in missing)
+            self.misses += len(missing)
+
+        if missing:
+            fresh = np.asarray(self.inner.embed_documents(list(missing.values())), dtype=np.float32)
+            with self._lock:
+                # Another thread may have stored some of these meanwhile
+                new = [(key, vector) for key, vector in zip(missing, fresh) if key not in self._rows]
+                if new:
+                    self._append([key for key, _ in new], np.stack([vector for _, vector in new]))
+            fresh_by_key = dict(zip(missing, fresh))
+        else:
+            fresh_by_key = {}
+
+        with self._lock:
+            vectors = self._vectors
+            rows = self._rows
+            return [
+                fresh_by_key[key].tolist() if key in fresh_by_key else vectors[rows[key]].tolist()
+                for key in keys
+            ]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._rows),
+                "dim": self._dim,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", text)
+
+
+def create_embeddings(api_key: Optional[str]) -> Tuple[Embeddings, str]:
+    """
+    Embeddings for the vector store, selected by EMBEDDINGS_BACKEND:
+    `openai` (default, OpenAIEmbeddings) or `local` (sentence-transformers on CPU,
+    EMBEDDINGS_MODEL overrides the model; no network needed once the model is on disk).
+    Unless EMBEDDINGS_CACHE=0, results are cached under EMBEDDINGS_CACHE_DIR, one
+    directory per backend/model. Returns (embeddings, namespace), the namespace naming
+    the backend and model, since vectors from different models can't be mixed.
+    """
+    backend = os.getenv("EMBEDDINGS_BACKEND", "openai")
+    if backend == "local":
+        inner = LocalEmbeddings(os.getenv("EMBEDDINGS_MODEL") or None)
+        namespace = f"local-{inner.model_name}"
+    elif backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        # Note: For Azure OpenAI Embeddings, you might need AzureOpenAIEmbeddings.
+        # Chunks are <= 300 chars, so the tiktoken length check isn't needed.
+        inner = OpenAIEmbeddings(api_key=api_key, check_embedding_ctx_length=False)
+        namespace = f"openai-{inner.model}"
+    else:
+        raise ValueError(f"Unknown EMBEDDINGS_BACKEND '{backend}'. Choose one of: openai, local")
+
+    namespace = _slug(namespace)
+    if os.getenv("EMBEDDINGS_CACHE", "1") == "0":
+        return inner, namespace
+    directory = os.path.join(os.getenv("EMBEDDINGS_CACHE_DIR", "./embedding_cache"), namespace)
+    return CachedEmbeddings(inner, directory), namespace
@@ -0,0 +1,73 @@
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from services.concurrency import run_blocking
+
+
+class IngestionJobs:
+    """
+    RAG ingestion of uploaded statements as asyncio tasks, so it overlaps with
+    transaction extraction instead of running before it.
+
+    `start()` launches ingestion on the blocking executor and returns the task,
+    which resolves to the job status and never raises: {"upload_id", "status":
+    "done", "chunks", "added", ...} or {"upload_id", "status": "failed", "error"}.
+    Statuses of the last `max_jobs` uploads stay queryable by upload_id, which is
+    how callers that don't wait for ingestion (the /analyze default) check on it.
+    """
+
+    def __init__(self, ingest: Callable = None, max_jobs: int = 1000):
+        self._ingest = ingest
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        # Strong references to running tasks by upload_id: the loop only keeps weak ones
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _run_ingest(self, text_lines: List[str], api_key: str, upload_id: str) -> dict:
+        if self._ingest is not None:
+            return self._ingest(text_lines, api_key, upload_id)
+        from services.vector_store import statement_store
+        return statement_store.ingest(text_lines, api_key, upload_id=upload_id)
+
+    def _record(self, upload_id: str, status: dict):
+        self._jobs[upload_id] = status
+        self._jobs.move_to_end(upload_id)
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+    async def _run(self, text_lines: List[str], api_key: str, upload_id: str) -> dict:
+        try:
+            result = await run_blocking(self._run_ingest, text_lines, api_key, upload_id)
+            print(f"Ingested {result['added']} new chunks into Vector Store ({result['skipped']} already stored).")
+            status = {"upload_id": upload_id, "status": "done", **result}
+        except Exception as e:
+            print(f"Error ingesting documents: {e}")
+            status = {"upload_id": upload_id, "status": "failed", "error": str(e)}
+        self._record(upload_id, status)
+        return status
+
+    def start(self, text_lines: List[str], api_key: str, upload_id: str) -> asyncio.Task:
+        """Starts ingesting in the background; must be called from the event loop."""
+        self._record(upload_id, {"upload_id": upload_id, "status": "running"})
+        task = asyncio.create_task(self._run(text_lines, api_key, upload_id))
+        self._tasks[upload_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(upload_id, None))
+        return task
+
+    def status(self, upload_id: str) -> Optional[dict]:
+        return self._jobs.get(upload_id)
+
+    async def wait(self, upload_id: str) -> Optional[dict]:
+        """The final status of an upload's ingestion, waiting for it if it is still running."""
+        task = self._tasks.get(upload_id)
+        if task is not None:
+            return await asyncio.shield(task)
+        return self.status(upload_id)
+
+
+# Whether /analyze returns as soon as extraction is done, leaving ingestion running
+ANALYZE_DEFER_INGEST = os.getenv("ANALYZE_DEFER_INGEST", "1") != "0"
+
+ingestion_jobs = IngestionJobs()
@@ -0,0 +1,127 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def _is_word_char(ch: str) -> bool:
+    # Mirrors the `\w` class used by `re` for str patterns.
+    return ch.isalnum() or ch == "_"
+
+
+def _at_boundary(text: str, pos: int, text_len: int) -> bool:
+    # Same semantics as `\b`: a word char on exactly one side of `pos`.
+    before = pos > 0 and _is_word_char(text[pos - 1])
+    after = pos < text_len and _is_word_char(text[pos])
+    return before != after
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of upper-case keywords.
+
+    Every keyword carries a rank and a value. `best(text)` scans the text once
+    and returns the value of the lowest-ranked keyword found in it, so callers
+    can encode "first category in dict order wins" as the rank.
+
+    Keywords of `boundary_max_len` characters or fewer only match on word
+    boundaries (equivalent to `\\b<keyword>\\b`), which keeps short tokens like
+    ETF from matching inside NETFLIX.
+    """
+
+    def __init__(self, boundary_max_len: int = 3):
+        self.boundary_max_len = boundary_max_len
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (rank, length, needs_boundary, value) for keywords ending there.
+        self._own: List[List[Tuple[int, int, bool, Any]]] = [[]]
+        # Same, merged along failure links and sorted by rank; filled by build().
+        self._out: List[List[Tuple[int, int, bool, Any]]] = [[]]
+        self._built = False
+
+    @classmethod
+    def from_keyword_map(cls, keyword_map: Dict[str, List[str]], boundary_max_len: int = 3) -> "KeywordMatcher":
+        """Builds a matcher where each category's rank is its position in the dict."""
+        matcher = cls(boundary_max_len=boundary_max_len)
+        for rank, (category, keywords) in enumerate(keyword_map.items()):
+            for keyword in keywords:
+                matcher.add(keyword, rank, category)
+        matcher.build()
+        return matcher
+
+    def add(self, keyword: str, rank: int, value: Any, boundary: Optional[bool] = None):
+        """Adds a keyword. `boundary` defaults to the short-keyword rule."""
+        if not keyword:
+            return
+        if boundary is None:
+            boundary = len(keyword) <= self.boundary_max_len
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append([])
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._own[state].append((rank, len(keyword), boundary, value))
+        self._built = False
+
+    def build(self):
+        """Computes failure links (BFS) and merges outputs along them."""
+        self._out = [list(outputs) for outputs in self._own]
+        queue = list(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target
+                self._out[nxt] = self._out[nxt] + self._out[target]
+        for outputs in self._out:
+            outputs.sort(key=lambda o: o[0])
+        self._built = True
+
+    def best(self, text: str) -> Optional[Any]:
+        """Returns the value of the lowest-ranked keyword occurring in `text`, or None."""
+        hit = self.best_with_rank(text)
+        return hit[1] if hit is not None else None
+
+    def best_with_rank(self, text: str) -> Optional[Tuple[int, Any]]:
+        """Like `best`, but returns `(rank, value)` so callers can merge with other sources."""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        best_rank = None
+        best_value = None
+        state = 0
+        text_len = len(text)
+        for end, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            outputs = out[state]
+            if not outputs:
+                continue
+            for rank, length, boundary, value in outputs:
+                if best_rank is not None and rank >= best_rank:
+                    break
+                if boundary and not (_at_boundary(text, end - length + 1, text_len)
+                                     and _at_boundary(text, end + 1, text_len)):
+                    continue
+                best_rank = rank
+                best_value = value
+                break
+            if best_rank == 0:
+                break
+        if best_rank is None:
+            return None
+        return best_rank, best_value
+
+    def match_batch(self, texts: Iterable[str]) -> List[Optional[Any]]:
+        return [self.best(text) for text in texts]
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+
+def make_key(*parts) -> str:
+    """Content address for an LLM call: sha256 over the JSON of everything that shapes the answer."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    On-disk cache of LLM results, keyed by content hash (see `make_key`).
+
+    Kept in its own SQLite file (LLM_CACHE_PATH, default ./llm_cache.db) rather
+    than sql_app.db because values are whole structured outputs. When the stored
+    values exceed LLM_CACHE_MAX_MB the least recently used entries are evicted
+    down to 90% of the limit. LLM_CACHE_MAX_MB=0 disables the cache.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        self.path = path or os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._conn = None
+        self._total_bytes = 0
+        if self.max_bytes <= 0:
+            return
+        try:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value TEXT NOT NULL,"
+                " size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+            conn.commit()
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            self._conn = conn
+        except Exception as e:
+            print(f"LLM cache: disabled ({e})")
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def get(self, namespace: str, key: str) -> Optional[object]:
+        return self.get_many(namespace, [key]).get(key)
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, object]:
+        """Returns {key: value} for every cached key; the rest count as misses."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        if self.enabled and keys:
+            with self._lock:
+                try:
+                    for i in range(0, len(keys), 500):
+                        batch = keys[i:i + 500]
+                        placeholders = ",".join("?" * len(batch))
+                        rows = self._conn.execute(
+                            f"SELECT key, value FROM llm_cache WHERE key IN ({placeholders})", batch
+                        ).fetchall()
+                        found.update((key, json.loads(value)) for key, value in rows)
+                    if found:
+                        now = time.time()
+                        self._conn.executemany(
+                            "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", [(now, key) for key in found]
+                        )
+                        self._conn.commit()
+                except Exception as e:
+                    print(f"LLM cache: read failed ({e})")
+        with self._lock:
+            counters = self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "writes": 0})
+            counters["hits"] += len(found)
+            counters["misses"] += len(keys) - len(found)
+        return found
+
+    def put(self, namespace: str, key: str, value):
+        self.put_many(namespace, {key: value})
+
+    def put_many(self, namespace: str, entries: Dict[str, object]):
+        if not self.enabled or not entries:
+            return
+        now = time.time()
+        rows = []
+        for key, value in entries.items():
+            encoded = json.dumps(value)
+            rows.append((key, namespace, encoded, len(encoded), now))
+        with self._lock:
+            try:
+                replaced = self._sizes([row[0] for row in rows])
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO llm_cache (key, namespace, value, size, accessed_at) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._total_bytes += sum(row[3] for row in rows) - replaced
+                if self._total_bytes > self.max_bytes:
+                    self._evict(int(self.max_bytes * 0.9))
+                self._conn.commit()
+                counters = self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "writes": 0})
+                counters["writes"] += len(rows)
+            except Exception as e:
+                self._conn.rollback()
+                print(f"LLM cache: write failed ({e})")
+
+    def clear(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = {}
+            for namespace, counters in self._stats.items():
+                lookups = counters["hits"] + counters["misses"]
+                namespaces[namespace] = {
+                    **counters,
+                    "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+                }
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] if self.enabled else 0
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "namespaces": namespaces,
+            }
+
+    def _sizes(self, keys) -> int:
+        total = 0
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            total += self._conn.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM llm_cache WHERE key IN ({placeholders})", batch
+            ).fetchone()[0]
+        return total
+
+    def _evict(self, target_bytes: int):
+        # Walk entries oldest-access first until enough bytes are freed
+        to_free = self._total_bytes - target_bytes
+        victims, freed = [], 0
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at"):
+            if freed >= to_free:
+                break
+            victims.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+        self._total_bytes -= freed
+        print(f"LLM cache: evicted {len(victims)} entries ({freed} bytes)")
+
+
+llm_cache = LLMCache()
@@ -1,17 +1,29 @@
+import asyncio
 import os
+import threading
+import time
+import weakref
 from typing import List, Optional
-from langchain_openai import ChatOpenAI, AzureChatOpenAI, OpenAIEmbeddings
+import httpx
+from langchain_openai import ChatOpenAI, AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
+from langchain_core.runnables import RunnableLambda
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+from services.concurrency import run_blocking
+from services.llm_cache import llm_cache, make_key
+from services.statement_parser import parse_statement
+from services.aggregation import EXPENSE, INCOME, TransactionFrame
+from services.anomaly_detector import anomaly_detector
+from services.savings_simulator import savings_simulator
+from services.chunking import chunker, count_tokens
+from services.context_selector import context_selector
+from services.transaction_merge import OrderedChunkMerger, in_statement_order
+from services.vector_store import statement_store
 
 load_dotenv()
 
-# Global Vector Store (In-memory for POC)
-vector_store = None
+LLM_MODEL = "gpt-4o"
 
 # --- Pydantic Models for Structured Output ---
 
@@ -75,77 +87,140 @@ class SavingsScenario(BaseModel):
     impact_description: str = Field(description="Natural language explanation of the impact (e.g., 'You will reach your Car goal 3 months earlier').")
     trade_off_suggestion: str = Field(description="A suggestion on how to achieve this saving (e.g., 'This is equivalent to cutting 2 dinners out per month').")
 
+class SweepPoint(BaseModel):
+    extra_savings: float = Field(description="The extra amount saved per month.")
+    strategy: str = Field(description="How the extra amount is split across goals: 'even' or 'nearest_deadline'.")
+    new_deadlines: List[GoalDeadline] = Field(description="List of goals with updated deadlines.")
+
+class SavingsSweep(BaseModel):
+    goals: List[str] = Field(description="Names of the goals still to be reached, in request order.")
+    points: List[SweepPoint] = Field(description="One projection per strategy and extra amount.")
+
+class TradeOffSuggestion(BaseModel):
+    trade_off_suggestion: str = Field(description="A suggestion on how to achieve this saving (e.g., 'This is equivalent to cutting 2 dinners out per month').")
+
 class CategoryList(BaseModel):
     categories: List[str] = Field(description="List of categories corresponding to the input descriptions.")
 
 
 # --- Helper Functions ---
 
-def get_llm(api_key: str, base_url: Optional[str] = None, temperature: float = 0):
+# Process-wide LLM clients. Building a ChatOpenAI creates an OpenAI SDK client, an SSL
+# context and a fresh connection pool, so clients are built once per (endpoint, key, model,
+# temperature) and share one tuned keep-alive pool. The SDK retries connection errors,
+# timeouts, 408/409/429 and 5xx with jittered exponential backoff (0.5s doubling to 8s,
+# honoring Retry-After).
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+
+_llm_clients = {}
+_llm_clients_lock = threading.Lock()
+_http_clients = None
+
+class _PerLoopTransport(httpx.AsyncBaseTransport):
     """
-    Returns a configured ChatOpenAI or AzureChatOpenAI instance.
+    Async transport with one connection pool per running event loop. Pooled
+    connections belong to the loop that opened them, so one pool shared by
+    successive asyncio.run calls (or loops in other threads) would hand out
+    sockets of a closed loop. Pools of closed loops are dropped.
     """
-    if base_url and "azure" in base_url:
-        return AzureChatOpenAI(
-            azure_endpoint=base_url.split("/openai")[0],
-            api_key=api_key,
-            api_version="2025-01-01-preview", # Update as needed
-            deployment_name="gpt-4o", # Update as needed
-            temperature=temperature
+
+    def __init__(self, limits: httpx.Limits):
+        self._limits = limits
+        self._pools = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _pool(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                for closed in [other for other in self._pools if other.is_closed()]:
+                    del self._pools[closed]
+                pool = self._pools[loop] = httpx.AsyncHTTPTransport(limits=self._limits)
+            return pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._pool().handle_async_request(request)
+
+    async def aclose(self):
+        with self._lock:
+            pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+def _shared_http_clients():
+    global _http_clients
+    if _http_clients is None:
+        limits = httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE, keepalive_expiry=60)
+        timeout = httpx.Timeout(LLM_TIMEOUT, connect=10.0)
+        _http_clients = (
+            httpx.Client(limits=limits, timeout=timeout),
+            # Built once but not tied to a loop: the transport keeps a pool per loop
+            httpx.AsyncClient(transport=_PerLoopTransport(limits), timeout=timeout),
         )
-    else:
-        # Default to standard OpenAI if no base_url or not azure
-        return ChatOpenAI(
+    return _http_clients
+
+def get_llm(api_key: str, base_url: Optional[str] = None, temperature: float = 0):
+    """
+    Returns a configured ChatOpenAI or AzureChatOpenAI instance, shared across
+    calls with the same endpoint, key, model and temperature.
+    """
+    key = (base_url or "", api_key, LLM_MODEL, temperature)
+    llm = _llm_clients.get(key)
+    if llm is not None:
+        return llm
+
+    with _llm_clients_lock:
+        llm = _llm_clients.get(key)
+        if llm is not None:
+            return llm
+        http_client, http_async_client = _shared_http_clients()
+        common = dict(
             api_key=api_key,
-            base_url=base_url if base_url else "https://api.openai.com/v1",
-            model="gpt-4o",
-            temperature=temperature
+            temperature=temperature,
+            timeout=LLM_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=http_client,
+            http_async_client=http_async_client,
         )
-
-def ingest_documents(text_lines: List[str], api_key: str):
-    global vector_store
-    
+        if base_url and "azure" in base_url:
+            llm = AzureChatOpenAI(
+                azure_endpoint=base_url.split("/openai")[0],
+                api_version="2025-01-01-preview", # Update as needed
+                deployment_name=LLM_MODEL, # Update as needed
+                **common
+            )
+        else:
+            # Default to standard OpenAI if no base_url or not azure
+            llm = ChatOpenAI(
+                base_url=base_url if base_url else "https://api.openai.com/v1",
+                model=LLM_MODEL,
+                **common
+            )
+        _llm_clients[key] = llm
+        return llm
+
+def ingest_documents(text_lines: List[str], api_key: str, upload_id: Optional[str] = None) -> Optional[dict]:
+    """
+    Adds the statement text to the persistent vector store for chat retrieval.
+    Only chunks not stored before are embedded. Returns the ingestion summary, or None on failure.
+    """
     if not text_lines:
-        return
+        return None
 
     try:
-        text = "\n".join(text_lines)
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=20)
-        docs = [Document(page_content=x) for x in text_splitter.split_text(text)]
-        
-        # Note: For Azure OpenAI Embeddings, you might need AzureOpenAIEmbeddings
-        # For this POC, we assume standard OpenAIEmbeddings or compatible
-        embeddings = OpenAIEmbeddings(api_key=api_key)
-        
-        # Initialize or update vector store
-        vector_store = Chroma.from_documents(documents=docs, embedding=embeddings)
-        print(f"Ingested {len(docs)} chunks into Vector Store.")
-        
+        result = statement_store.ingest(text_lines, api_key, upload_id=upload_id)
+        print(f"Ingested {result['added']} new chunks into Vector Store ({result['skipped']} already stored).")
+        return result
     except Exception as e:
         print(f"Error ingesting documents: {e}")
+        return None
 
-def extract_transactions_from_text(text_lines: List[str], api_key: str, base_url: str = "https://api.openai.com/v1") -> dict:
-    if len(text_lines) == 0:
-        return {"transactions": [], "closing_balance": 0.0}
+EXTRACTION_MAX_CONCURRENCY = 5
 
-    llm = get_llm(api_key, base_url, temperature=0)
-    
-    # Chunking configuration
-    CHUNK_SIZE = 300
-    OVERLAP = 30
-    
-    chunks = []
-    for i in range(0, len(text_lines), CHUNK_SIZE - OVERLAP):
-        chunk = text_lines[i:i + CHUNK_SIZE]
-        chunks.append(chunk)
-        
-    print(f"Split text into {len(chunks)} chunks.")
-    
-    all_transactions = []
-    closing_balance = 0.0
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an expert financial data extractor. Extract structured transaction data from the provided bank statement segment.
+EXTRACTION_SYSTEM_PROMPT = """You are an expert financial data extractor. Extract structured transaction data from the provided bank statement segment.
 
 CRITICAL INSTRUCTIONS:
 1. **EXHAUSTIVENESS**: Extract EVERY single transaction line item in this segment.
@@ -156,57 +231,58 @@ CRITICAL INSTRUCTIONS:
    - **IMPORTANT:** If a transaction has values in both 'Withdrawal' and 'Deposit' columns (rare), prioritize the non-zero value.
 4. **REASONING**: Provide a brief reasoning.
 
-Return a JSON object with 'transactions' and 'closing_balance'."""),
+Return a JSON object with 'transactions' and 'closing_balance'."""
+
+# Anything that changes what the extraction chain returns for the same chunk text
+_EXTRACTION_FINGERPRINT = make_key(LLM_MODEL, EXTRACTION_SYSTEM_PROMPT, StatementAnalysis.model_json_schema())
+
+def _build_extraction_chain(api_key: str, base_url: str):
+    llm = get_llm(api_key, base_url, temperature=0)
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", EXTRACTION_SYSTEM_PROMPT),
         ("user", "{text}")
     ])
 
-    chain = prompt | llm.with_structured_output(StatementAnalysis)
+    return _timed_extraction(prompt | llm.with_structured_output(StatementAnalysis))
 
-    from concurrent.futures import ThreadPoolExecutor, as_completed
+def _timed_extraction(chain):
+    # Feeds each chunk's latency back into the chunker (timed per call, so queueing under max_concurrency isn't counted)
+    def invoke(inputs):
+        start = time.perf_counter()
+        result = chain.invoke(inputs)
+        chunker.observe(count_tokens(inputs["text"]), time.perf_counter() - start)
+        return result
 
-    def process_chunk(index, chunk_lines):
-        chunk_text = "\n".join(chunk_lines)
-        try:
-            msg = f"Processing Chunk {index+1}/{len(chunks)} ({len(chunk_lines)} lines)..."
-            print(msg)
-            with open("backend_debug.log", "a") as f:
-                f.write(f"{msg}\n")
-            
-            result = chain.invoke({"text": chunk_text})
-            return result.model_dump()
-        except Exception as e:
-            print(f"Error processing chunk {index+1}: {e}")
-            with open("backend_debug.log", "a") as f:
-                f.write(f"Error in chunk {index+1}: {str(e)}\n")
-            return None
-
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_chunk = {executor.submit(process_chunk, i, chunk): i for i, chunk in enumerate(chunks)}
-        
-        for future in as_completed(future_to_chunk):
-            data = future.result()
-            if data:
-                chunk_txs = data.get('transactions', [])
-                print(f"  Found {len(chunk_txs)} transactions in a chunk.")
-                all_transactions.extend(chunk_txs)
-                
-                # Update closing balance if found and non-zero
-                cb = data.get('closing_balance', 0.0)
-                if cb != 0.0:
-                    closing_balance = cb
-
-    # Deduplicate transactions based on date+description+amount
-    unique_transactions = []
-    seen = set()
-    for t in all_transactions:
-        # Create a unique key
-        key = f"{t['date']}|{t['description']}|{t['amount']}"
-        if key not in seen:
-            seen.add(key)
-            unique_transactions.append(t)
-            
-    print(f"Total unique transactions: {len(unique_transactions)}")
+    async def ainvoke(inputs):
+        start = time.perf_counter()
+        result = await chain.ainvoke(inputs)
+        chunker.observe(count_tokens(inputs["text"]), time.perf_counter() - start)
+        return result
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+def _extraction_cache_key(chunk_text: str) -> str:
+    return make_key(_EXTRACTION_FINGERPRINT, chunk_text)
+
+def _chunk_lines(text_lines: List[str]) -> List[List[str]]:
+    # Token-budgeted chunks cut at transaction rows (no overlap); the budget follows observed latency
+    chunks = chunker.split(text_lines)
+    print(f"Split text into {len(chunks)} chunks (budget {chunker.budget} tokens).")
+    return chunks
 
+def _log_chunk_start(index: int, total: int, chunk_lines: List[str]):
+    msg = f"Processing Chunk {index+1}/{total} ({len(chunk_lines)} lines)..."
+    print(msg)
+    with open("backend_debug.log", "a") as f:
+        f.write(f"{msg}\n")
+
+def _log_chunk_error(index: int, error: Exception):
+    print(f"Error processing chunk {index+1}: {error}")
+    with open("backend_debug.log", "a") as f:
+        f.write(f"Error in chunk {index+1}: {str(error)}\n")
+
+def _classify_extracted(unique_transactions: List[dict], api_key: str, base_url: str):
     # Post-processing classification (Mocked for now, or use classification_service if available)
     # For this POC, we'll trust the LLM's initial classification or do a simple pass
     # If classification_service exists, we can use it.
@@ -223,84 +299,312 @@ Return a JSON object with 'transactions' and 'closing_balance'."""),
     except ImportError:
         pass # Classification service might not be available
 
+async def _aclassify_extracted(unique_transactions: List[dict], api_key: str, base_url: str):
+    """_classify_extracted for the async paths; the LLM fallback is awaited rather than run on an executor thread."""
+    try:
+        from services.classification_service import classifier
+    except ImportError:
+        return # Classification service might not be available
+    descriptions = [t.get('description', '') for t in unique_transactions]
+    new_categories = await classifier.aclassify_batch(descriptions, api_key=api_key, base_url=base_url)
+    for t, category in zip(unique_transactions, new_categories):
+        if t.get('merchant') is None:
+            t['merchant'] = "Unknown"
+        if category:
+            t['category'] = category
+
+def _prepare_statement(text_lines: List[str]) -> tuple:
+    """
+    Runs the deterministic line parser (unless STATEMENT_PARSER=0).
+    Returns (parsed statement or None, lines that still need the LLM).
+    """
+    if os.getenv("STATEMENT_PARSER", "1") == "0":
+        return None, text_lines
+    parsed = parse_statement(text_lines)
+    print(f"Statement parser: {parsed.stats()} ({len(text_lines)} input lines)")
+    return parsed, parsed.unparsed_lines
+
+def _with_parsed(parsed, chunks: List[List[str]], chunk_rows: dict, merger: OrderedChunkMerger) -> tuple:
+    """(all transactions in statement order, closing balance) from the parser and the chunk results."""
+    if parsed is None:
+        transactions = [t for index in sorted(chunk_rows) for t in chunk_rows[index]]
+        print(f"Total transactions: {len(transactions)}")
+        return transactions, merger.closing_balance
+    # Chunks are consecutive runs of the parser's unparsed lines
+    chunk_lines, offset = [], 0
+    for chunk in chunks:
+        chunk_lines.append(parsed.unparsed_indices[offset])
+        offset += len(chunk)
+    transactions = in_statement_order(list(zip(parsed.transaction_lines, parsed.transactions)), chunk_rows, chunk_lines)
+    print(f"Total transactions: {len(transactions)} ({len(parsed.transactions)} parsed)")
+    # An explicit closing balance line beats the LLM's reading
+    return transactions, parsed.closing_balance or merger.closing_balance
+
+def _cached_chunk_results(chunk_texts: List[str]) -> tuple:
+    """Looks every chunk up in the LLM cache. Returns (keys, {chunk index: cached result})."""
+    keys = [_extraction_cache_key(text) for text in chunk_texts]
+    found = llm_cache.get_many("extraction", keys)
+    cached = {i: found[key] for i, key in enumerate(keys) if key in found}
+    if cached:
+        print(f"  {len(cached)}/{len(chunk_texts)} chunks served from the LLM cache.")
+    return keys, cached
+
+def extract_transactions_from_text(text_lines: List[str], api_key: str, base_url: str = "https://api.openai.com/v1") -> dict:
+    if len(text_lines) == 0:
+        return {"transactions": [], "closing_balance": 0.0}
+
+    parsed, llm_lines = _prepare_statement(text_lines)
+    chunks = _chunk_lines(llm_lines)
+    chunk_texts = ["\n".join(chunk_lines) for chunk_lines in chunks]
+    keys, cached = _cached_chunk_results(chunk_texts)
+    pending = [i for i in range(len(chunks)) if i not in cached]
+
+    # Chunk results are merged back in statement order, whatever order they finish in
+    merger = OrderedChunkMerger()
+    chunk_rows = {}
+    for i in sorted(cached):
+        chunk_rows.update(merger.add(i, cached[i]))
+
+    if pending:
+        chain = _build_extraction_chain(api_key, base_url)
+
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        def process_chunk(index):
+            try:
+                _log_chunk_start(index, len(chunks), chunks[index])
+                result = chain.invoke({"text": chunk_texts[index]}).model_dump()
+                llm_cache.put("extraction", keys[index], result)
+                return result
+            except Exception as e:
+                _log_chunk_error(index, e)
+                return None
+
+        with ThreadPoolExecutor(max_workers=EXTRACTION_MAX_CONCURRENCY) as executor:
+            future_to_chunk = {executor.submit(process_chunk, i): i for i in pending}
+            
+            for future in as_completed(future_to_chunk):
+                chunk_rows.update(merger.add(future_to_chunk[future], future.result()))
+
+    unique_transactions, closing_balance = _with_parsed(parsed, chunks, chunk_rows, merger)
+    _classify_extracted(unique_transactions, api_key, base_url)
+
     return {"transactions": unique_transactions, "closing_balance": closing_balance}
 
-def detect_anomalies(transactions: List[dict], api_key: str, base_url: str = "https://api.openai.com/v1") -> List[dict]:
-    if not transactions:
-        return []
+async def aextract_transactions_from_text(text_lines: List[str], api_key: str, base_url: str = "https://api.openai.com/v1") -> dict:
+    """
+    Async variant of extract_transactions_from_text: chunks go through `chain.abatch`
+    on the event loop, and the (CPU-bound) classification pass runs on the blocking executor.
+    """
+    if len(text_lines) == 0:
+        return {"transactions": [], "closing_balance": 0.0}
+
+    parsed, llm_lines = await run_blocking(_prepare_statement, text_lines)
+    chunks = await run_blocking(_chunk_lines, llm_lines)
+    chunk_texts = ["\n".join(chunk_lines) for chunk_lines in chunks]
+    keys, cached = await run_blocking(_cached_chunk_results, chunk_texts)
+    pending = [i for i in range(len(chunks)) if i not in cached]
+    results = dict(cached)
+
+    if pending:
+        # Client construction (SSL context setup) is blocking too
+        chain = await run_blocking(_build_extraction_chain, api_key, base_url)
+        for i in pending:
+            _log_chunk_start(i, len(chunks), chunks[i])
+
+        outputs = await chain.abatch(
+            [{"text": chunk_texts[i]} for i in pending],
+            config={"max_concurrency": EXTRACTION_MAX_CONCURRENCY},
+            return_exceptions=True,
+        )
+        fresh = {}
+        for i, output in zip(pending, outputs):
+            if isinstance(output, Exception):
+                _log_chunk_error(i, output)
+                results[i] = None
+            else:
+                results[i] = fresh[keys[i]] = output.model_dump()
+        await run_blocking(llm_cache.put_many, "extraction", fresh)
+
+    merger = OrderedChunkMerger()
+    chunk_rows = {}
+    for i in sorted(results):
+        chunk_rows.update(merger.add(i, results[i]))
+    unique_transactions, closing_balance = _with_parsed(parsed, chunks, chunk_rows, merger)
+    await _aclassify_extracted(unique_transactions, api_key, base_url)
 
+    return {"transactions": unique_transactions, "closing_balance": closing_balance}
+
+async def _completed_chunks(chunks: List[List[str]], api_key: str, base_url: str):
+    """Yields (chunk index, result dict or Exception): cached chunks first, then LLM results as they finish."""
+    chunk_texts = ["\n".join(chunk_lines) for chunk_lines in chunks]
+    keys, cached = await run_blocking(_cached_chunk_results, chunk_texts)
+    for index, data in cached.items():
+        yield index, data
+
+    pending = [i for i in range(len(chunks)) if i not in cached]
+    if not pending:
+        return
+    chain = await run_blocking(_build_extraction_chain, api_key, base_url)
+    for i in pending:
+        _log_chunk_start(i, len(chunks), chunks[i])
+
+    async for position, output in chain.abatch_as_completed(
+        [{"text": chunk_texts[i]} for i in pending],
+        config={"max_concurrency": EXTRACTION_MAX_CONCURRENCY},
+        return_exceptions=True,
+    ):
+        index = pending[position]
+        if isinstance(output, Exception):
+            yield index, output
+            continue
+        data = output.model_dump()
+        await run_blocking(llm_cache.put, "extraction", keys[index], data)
+        yield index, data
+
+async def astream_transactions_from_text(text_lines: List[str], api_key: str, base_url: str = "https://api.openai.com/v1"):
+    """
+    Streaming variant of aextract_transactions_from_text. Yields one
+    {"event": "transactions", ...} dict per chunk, in statement order, as soon as
+    that chunk and all chunks before it are extracted and classified, and a final {"event": "summary", ...} with the closing balance.
+    """
+    if len(text_lines) == 0:
+        yield {"event": "summary", "closing_balance": 0.0, "total_transactions": 0, "chunks": 0, "failed_chunks": [],
+               "parsed_transactions": 0, "llm_lines": 0}
+        return
+
+    parsed, llm_lines = await run_blocking(_prepare_statement, text_lines)
+    chunks = await run_blocking(_chunk_lines, llm_lines)
+
+    total = 0
+    failed_chunks = []
+
+    if parsed is not None and parsed.transactions:
+        # Rows the parser could read are ready immediately, before any LLM call
+        await _aclassify_extracted(parsed.transactions, api_key, base_url)
+        total += len(parsed.transactions)
+        yield {"event": "transactions", "source": "parser", "chunk": None, "transactions": parsed.transactions}
+
+    # Chunks are released in statement order: one that finishes early waits for its predecessors
+    merger = OrderedChunkMerger()
+    async for index, data in _completed_chunks(chunks, api_key, base_url):
+        if isinstance(data, Exception):
+            _log_chunk_error(index, data)
+            failed_chunks.append(index)
+            yield {"event": "error", "source": "llm", "chunk": index, "detail": str(data)}
+            data = None
+
+        for ready_index, new_transactions in merger.add(index, data):
+            if ready_index in failed_chunks:
+                continue
+            if new_transactions:
+                await _aclassify_extracted(new_transactions, api_key, base_url)
+            total += len(new_transactions)
+            print(f"  Chunk {ready_index+1}/{len(chunks)}: {len(new_transactions)} new transactions.")
+            yield {"event": "transactions", "source": "llm", "chunk": ready_index, "transactions": new_transactions}
+
+    closing_balance = merger.closing_balance
+    if parsed is not None and parsed.closing_balance:
+        closing_balance = parsed.closing_balance
+    print(f"Total transactions: {total}")
+    yield {
+        "event": "summary",
+        "closing_balance": closing_balance,
+        "total_transactions": total,
+        "chunks": len(chunks),
+        "failed_chunks": sorted(failed_chunks),
+        "parsed_transactions": len(parsed.transactions) if parsed is not None else 0,
+        "llm_lines": len(llm_lines),
+    }
+
+# Findings reworded by the LLM when /anomalies is asked to narrate
+ANOMALY_NARRATE_TOP = int(os.getenv("ANOMALY_NARRATE_TOP", "5"))
+
+def _build_anomaly_narration_chain(findings: List[dict], api_key: str, base_url: str):
     llm = get_llm(api_key, base_url, temperature=0)
 
-    # Summarize transactions for the LLM
-    transaction_summary = "\n".join([f"- {t['date']}: {t['merchant']} ({t['category']}) - ${t['amount']}" for t in transactions])
+    findings_summary = "\n".join([f"{i + 1}. [{f['type']}, {f['severity']}] {f['description']}" for i, f in enumerate(findings)])
 
     prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are a financial auditor. Analyze the provided list of transactions for anomalies, recurring patterns, and seasonality.\n\nLook for:\n1. **Anomalies**: Unusually high amounts, duplicate charges, suspicious merchants.\n2. **Recurring**: Identify regular subscriptions or bills (e.g., Netflix, Rent, Utilities) and their frequency.\n3. **Seasonality**: Identify spending spikes related to specific times (e.g., 'Higher utility bills in winter', 'Weekend dining spikes').\n\nReturn a list of findings. If nothing significant is found, return an empty list."),
-        ("system", f"Transactions:\n{transaction_summary}"),
-        ("user", "Analyze for anomalies, recurring patterns, and seasonality.")
+        ("system", "You are a financial auditor. The findings below were computed from the user's transactions. Rewrite each one as a short, plain-language explanation for the user, in the same order, keeping its type and severity. Do not add, drop or merge findings, and do not change any numbers."),
+        ("system", f"Findings:\n{findings_summary}"),
+        ("user", "Explain these findings.")
     ])
 
-    chain = prompt | llm.with_structured_output(AnomalyList)
-    
+    return prompt | llm.with_structured_output(AnomalyList)
+
+def _narrated(findings: List[dict], result: AnomalyList) -> List[dict]:
+    # Keep the computed type/severity/transaction id; only take the wording from the LLM
+    if len(result.anomalies) != len(findings):
+        print(f"Anomaly narration returned {len(result.anomalies)} findings for {len(findings)}; keeping computed descriptions")
+        return findings
+    return [{**f, "description": a.description} for f, a in zip(findings, result.anomalies)]
+
+def detect_anomalies(transactions: List[dict], api_key: str, base_url: str = "https://api.openai.com/v1", narrate: bool = False) -> List[dict]:
+    """
+    Unusual amounts, duplicate and recurring charges found by the statistical
+    detector. With `narrate`, the top ANOMALY_NARRATE_TOP findings are reworded by the LLM.
+    """
+    if not transactions:
+        return []
+
+    findings = anomaly_detector.detect(transactions)
+    if not narrate or not findings:
+        return findings
+    top = findings[:ANOMALY_NARRATE_TOP]
     try:
-        result = chain.invoke({})
-        return [a.model_dump() for a in result.anomalies]
+        chain = _build_anomaly_narration_chain(top, api_key, base_url)
+        return _narrated(top, chain.invoke({})) + findings[ANOMALY_NARRATE_TOP:]
     except Exception as e:
-        print(f"Error detecting anomalies: {e}")
+        print(f"Error narrating anomalies: {e}")
+        return findings
+
+async def adetect_anomalies(transactions: List[dict], api_key: str, base_url: str = "https://api.openai.com/v1", narrate: bool = False) -> List[dict]:
+    if not transactions:
         return []
 
-def chat_with_data(query: str, transactions: List[dict], budgets: List[dict], goals: List[dict], api_key: str, base_url: str = "https://api.openai.com/v1") -> dict:
-    llm = get_llm(api_key, base_url, temperature=0.7)
+    findings = await run_blocking(anomaly_detector.detect, transactions)
+    if not narrate or not findings:
+        return findings
+    top = findings[:ANOMALY_NARRATE_TOP]
+    try:
+        chain = await run_blocking(_build_anomaly_narration_chain, top, api_key, base_url)
+        return _narrated(top, await chain.ainvoke({})) + findings[ANOMALY_NARRATE_TOP:]
+    except Exception as e:
+        print(f"Error narrating anomalies: {e}")
+        return findings
 
-    # 1. Retrieve relevant context from PDF if available
+def _retrieve_context(query: str, api_key: str, upload_id: Optional[str] = None) -> str:
+    # Retrieve relevant context from uploaded statements (blocking: embeds the query)
     retrieved_context = ""
-    if vector_store:
-        try:
-            results = vector_store.similarity_search(query, k=3)
-            retrieved_context = "\n\n".join([doc.page_content for doc in results])
-            print(f"Retrieved {len(results)} chunks for query.")
-        except Exception as e:
-            print(f"Error retrieving context: {e}")
+    try:
+        # Questions about a named month or year only look at statement text from that period
+        date_from, date_to = context_selector.date_range(query) or (None, None)
+        results = statement_store.search(query, api_key, k=3, upload_id=upload_id, date_from=date_from, date_to=date_to)
+        if not results and date_from is not None:
+            results = statement_store.search(query, api_key, k=3, upload_id=upload_id)
+        retrieved_context = "\n\n".join(results)
+        print(f"Retrieved {len(results)} chunks for query.")
+    except Exception as e:
+        print(f"Error retrieving context: {e}")
+    return retrieved_context
+
+def _build_chat_chain(query: str, transactions: List[dict], budgets: List[dict], goals: List[dict], retrieved_context: str, api_key: str, base_url: str):
+    llm = get_llm(api_key, base_url, temperature=0.7)
 
     # 2. Format Transaction Data (Dashboard Context)
-    total_income = sum(t['amount'] for t in transactions if t.get('type') == 'income')
-    total_expense = sum(t['amount'] for t in transactions if t.get('type') == 'expense')
+    frame = TransactionFrame(transactions)
+    total_income = frame.total(INCOME)
+    total_expense = frame.total(EXPENSE)
     
     # Category Totals (All Time)
-    category_totals = {}
-    for t in transactions:
-        if t.get('type') == 'expense':
-            cat = t.get('category', 'Other')
-            category_totals[cat] = category_totals.get(cat, 0) + float(t['amount'])
-            
-    category_summary = "\n".join([f"   - {cat}: ${amt:.2f}" for cat, amt in category_totals.items()])
-
-    # Monthly Breakdown
-    monthly_data = {}
-    for t in transactions:
-        try:
-            date_str = t.get('date', '')
-            # Assume YYYY-MM-DD
-            month_key = date_str[:7] # YYYY-MM
-            if not month_key: continue
-            
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {'income': 0, 'expense': 0, 'categories': {}}
-            
-            amt = float(t['amount'])
-            if t.get('type') == 'income':
-                monthly_data[month_key]['income'] += amt
-            else:
-                monthly_data[month_key]['expense'] += amt
-                cat = t.get('category', 'Other')
-                monthly_data[month_key]['categories'][cat] = monthly_data[month_key]['categories'].get(cat, 0) + amt
-        except:
-            continue
+    category_summary = "\n".join([f"   - {cat}: ${amt:.2f}" for cat, amt in frame.category_totals(EXPENSE).items()])
 
+    # Monthly Breakdown (dates are YYYY-MM-DD)
     monthly_breakdown = []
-    for month, data in sorted(monthly_data.items(), reverse=True):
+    for data in frame.monthly():
         cat_str = ", ".join([f"{c}: ${a:.0f}" for c, a in data['categories'].items()])
-        monthly_breakdown.append(f"- **{month}**: Income ${data['income']:.0f}, Expense ${data['expense']:.0f} ({cat_str})")
+        monthly_breakdown.append(f"- **{data['month']}**: Income ${data['income']:.0f}, Expense ${data['expense']:.0f} ({cat_str})")
     
     monthly_breakdown_str = "\n".join(monthly_breakdown)
 
@@ -310,8 +614,9 @@ def chat_with_data(query: str, transactions: List[dict], budgets: List[dict], go
     # Goals Context
     goal_context = "\n".join([f"- {g['name']}: Target ${g['targetAmount']}, Current ${g['currentAmount']}, Deadline {g['deadline']}" for g in goals])
 
-    transaction_context = "\n".join([f"- {t['date']}: {t['merchant']} ({t['category']}) - ${t['amount']}" for t in transactions])
-    
+    # Only the rows relevant to the query, within CHAT_CONTEXT_TOKENS
+    transaction_context = context_selector.context(query, transactions, frame)
+
     # 3. Construct Hybrid Prompt
     system_prompt = (
         "You are a helpful financial assistant. You have access to comprehensive dashboard data:\n"
@@ -331,7 +636,7 @@ def chat_with_data(query: str, transactions: List[dict], budgets: List[dict], go
         "Use ALL sources to answer. Be accurate with numbers.\n"
         "- If the user asks about specific months, look at the 'Monthly Breakdown'.\n"
         "- If the user asks about budgets or goals, use the respective sections.\n"
-        "- If the user asks about specific transactions, refer to the raw list.\n\n"
+        "- If the user asks about specific transactions, refer to the transaction list (the rows most relevant to the query).\n\n"
         "Supported Actions:\n"
         "1. **Move Budget**: If the user wants to move money between categories.\n"
         "2. **Create Goal**: If the user wants to save for something.\n\n"
@@ -344,7 +649,7 @@ def chat_with_data(query: str, transactions: List[dict], budgets: List[dict], go
 --- Document Context (from PDF) ---
 {retrieved_context}
 
---- Raw Transactions ---
+--- Relevant Transactions ---
 {transaction_context}
 """
 
@@ -354,56 +659,78 @@ def chat_with_data(query: str, transactions: List[dict], budgets: List[dict], go
     ])
 
     chain = prompt | llm.with_structured_output(AgentAction)
-    response = chain.invoke({"user_content": user_content})
+    return chain, {"user_content": user_content}
+
+def chat_with_data(query: str, transactions: List[dict], budgets: List[dict], goals: List[dict], api_key: str, base_url: str = "https://api.openai.com/v1", upload_id: Optional[str] = None) -> dict:
+    # 1. Retrieve relevant context from PDF, 2./3. summarize dashboard data into a hybrid prompt
+    retrieved_context = _retrieve_context(query, api_key, upload_id)
+    chain, inputs = _build_chat_chain(query, transactions, budgets, goals, retrieved_context, api_key, base_url)
+    response = chain.invoke(inputs)
     return response.model_dump()
 
+async def achat_with_data(query: str, transactions: List[dict], budgets: List[dict], goals: List[dict], api_key: str, base_url: str = "https://api.openai.com/v1", upload_id: Optional[str] = None) -> dict:
+    retrieved_context = await run_blocking(_retrieve_context, query, api_key, upload_id)
+    chain, inputs = await run_blocking(_build_chat_chain, query, transactions, budgets, goals, retrieved_context, api_key, base_url)
+    response = await chain.ainvoke(inputs)
+    return response.model_dump()
+
+_EMPTY_INSIGHT = {
+    "insight_text": "Add transactions and goals to get AI insights.",
+    "metric_value": "$0",
+    "impacted_goal": "None",
+    "spending_summary": "No data available yet.",
+    "projected_balance": 0.0
+}
+
+_FAILED_INSIGHT = {
+    "insight_text": "Could not generate insight at this time.",
+    "metric_value": "N/A",
+    "impacted_goal": "None",
+    "spending_summary": "Please check your connection or try again later.",
+    "projected_balance": 0.0
+}
+
+def _build_insight_chain(transactions: List[dict], goals: List[dict], api_key: str, base_url: str):
+    llm = get_llm(api_key, base_url, temperature=0.7)
+
+    transaction_summary = "\n".join([f"- {t['merchant']} ({t['category']}): ${t['amount']}" for t in transactions])
+    goals_summary = "\n".join([f"- {g['name']}: Target ${g['targetAmount']}, Current ${g['currentAmount']}" for g in goals])
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are a financial advisor. Analyze the user's spending and goals.\n1. Generate a structured financial insight to help save money.\n2. Create a natural language summary of their spending trends (e.g., compare to typical or highlight major categories).\n3. Estimate a projected end-of-month balance assuming current spending continues (provide a realistic number based on the data)."),
+        ("system", f"Recent Transactions:\n{transaction_summary}\n\nActive Goals:\n{goals_summary}"),
+        ("user", "Generate financial insight, summary, and projection.")
+    ])
+
+    return prompt | llm.with_structured_output(FinancialInsight)
+
 def generate_financial_insight(transactions: List[dict], goals: List[dict], api_key: str, base_url: str = "https://api.openai.com/v1") -> dict:
+    if not transactions and not goals:
+        return dict(_EMPTY_INSIGHT)
     try:
-        llm = get_llm(api_key, base_url, temperature=0.7)
-
-        transaction_summary = "\n".join([f"- {t['merchant']} ({t['category']}): ${t['amount']}" for t in transactions])
-        goals_summary = "\n".join([f"- {g['name']}: Target ${g['targetAmount']}, Current ${g['currentAmount']}" for g in goals])
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a financial advisor. Analyze the user's spending and goals.\n1. Generate a structured financial insight to help save money.\n2. Create a natural language summary of their spending trends (e.g., compare to typical or highlight major categories).\n3. Estimate a projected end-of-month balance assuming current spending continues (provide a realistic number based on the data)."),
-            ("system", f"Recent Transactions:\n{transaction_summary}\n\nActive Goals:\n{goals_summary}"),
-            ("user", "Generate financial insight, summary, and projection.")
-        ])
-
-        if not transactions and not goals:
-             return {
-                "insight_text": "Add transactions and goals to get AI insights.",
-                "metric_value": "$0",
-                "impacted_goal": "None",
-                "spending_summary": "No data available yet.",
-                "projected_balance": 0.0
-            }
-
-        chain = prompt | llm.with_structured_output(FinancialInsight)
+        chain = _build_insight_chain(transactions, goals, api_key, base_url)
         result = chain.invoke({})
         return result.model_dump()
     except Exception as e:
         print(f"Error generating insight: {e}")
-        return {
-            "insight_text": "Could not generate insight at this time.",
-            "metric_value": "N/A",
-            "impacted_goal": "None",
-            "spending_summary": "Please check your connection or try again later.",
-            "projected_balance": 0.0
-        }
+        return dict(_FAILED_INSIGHT)
 
-def generate_budget_suggestion(transactions: List[dict], api_key: str, base_url: str = "https://api.openai.com/v1") -> List[dict]:
+async def agenerate_financial_insight(transactions: List[dict], goals: List[dict], api_key: str, base_url: str = "https://api.openai.com/v1") -> dict:
+    if not transactions and not goals:
+        return dict(_EMPTY_INSIGHT)
+    try:
+        chain = await run_blocking(_build_insight_chain, transactions, goals, api_key, base_url)
+        result = await chain.ainvoke({})
+        return result.model_dump()
+    except Exception as e:
+        print(f"Error generating insight: {e}")
+        return dict(_FAILED_INSIGHT)
+
+def _build_budget_chain(transactions: List[dict], api_key: str, base_url: str):
     llm = get_llm(api_key, base_url, temperature=0.7)
 
     # Summarize spending by category
-    category_totals = {}
-    for t in transactions:
-        cat = t.get('category', 'Other')
-        amount = float(t.get('amount', 0))
-        if cat not in category_totals:
-            category_totals[cat] = 0
-        category_totals[cat] += amount
-
+    category_totals = TransactionFrame(transactions).category_totals()
     spending_summary = "\n".join([f"- {cat}: ${total:.2f}" for cat, total in category_totals.items()])
 
     prompt = ChatPromptTemplate.from_messages([
@@ -412,72 +739,83 @@ def generate_budget_suggestion(transactions: List[dict], api_key: str, base_url:
         ("user", "Generate budget suggestions.")
     ])
 
-    chain = prompt | llm.with_structured_output(BudgetSuggestionList)
+    return prompt | llm.with_structured_output(BudgetSuggestionList)
+
+def generate_budget_suggestion(transactions: List[dict], api_key: str, base_url: str = "https://api.openai.com/v1") -> List[dict]:
+    chain = _build_budget_chain(transactions, api_key, base_url)
     result = chain.invoke({})
     return [s.model_dump() for s in result.suggestions]
 
-def generate_savings_scenario(transactions: List[dict], goals: List[dict], extra_savings: float, api_key: str, base_url: str = "https://api.openai.com/v1") -> dict:
+async def agenerate_budget_suggestion(transactions: List[dict], api_key: str, base_url: str = "https://api.openai.com/v1") -> List[dict]:
+    chain = await run_blocking(_build_budget_chain, transactions, api_key, base_url)
+    result = await chain.ainvoke({})
+    return [s.model_dump() for s in result.suggestions]
+
+def _build_trade_off_chain(transactions: List[dict], goals: List[dict], scenario: dict, api_key: str, base_url: str):
     llm = get_llm(api_key, base_url, temperature=0.7)
 
     goals_summary = "\n".join([f"- {g['name']}: Target ${g['targetAmount']}, Current ${g['currentAmount']}, Deadline {g['deadline']}" for g in goals])
-    
+    projection = "\n".join([f"- {d['goal_name']}: reached by {d['new_date']} ({d['months_saved']} months sooner)" for d in scenario["new_deadlines"]])
+
     # Calculate spending context for trade-offs
-    category_totals = {}
-    for t in transactions:
-        cat = t.get('category', 'Other')
-        amount = float(t.get('amount', 0))
-        if t.get('type') == 'expense':
-             category_totals[cat] = category_totals.get(cat, 0) + amount
-    
+    category_totals = TransactionFrame(transactions).category_totals(EXPENSE)
     spending_context = "\n".join([f"- {cat}: ${total:.2f}" for cat, total in category_totals.items()])
 
     with open("backend_debug.log", "a") as f:
-        f.write(f"\n--- Generating Savings Scenario ---\n")
+        f.write(f"\n--- Generating Savings Trade-off ---\n")
         f.write(f"Goals Summary:\n{goals_summary}\n")
         f.write(f"Spending Context:\n{spending_context}\n")
 
     prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are a financial simulator. The user wants to see the impact of saving an EXTRA amount per month.\n1. Calculate how much faster they will reach each goal with the extra contribution (assume the extra amount is split evenly or applied to the nearest deadline).\n2. Provide a 'trade_off_suggestion' based on their actual spending (e.g., 'Cut Dining by 10%').\n3. Generate a natural language 'impact_description'."),
-        ("system", f"Goals:\n{goals_summary}\n\nSpending Context:\n{spending_context}"),
-        ("user", f"Simulate an extra monthly saving of ${extra_savings}.")
+        ("system", "You are a financial planner. The user will save an EXTRA amount per month; the effect on their goals has already been calculated. Suggest one concrete, realistic way to free up that amount based on their actual spending (e.g., 'Cut Dining by 10%'). Do not recalculate the goal dates."),
+        ("system", f"Goals:\n{goals_summary}\n\nProjection:\n{projection}\n\nSpending Context:\n{spending_context}"),
+        ("user", f"How can I save an extra ${scenario['monthly_contribution_increase']} per month?")
     ])
 
-    chain = prompt | llm.with_structured_output(SavingsScenario)
-    
-    try:
-        result = chain.invoke({})
-        with open("backend_debug.log", "a") as f:
-            f.write(f"LLM Result: {result}\n")
-        return result.model_dump()
-    except Exception as e:
-        with open("backend_debug.log", "a") as f:
-            f.write(f"Error in generate_savings_scenario: {e}\n")
-        print(f"Error in generate_savings_scenario: {e}")
-        # Return a dummy object to prevent frontend crash
-        return {
-            "monthly_contribution_increase": extra_savings,
-            "new_deadlines": [],
-            "impact_description": "Could not generate simulation. Please try again.",
-            "trade_off_suggestion": "Check your connection."
-        }
+    return prompt | llm.with_structured_output(TradeOffSuggestion)
 
-def classify_transactions_with_llm(descriptions: List[str], api_key: str, base_url: str = "https://api.openai.com/v1") -> List[str]:
+def _savings_scenario(transactions: List[dict], goals: List[dict], extra_savings: float, strategy: str) -> dict:
+    scenario = savings_simulator.scenario(goals, extra_savings, strategy)
+    scenario["trade_off_suggestion"] = savings_simulator.trade_off_suggestion(transactions, extra_savings)
+    return scenario
+
+def _log_trade_off_error(error: Exception):
+    with open("backend_debug.log", "a") as f:
+        f.write(f"Error generating trade-off suggestion: {error}\n")
+    print(f"Error generating trade-off suggestion: {error}")
+
+def generate_savings_scenario(transactions: List[dict], goals: List[dict], extra_savings: float, api_key: str, base_url: str = "https://api.openai.com/v1", strategy: str = "even", narrate: bool = False) -> dict:
     """
-    Classifies a list of transaction descriptions using the LLM.
-    Returns a list of categories corresponding to the input descriptions.
+    Goal dates for `extra_savings` more per month, computed by the savings simulator
+    (allocation `strategy`: even or nearest_deadline). With `narrate`, the LLM
+    writes the trade_off_suggestion instead of the spending-based default.
     """
-    if not descriptions:
-        return []
+    scenario = _savings_scenario(transactions, goals, extra_savings, strategy)
+    if narrate:
+        try:
+            chain = _build_trade_off_chain(transactions, goals, scenario, api_key, base_url)
+            scenario["trade_off_suggestion"] = chain.invoke({}).trade_off_suggestion
+        except Exception as e:
+            _log_trade_off_error(e)
+    return SavingsScenario(**scenario).model_dump()
 
-    try:
-        llm = get_llm(api_key, base_url, temperature=0)
-        
-        # Batch descriptions to avoid token limits (though for this app volume is likely low)
-        # For simplicity, we'll send all at once if < 50, otherwise chunking might be needed.
-        # Assuming reasonable batch size from caller.
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert transaction classifier. Classify the following transaction descriptions into one of these categories:
+async def agenerate_savings_scenario(transactions: List[dict], goals: List[dict], extra_savings: float, api_key: str, base_url: str = "https://api.openai.com/v1", strategy: str = "even", narrate: bool = False) -> dict:
+    scenario = await run_blocking(_savings_scenario, transactions, goals, extra_savings, strategy)
+    if narrate:
+        try:
+            chain = await run_blocking(_build_trade_off_chain, transactions, goals, scenario, api_key, base_url)
+            scenario["trade_off_suggestion"] = (await chain.ainvoke({})).trade_off_suggestion
+        except Exception as e:
+            _log_trade_off_error(e)
+    return SavingsScenario(**scenario).model_dump()
+
+def savings_sweep(goals: List[dict], extra_savings: List[float], strategies: List[str]) -> dict:
+    """Goal dates for every (strategy, extra amount) pair, e.g. for a sensitivity curve; no LLM involved."""
+    points = savings_simulator.sweep(goals, extra_savings, strategies)
+    open_goals = points[0]["new_deadlines"] if points else []
+    return SavingsSweep(goals=[d["goal_name"] for d in open_goals], points=points).model_dump()
+
+CLASSIFICATION_SYSTEM_PROMPT = """You are an expert transaction classifier. Classify the following transaction descriptions into one of these categories:
 - Subscriptions
 - Transportation
 - Travel & Vacations
@@ -491,22 +829,78 @@ def classify_transactions_with_llm(descriptions: List[str], api_key: str, base_u
 
 Use your knowledge of US merchants and brands.
 Return a list of categories in the exact same order as the input descriptions.
-If you are unsure, use 'Others'."""),
-            ("user", "Classify these:\n" + "\n".join([f"- {d}" for d in descriptions]))
-        ])
+If you are unsure, use 'Others'."""
 
-        chain = prompt | llm.with_structured_output(CategoryList)
-        result = chain.invoke({})
-        
-        # Ensure we return exactly one category per description
-        categories = result.categories
-        
-        # Pad or truncate if length mismatch (shouldn't happen with structured output but safety first)
-        if len(categories) < len(descriptions):
-            categories.extend(["Others"] * (len(descriptions) - len(categories)))
-        return categories[:len(descriptions)]
+_CLASSIFICATION_FINGERPRINT = make_key(LLM_MODEL, CLASSIFICATION_SYSTEM_PROMPT, CategoryList.model_json_schema())
+
+def _cached_classifications(descriptions: List[str]) -> tuple:
+    """(cache keys, cached answers by key, distinct descriptions still to send to the LLM)."""
+    keys = [make_key(_CLASSIFICATION_FINGERPRINT, d) for d in descriptions]
+    cached = llm_cache.get_many("classification", keys)
+    pending = list(dict.fromkeys(d for d, key in zip(descriptions, keys) if key not in cached))
+    return keys, cached, pending
+
+def _build_classification_chain(pending: List[str], api_key: str, base_url: str):
+    llm = get_llm(api_key, base_url, temperature=0)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", CLASSIFICATION_SYSTEM_PROMPT),
+        ("user", "Classify these:\n" + "\n".join([f"- {d}" for d in pending]))
+    ])
+    return prompt | llm.with_structured_output(CategoryList)
+
+def _classification_answers(descriptions: List[str], keys: List[str], cached: dict, pending: List[str],
+                            categories: List[str]) -> List[str]:
+    """Caches the LLM's answers for `pending` and returns one category per description."""
+    # Only cache answers we can line up with their description
+    if len(categories) == len(pending):
+        llm_cache.put_many("classification", {
+            make_key(_CLASSIFICATION_FINGERPRINT, d): c for d, c in zip(pending, categories)
+        })
+
+    # Pad or truncate if length mismatch (shouldn't happen with structured output but safety first)
+    if len(categories) < len(pending):
+        categories = categories + ["Others"] * (len(pending) - len(categories))
+    answered = dict(zip(pending, categories))
+    return [cached[key] if key in cached else answered[d] for d, key in zip(descriptions, keys)]
+
+def classify_transactions_with_llm(descriptions: List[str], api_key: str, base_url: str = "https://api.openai.com/v1") -> List[str]:
+    """
+    Classifies a list of transaction descriptions using the LLM.
+    Returns a list of categories corresponding to the input descriptions.
+    Descriptions already answered are served from the LLM cache; only the rest are sent.
+    """
+    if not descriptions:
+        return []
+
+    keys, cached, pending = _cached_classifications(descriptions)
+    if not pending:
+        return [cached[key] for key in keys]
 
+    try:
+        chain = _build_classification_chain(pending, api_key, base_url)
+        result = chain.invoke({})
+        return _classification_answers(descriptions, keys, cached, pending, result.categories)
     except Exception as e:
         print(f"Error in classify_transactions_with_llm: {e}")
         # Fallback to 'Others' or None to let caller handle
-        return ["Others"] * len(descriptions)
\ No newline at end of file
+        return ["Others"] * len(descriptions)
+
+async def aclassify_transactions_with_llm(descriptions: List[str], api_key: str, base_url: str = "https://api.openai.com/v1") -> List[str]:
+    """
+    Async variant of classify_transactions_with_llm: the LLM call is awaited on
+    the event loop; cache reads and writes and chain building run on the blocking executor.
+    """
+    if not descriptions:
+        return []
+
+    keys, cached, pending = await run_blocking(_cached_classifications, descriptions)
+    if not pending:
+        return [cached[key] for key in keys]
+
+    try:
+        chain = await run_blocking(_build_classification_chain, pending, api_key, base_url)
+        result = await chain.ainvoke({})
+        return await run_blocking(_classification_answers, descriptions, keys, cached, pending, result.categories)
+    except Exception as e:
+        print(f"Error in aclassify_transactions_with_llm: {e}")
+        return ["Others"] * len(descriptions)
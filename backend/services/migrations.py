@@ -0,0 +1,160 @@
+import datetime
+import math
+import re
+import unicodedata
+from typing import Optional
+
+from sqlalchemy import and_, bindparam, inspect, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+from database import Base
+
+
+def posted_on(date: Optional[str]) -> Optional[datetime.date]:
+    """Transaction.posted_on for a `date` string: its YYYY-MM-DD prefix if that is a valid date, or None."""
+    prefix = str(date or "")[:10]
+    if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", prefix):
+        return None
+    try:
+        return datetime.date.fromisoformat(prefix)
+    except ValueError:
+        return None
+
+
+def to_cents(amount: Optional[float]) -> Optional[int]:
+    """Transaction.amount_cents, rounded half away from zero."""
+    if amount is None:
+        return None
+    return int(math.copysign(math.floor(abs(amount) * 100 + 0.5), amount))
+
+
+def merchant_key(merchant: Optional[str]) -> Optional[str]:
+    """Transaction.merchant_key: NFC-normalized and casefolded, unlike SQLite's ASCII-only lower()."""
+    if merchant is None:
+        return None
+    return unicodedata.normalize("NFC", merchant).casefold()
+
+
+def with_typed_columns(row: dict) -> dict:
+    """A transaction row to insert, with posted_on, amount_cents and merchant_key derived from it."""
+    return {**row, "posted_on": posted_on(row.get("date")), "amount_cents": to_cents(row.get("amount")),
+            "merchant_key": merchant_key(row.get("merchant"))}
+
+
+def add_missing_columns(engine: Engine):
+    """
+    ALTER TABLE ... ADD COLUMN for model columns an existing table lacks; like
+    new indexes, `create_all` leaves existing tables alone. New columns are
+    nullable, filled by the backfills below.
+    """
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            try:
+                with engine.begin() as connection:
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                print(f"Added column {table.name}.{column.name}")
+            except Exception as e:
+                print(f"Could not add column {table.name}.{column.name}: {e}")
+
+
+def backfill_typed_columns(engine: Engine) -> int:
+    """
+    Fills posted_on and amount_cents of rows stored before they existed, in one
+    transaction of batched UPDATEs; a row missing either one is rewritten, so
+    rows without an amount still get their posted_on. The values come from
+    `posted_on` and `to_cents` rather than SQLite's date() and ROUND, whose
+    handling of invalid days varies between builds, so old and new rows agree.
+    Returns the number of rows updated.
+    """
+    table = Base.metadata.tables["transactions"]
+    pending = select(table.c.id, table.c.date, table.c.amount).where(or_(
+        and_(table.c.posted_on.is_(None), table.c.date.is_not(None)),
+        and_(table.c.amount_cents.is_(None), table.c.amount.is_not(None)),
+    ))
+    update = table.update().where(table.c.id == bindparam("row_id")).values(
+        posted_on=bindparam("posted_on"), amount_cents=bindparam("amount_cents")
+    )
+    with engine.begin() as connection:
+        rows = [
+            {"row_id": id, "posted_on": posted_on(date), "amount_cents": to_cents(amount)}
+            for id, date, amount in connection.execute(pending)
+        ]
+        for start in range(0, len(rows), 1000):
+            connection.execute(update, rows[start:start + 1000])
+    if rows:
+        print(f"Backfilled posted_on/amount_cents of {len(rows)} transactions")
+    return len(rows)
+
+
+def backfill_merchant_keys(engine: Engine) -> int:
+    """
+    Fills merchant_key of rows stored before it existed, and drops the
+    lower(merchant) index that merchant search used before. Returns the number
+    of rows updated.
+    """
+    table = Base.metadata.tables["transactions"]
+    pending = select(table.c.id, table.c.merchant).where(table.c.merchant_key.is_(None), table.c.merchant.is_not(None))
+    update = table.update().where(table.c.id == bindparam("row_id")).values(merchant_key=bindparam("merchant_key"))
+    with engine.begin() as connection:
+        rows = [{"row_id": id, "merchant_key": merchant_key(merchant)} for id, merchant in connection.execute(pending)]
+        for start in range(0, len(rows), 1000):
+            connection.execute(update, rows[start:start + 1000])
+        connection.execute(text("DROP INDEX IF EXISTS ix_transactions_merchant_date_id"))
+    if rows:
+        print(f"Backfilled merchant_key of {len(rows)} transactions")
+    return len(rows)
+
+
+# Data migrations in order. PRAGMA user_version records how many have run, so
+# each one scans the tables once rather than on every start.
+DATA_MIGRATIONS = [backfill_typed_columns, backfill_merchant_keys]
+
+
+def schema_version(engine: Engine) -> int:
+    with engine.connect() as connection:
+        return connection.execute(text("PRAGMA user_version")).scalar()
+
+
+def run_data_migrations(engine: Engine):
+    """Runs the DATA_MIGRATIONS the database hasn't had yet; a failed one is retried on the next start."""
+    version = schema_version(engine)
+    for number, step in enumerate(DATA_MIGRATIONS[version:], start=version + 1):
+        try:
+            step(engine)
+            with engine.begin() as connection:
+                connection.execute(text(f"PRAGMA user_version = {number}"))
+        except Exception as e:
+            print(f"Could not run data migration {number} ({step.__name__}): {e}")
+            return
+
+
+def create_indexes(engine: Engine):
+    """
+    Creates indexes declared on the models that an existing database doesn't have
+    yet. `create_all` only adds indexes together with a new table, so databases
+    created before an index was declared would otherwise never get it.
+    IF NOT EXISTS rather than checkfirst: expression indexes aren't reflected.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with engine.begin() as connection:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
+            except Exception as e:
+                print(f"Could not create index {index.name}: {e}")
+
+
+def migrate(engine: Engine):
+    """Brings an existing database up to the models: new tables, columns, backfills, then indexes."""
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    run_data_migrations(engine)
+    create_indexes(engine)
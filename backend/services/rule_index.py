@@ -0,0 +1,109 @@
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from services.keyword_matcher import KeywordMatcher
+
+
+class RuleIndex:
+    """
+    In-memory index over `ClassificationRule` rows.
+
+    `exact` rules live in a hash map keyed by the upper-cased pattern and
+    `contains` rules in a KeywordMatcher automaton, so a lookup costs
+    O(len(text)) however many rules exist. Rules are ranked by id, which
+    keeps the old "first rule in table order wins" behaviour.
+
+    Updates are incremental: an `exact` rule is a single dict write, while a
+    change to `contains` rules marks the automaton dirty and a fresh one is
+    swapped in on the next lookup (readers never see a half-built automaton).
+    `version` is bumped on every change so callers can tell when results
+    derived from the rules are stale.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules: Dict[int, Tuple[str, str, str]] = {}   # id -> (PATTERN, category, match_type)
+        self._exact: Dict[str, Dict[int, str]] = {}          # PATTERN -> {id: category}
+        self._contains: Dict[int, Tuple[str, str]] = {}      # id -> (PATTERN, category)
+        self._matcher: Optional[KeywordMatcher] = None
+        self._matcher_dirty = False
+        self.version = 0
+
+    def __len__(self):
+        return len(self._rules)
+
+    def load(self, rules: Iterable):
+        """Replaces the index with the given ClassificationRule rows."""
+        with self._lock:
+            self._rules.clear()
+            self._exact.clear()
+            self._contains.clear()
+            for rule in rules:
+                self._insert(rule.id, rule.pattern, rule.category, rule.match_type)
+            self._matcher_dirty = True
+            self.version += 1
+
+    def upsert(self, rule_id: int, pattern: str, category: str, match_type: str = "contains"):
+        """Adds or updates a single rule without touching the rest of the index."""
+        with self._lock:
+            previous = self._rules.get(rule_id)
+            if previous is not None:
+                self._remove(rule_id, previous)
+            self._insert(rule_id, pattern, category, match_type)
+            if match_type == "contains" or (previous is not None and previous[2] == "contains"):
+                self._matcher_dirty = True
+            self.version += 1
+
+    def match(self, text_upper: str) -> Optional[str]:
+        """Returns the category of the first rule (by id) matching the upper-cased text."""
+        best_id = None
+        best_category = None
+
+        exact = self._exact.get(text_upper)
+        if exact:
+            best_id = min(exact)
+            best_category = exact[best_id]
+
+        if self._contains:
+            matcher = self._get_matcher()
+            hit = matcher.best_with_rank(text_upper)
+            if hit is not None and (best_id is None or hit[0] < best_id):
+                best_category = hit[1]
+
+        return best_category
+
+    def _insert(self, rule_id: int, pattern: str, category: str, match_type: str):
+        pattern_upper = (pattern or "").upper()
+        self._rules[rule_id] = (pattern_upper, category, match_type)
+        if match_type == "exact":
+            # Copy-on-write so concurrent lookups never iterate a dict being mutated.
+            by_id = dict(self._exact.get(pattern_upper, {}))
+            by_id[rule_id] = category
+            self._exact[pattern_upper] = by_id
+        elif match_type == "contains":
+            self._contains[rule_id] = (pattern_upper, category)
+
+    def _remove(self, rule_id: int, previous: Tuple[str, str, str]):
+        pattern_upper, _, match_type = previous
+        del self._rules[rule_id]
+        if match_type == "exact":
+            by_id = dict(self._exact.get(pattern_upper, {}))
+            by_id.pop(rule_id, None)
+            if by_id:
+                self._exact[pattern_upper] = by_id
+            else:
+                self._exact.pop(pattern_upper, None)
+        elif match_type == "contains":
+            self._contains.pop(rule_id, None)
+
+    def _get_matcher(self) -> KeywordMatcher:
+        if self._matcher is None or self._matcher_dirty:
+            with self._lock:
+                if self._matcher is None or self._matcher_dirty:
+                    matcher = KeywordMatcher()
+                    for rule_id, (pattern_upper, category) in self._contains.items():
+                        matcher.add(pattern_upper, rule_id, category, boundary=False)
+                    matcher.build()
+                    self._matcher = matcher
+                    self._matcher_dirty = False
+        return self._matcher
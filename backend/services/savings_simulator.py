@@ -0,0 +1,194 @@
+import datetime
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from services.aggregation import EXPENSE, TransactionFrame
+
+DAYS_PER_MONTH = 365.25 / 12
+STRATEGIES = ("even", "nearest_deadline")
+
+# Spending the trade-off suggestion may propose to cut, most flexible first
+DISCRETIONARY_CATEGORIES = ("Dining", "Shopping", "Entertainment", "Travel & Vacations", "Subscriptions")
+
+
+def _parse_deadline(value) -> Optional[datetime.date]:
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+class SavingsSimulator:
+    """
+    Deterministic goal projections for extra monthly savings.
+
+    Each goal is funded at its own monthly contribution (`monthlyContribution` if
+    the goal has one, otherwise the pace that reaches the target exactly at the
+    deadline) plus its share of the extra savings. The extra is split by an
+    allocation strategy:
+
+    - `even`: equally across unfinished goals;
+    - `nearest_deadline`: all of it to the unfinished goal with the nearest deadline.
+
+    When a goal is reached its share of the extra moves on to the others. Between
+    completions every goal grows linearly, so a projection is a handful of
+    closed-form phases (at most one per goal), each vectorized over all
+    scenarios at once: `project` takes an array of extra amounts and returns the
+    months to each goal for every one of them.
+    """
+
+    def __init__(self, as_of: datetime.date = None):
+        self._as_of = as_of
+
+    @property
+    def as_of(self) -> datetime.date:
+        return self._as_of or datetime.date.today()
+
+    def _prepare(self, goals: List[dict]) -> tuple:
+        """(remaining, base monthly contribution, months to deadline, deadline order) per goal."""
+        remaining = np.array([max(float(g.get("targetAmount", 0)) - float(g.get("currentAmount", 0)), 0.0) for g in goals])
+        months_left = np.full(len(goals), np.inf)
+        for i, g in enumerate(goals):
+            deadline = _parse_deadline(g.get("deadline"))
+            if deadline is not None:
+                months_left[i] = (deadline - self.as_of).days / DAYS_PER_MONTH
+        base = np.zeros(len(goals))
+        for i, g in enumerate(goals):
+            contribution = g.get("monthlyContribution")
+            if contribution is not None:
+                base[i] = max(float(contribution), 0.0)
+            elif remaining[i] > 0 and 0 < months_left[i] < np.inf:
+                base[i] = remaining[i] / months_left[i]
+        return remaining, base, months_left, np.argsort(months_left, kind="stable")
+
+    def project(self, goals: List[dict], extras: Sequence[float], strategy: str = "even") -> np.ndarray:
+        """Months until each goal is reached, shape (len(extras), len(goals)); inf if never."""
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}'. Choose one of: {', '.join(STRATEGIES)}")
+        extras = np.maximum(np.asarray(extras, dtype=np.float64).reshape(-1), 0.0)
+        remaining0, base, _, order = self._prepare(goals)
+        n_scenarios, n_goals = len(extras), len(goals)
+
+        remaining = np.tile(remaining0, (n_scenarios, 1))
+        finished = np.full((n_scenarios, n_goals), np.inf)
+        finished[remaining <= 0] = 0.0
+        elapsed = np.zeros(n_scenarios)
+        rows = np.arange(n_scenarios)
+
+        for _ in range(n_goals):
+            active = np.isinf(finished)
+            if not active.any():
+                break
+            share = np.zeros((n_scenarios, n_goals))
+            if strategy == "even":
+                n_active = active.sum(axis=1)
+                share = np.where(active, (extras / np.maximum(n_active, 1))[:, None], 0.0)
+            else:
+                # First unfinished goal in deadline order gets the whole extra
+                first = order[np.argmax(active[:, order], axis=1)]
+                has_active = active.any(axis=1)
+                share[rows[has_active], first[has_active]] = extras[has_active]
+            rate = np.where(active, base + share, 0.0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                to_finish = np.where(active & (rate > 0), remaining / rate, np.inf)
+            step = to_finish.min(axis=1)
+            progressing = np.isfinite(step)
+            if not progressing.any():
+                break
+            step = np.where(progressing, step, 0.0)
+            remaining = np.where(active, remaining - rate * step[:, None], remaining)
+            elapsed = elapsed + step
+            done = active & progressing[:, None] & (to_finish <= step[:, None] * (1 + 1e-12))
+            finished = np.where(done, elapsed[:, None], finished)
+            remaining = np.where(done, 0.0, remaining)
+        return finished
+
+    def baseline_months(self, goals: List[dict]) -> np.ndarray:
+        """Months to each goal without extra savings (the deadline, unless a contribution is given)."""
+        return self.project(goals, [0.0])[0]
+
+    def _date_after(self, months: float) -> str:
+        return (self.as_of + datetime.timedelta(days=round(months * DAYS_PER_MONTH))).isoformat()
+
+    def new_deadlines(self, goals: List[dict], months: np.ndarray, baseline: np.ndarray) -> List[dict]:
+        """GoalDeadline dicts for unfinished goals from one row of `project`."""
+        deadlines = []
+        for g, new, old in zip(goals, months, baseline):
+            if new == 0:
+                continue
+            if not np.isfinite(new):
+                deadlines.append({"goal_name": g.get("name", ""), "new_date": str(g.get("deadline", "")), "months_saved": 0.0})
+                continue
+            saved = old - new if np.isfinite(old) else 0.0
+            deadlines.append({"goal_name": g.get("name", ""), "new_date": self._date_after(new), "months_saved": round(float(max(saved, 0.0)), 1)})
+        return deadlines
+
+    @staticmethod
+    def impact_description(extra_savings: float, deadlines: List[dict]) -> str:
+        sooner = sorted((d for d in deadlines if d["months_saved"] > 0), key=lambda d: -d["months_saved"])
+        if not sooner:
+            return f"An extra ${extra_savings:,.0f} per month doesn't change when your goals are reached."
+        parts = [f"{d['goal_name']} {d['months_saved']:g} months earlier (by {d['new_date']})" for d in sooner[:3]]
+        return f"Saving an extra ${extra_savings:,.0f} per month, you reach " + ", ".join(parts) + "."
+
+    @staticmethod
+    def trade_off_suggestion(transactions: List[dict], extra_savings: float) -> str:
+        """Which discretionary spending, cut by how much, would pay for the extra saving."""
+        frame = TransactionFrame(transactions)
+        totals = frame.category_totals(EXPENSE)
+        months = max(len([m for m in frame.months if m]), 1)
+        candidates = [(totals[c] / months, c) for c in DISCRETIONARY_CATEGORIES if totals.get(c, 0) > 0]
+        if extra_savings <= 0 or not candidates:
+            return f"Set aside ${extra_savings:,.0f} at the start of each month, before discretionary spending."
+        monthly, category = max(candidates)
+        share = extra_savings / monthly * 100
+        if share > 100:
+            return (f"That is more than your whole {category} spending (about ${monthly:,.0f}/month); "
+                    f"it would take cuts across several categories.")
+        return f"Cutting {category} by {share:.0f}% (about ${extra_savings:,.0f} of ${monthly:,.0f}/month) would cover it."
+
+    def sweep(self, goals: List[dict], extras: Sequence[float], strategies: Sequence[str] = ("even",)) -> List[dict]:
+        """
+        One point per (strategy, extra amount): {"extra_savings", "strategy", "new_deadlines"},
+        with the dates and months saved of the whole grid computed array-wise.
+        """
+        extras = np.asarray(extras, dtype=np.float64).reshape(-1)
+        baseline = self.baseline_months(goals)
+        names = [g.get("name", "") for g in goals]
+        deadlines = [str(g.get("deadline", "")) for g in goals]
+        open_goals = np.flatnonzero(baseline != 0).tolist()
+        as_of = np.datetime64(self.as_of, "D")
+        points = []
+        for strategy in strategies:
+            months = self.project(goals, extras, strategy)
+            reached = np.isfinite(months)
+            days = np.round(np.where(reached, months, 0.0) * DAYS_PER_MONTH).astype(np.int64)
+            dates = np.datetime_as_string(as_of + days.astype("timedelta64[D]"), unit="D")
+            with np.errstate(invalid="ignore"):
+                saved = np.where(reached & np.isfinite(baseline), np.maximum(baseline - months, 0.0), 0.0).round(1)
+            dates, reached, saved = dates.tolist(), reached.tolist(), saved.tolist()
+            for row, extra in enumerate(extras.tolist()):
+                points.append({
+                    "extra_savings": extra,
+                    "strategy": strategy,
+                    "new_deadlines": [
+                        {"goal_name": names[g], "new_date": dates[row][g] if reached[row][g] else deadlines[g],
+                         "months_saved": saved[row][g]}
+                        for g in open_goals
+                    ],
+                })
+        return points
+
+    def scenario(self, goals: List[dict], extra_savings: float, strategy: str = "even") -> dict:
+        """SavingsScenario fields for one extra amount, except trade_off_suggestion."""
+        months = self.project(goals, [extra_savings], strategy)[0]
+        deadlines = self.new_deadlines(goals, months, self.baseline_months(goals))
+        return {
+            "monthly_contribution_increase": extra_savings,
+            "new_deadlines": deadlines,
+            "impact_description": self.impact_description(extra_savings, deadlines),
+        }
+
+
+savings_simulator = SavingsSimulator()
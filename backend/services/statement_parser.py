@@ -0,0 +1,275 @@
+import re
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Amounts always carry cents so reference numbers and years aren't mistaken for money.
+# Negatives: leading/trailing minus or parentheses.
+AMOUNT = r"\(?[-+]?\$?(?:\d{1,3}(?:,\d{3})+|\d+)\.\d{2}\)?-?"
+DATE = (
+    r"\d{4}-\d{1,2}-\d{1,2}"
+    r"|\d{1,2}/\d{1,2}/\d{2,4}"
+    r"|\d{1,2}[ -][A-Za-z]{3}[ -]\d{2,4}"
+    r"|[A-Za-z]{3}\.? \d{1,2},? \d{4}"
+)
+MARKER = r"(?:\s*(?P<marker>CR|DR))?"
+EMPTY_COLUMN = r"(?:-|0\.00)"
+
+_DATE_FORMATS = [
+    "%Y-%m-%d", "%d %b %Y", "%d-%b-%Y", "%d %b %y", "%d-%b-%y", "%b %d %Y", "%b %d, %Y",
+]
+# Numeric dates are read day first or month first, by statement (see `date_order`)
+_DAY_FIRST_FORMATS = ["%d/%m/%Y", "%d/%m/%y"]
+_MONTH_FIRST_FORMATS = ["%m/%d/%Y", "%m/%d/%y"]
+_NUMERIC_DATE_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})/(?:\d{4}|\d{2})\b")
+
+_AMOUNT_RE = re.compile(AMOUNT)
+_BALANCE_RE = re.compile(
+    r"\b(?P<kind>opening|beginning|previous|starting|closing|ending|new)\s+balance\b|\bbalance\s+(?:brought\s+)?forward\b",
+    re.IGNORECASE,
+)
+_SUMMARY_RE = re.compile(r"^\s*(?:sub)?totals?\b", re.IGNORECASE)
+_INCOME_HINTS = re.compile(
+    r"\b(?:DEPOSIT|PAYROLL|SALARY|DIRECT DEP|REFUND|INTEREST PAID|INTEREST EARNED|CREDIT|REVERSAL|CASHBACK)\b",
+    re.IGNORECASE,
+)
+_CLOSING_KINDS = {"closing", "ending", "new"}
+
+
+def parse_amount(token: str) -> float:
+    """'(1,234.56)', '-$12.00', '12.00-' -> signed float."""
+    negative = token.startswith("(") or "-" in token
+    value = float(token.strip("()+-$").replace("$", "").replace(",", ""))
+    return -value if negative else value
+
+
+def date_order(text_lines: List[str]) -> Optional[bool]:
+    """
+    Whether the statement's numeric dates are day first (DD/MM, as on Indian
+    and European statements) or month first (MM/DD, US): True or False, from
+    the dates only one order can read (13/02/2024, 02/13/2024). None if no
+    date tells, or the dates disagree.
+    """
+    day_first = month_first = False
+    for line in text_lines:
+        for match in _NUMERIC_DATE_RE.finditer(line):
+            first, second = int(match.group(1)), int(match.group(2))
+            day_first |= first > 12 >= second
+            month_first |= second > 12 >= first
+    if day_first == month_first:
+        return None
+    return day_first
+
+
+def parse_date(token: str, day_first: Optional[bool] = None) -> Optional[str]:
+    """
+    Normalizes a statement date to YYYY-MM-DD, or None. Numeric dates follow
+    `day_first` (see `date_order`); when the order is unknown, only those that
+    read the same either way or have a part above 12 are accepted.
+    """
+    token = token.replace(".", "")
+    formats = _DATE_FORMATS
+    numeric = _NUMERIC_DATE_RE.fullmatch(token)
+    if numeric:
+        first, second = int(numeric.group(1)), int(numeric.group(2))
+        if day_first is None and first != second and first <= 12 and second <= 12:
+            return None
+        if day_first or (day_first is None and first > 12):
+            formats = _DAY_FIRST_FORMATS
+        else:
+            formats = _MONTH_FIRST_FORMATS
+    for fmt in formats:
+        try:
+            return datetime.strptime(token, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def _transaction(date: str, description: str, amount: float, kind: str) -> dict:
+    # Category is a placeholder; the classification pass assigns the real one
+    return {
+        "date": date,
+        "merchant": description,
+        "amount": abs(amount),
+        "type": kind,
+        "category": "Others",
+        "description": description,
+    }
+
+
+def _signed_type(amount: float, marker: Optional[str], description: str) -> str:
+    # Same rules the LLM extraction prompt applies
+    if marker:
+        return "income" if marker.upper() == "CR" else "expense"
+    if amount < 0:
+        return "expense"
+    return "income" if _INCOME_HINTS.search(description) else "expense"
+
+
+class LineLayout:
+    """
+    One statement row layout: a compiled regex with `date` and `description`
+    groups plus amount groups, and a function turning a match into a
+    transaction dict. `interpret(match, date, description, state)` may return
+    None when the row is ambiguous under this layout; `state` carries the
+    statement's date order and the running balance between its rows.
+    """
+
+    def __init__(self, name: str, pattern: str, interpret: Callable):
+        self.name = name
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self.interpret = interpret
+
+    def parse(self, line: str, state: dict) -> Optional[dict]:
+        match = self.regex.match(line)
+        if not match:
+            return None
+        description = " ".join(match.group("description").split())
+        # A description ending in an amount means the row has more amount columns than this layout
+        if not re.search(r"[A-Za-z]", description) or _AMOUNT_RE.fullmatch(description.rsplit(" ", 1)[-1]):
+            return None
+        date = parse_date(match.group("date"), state.get("day_first"))
+        if date is None:
+            return None
+        return self.interpret(match, date, description, state)
+
+
+def _withdrawal_deposit_balance(match, date, description, state):
+    withdrawal, deposit = match.group("withdrawal"), match.group("deposit")
+    balance = parse_amount(match.group("balance"))
+    empty = re.compile(EMPTY_COLUMN)
+    if empty.fullmatch(withdrawal) and not empty.fullmatch(deposit):
+        state["balance"] = balance
+        return _transaction(date, description, parse_amount(deposit), "income")
+    if empty.fullmatch(deposit) and not empty.fullmatch(withdrawal):
+        state["balance"] = balance
+        return _transaction(date, description, parse_amount(withdrawal), "expense")
+    return None
+
+
+def _amount_balance(match, date, description, state):
+    amount = parse_amount(match.group("amount"))
+    balance = parse_amount(match.group("balance"))
+    marker = match.group("marker")
+    previous = state.get("balance")
+    if marker or amount < 0:
+        kind = _signed_type(amount, marker, description)
+    elif previous is not None and abs(previous - amount - balance) < 0.005:
+        kind = "expense"
+    elif previous is not None and abs(previous + amount - balance) < 0.005:
+        kind = "income"
+    else:
+        # An unsigned amount without a running balance to check it against
+        return None
+    state["balance"] = balance
+    return _transaction(date, description, amount, kind)
+
+
+def _single_amount(match, date, description, state):
+    amount = parse_amount(match.group("amount"))
+    marker = match.group("marker")
+    if not marker and amount >= 0 and not _INCOME_HINTS.search(description):
+        # An unsigned amount with nothing saying which way it went
+        return None
+    return _transaction(date, description, amount, _signed_type(amount, marker, description))
+
+
+_ROW = rf"^\s*(?P<date>{DATE})\s+(?P<description>.+?)\s+"
+
+# Tried in order; more amount columns first so a balance is never read as the amount.
+LAYOUTS: List[LineLayout] = [
+    LineLayout(
+        "withdrawal_deposit_balance",
+        _ROW + rf"(?P<withdrawal>{AMOUNT}|-)\s+(?P<deposit>{AMOUNT}|-)\s+(?P<balance>{AMOUNT})\s*$",
+        _withdrawal_deposit_balance,
+    ),
+    LineLayout(
+        "amount_balance",
+        _ROW + rf"(?P<amount>{AMOUNT}){MARKER}\s+(?P<balance>{AMOUNT})\s*$",
+        _amount_balance,
+    ),
+    LineLayout(
+        "single_amount",
+        _ROW + rf"(?P<amount>{AMOUNT}){MARKER}\s*$",
+        _single_amount,
+    ),
+]
+
+
+def register_layout(layout: LineLayout, first: bool = True):
+    """Adds a bank-specific layout; by default it is tried before the built-in ones."""
+    if first:
+        LAYOUTS.insert(0, layout)
+    else:
+        LAYOUTS.append(layout)
+
+
+class ParsedStatement:
+    def __init__(self):
+        self.transactions: List[dict] = []
+        # Index of the input line each transaction was read from
+        self.transaction_lines: List[int] = []
+        self.closing_balance = 0.0
+        # Lines the layouts couldn't read, with a line of context either side, for the LLM,
+        # and their indices in the input
+        self.unparsed_lines: List[str] = []
+        self.unparsed_indices: List[int] = []
+        self.layout_counts: Dict[str, int] = {}
+
+    def stats(self) -> dict:
+        return {
+            "parsed_transactions": len(self.transactions),
+            "llm_lines": len(self.unparsed_lines),
+            "layouts": dict(self.layout_counts),
+        }
+
+
+def parse_statement(text_lines: List[str], layouts: List[LineLayout] = None) -> ParsedStatement:
+    """
+    Deterministic pass over the statement text. Rows matching a registered layout
+    become transaction dicts; lines that contain an amount but match no layout
+    (wrapped rows, unusual formats) are kept, with adjacent context, for the LLM.
+    Lines without an amount (headers, footers, page numbers) are dropped. Rows
+    whose date could be DD/MM or MM/DD, in a statement whose other dates don't
+    settle the order, go to the LLM too.
+    """
+    layouts = LAYOUTS if layouts is None else layouts
+    result = ParsedStatement()
+    state: dict = {"day_first": date_order(text_lines)}
+    keep = [False] * len(text_lines)
+
+    for i, line in enumerate(text_lines):
+        if not line.strip():
+            continue
+        balance_line = _BALANCE_RE.search(line)
+        if balance_line:
+            amounts = _AMOUNT_RE.findall(line[balance_line.end():])
+            if amounts:
+                value = parse_amount(amounts[-1])
+                if (balance_line.group("kind") or "").lower() in _CLOSING_KINDS:
+                    result.closing_balance = value
+                else:
+                    state["balance"] = value
+                continue
+        if _SUMMARY_RE.match(line):
+            continue
+
+        for layout in layouts:
+            transaction = layout.parse(line, state)
+            if transaction is not None:
+                result.transactions.append(transaction)
+                result.transaction_lines.append(i)
+                result.layout_counts[layout.name] = result.layout_counts.get(layout.name, 0) + 1
+                break
+        else:
+            if _AMOUNT_RE.search(line):
+                keep[i] = True
+                # Wrapped rows often put the date/description on the line before the amount
+                if i > 0 and not _AMOUNT_RE.search(text_lines[i - 1]):
+                    keep[i - 1] = True
+                if i + 1 < len(text_lines) and not _AMOUNT_RE.search(text_lines[i + 1]):
+                    keep[i + 1] = True
+
+    result.unparsed_indices = [i for i, k in enumerate(keep) if k]
+    result.unparsed_lines = [text_lines[i] for i in result.unparsed_indices]
+    return result
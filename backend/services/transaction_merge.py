@@ -0,0 +1,61 @@
+from typing import Dict, List, Optional, Tuple
+
+
+class OrderedChunkMerger:
+    """
+    Reassembles chunk results in statement order as they arrive out of order.
+
+    `add(index, result)` buffers the result and returns every chunk that is now
+    contiguous with what was already released, as (index, transactions) pairs.
+    Chunks don't overlap, so every extracted row is kept: identical rows (two
+    coffees on the same day) are real transactions.
+
+    Only out-of-order results are held, so memory stays bounded by the
+    extraction concurrency rather than the statement size.
+    """
+
+    def __init__(self):
+        self.closing_balance = 0.0
+        self.released = 0
+        self._next = 0
+        self._pending = {}
+
+    def add(self, index: int, result: Optional[dict]) -> List[Tuple[int, List[dict]]]:
+        """`result` is the chunk's StatementAnalysis dict, or None if the chunk failed."""
+        self._pending[index] = result
+        ready = []
+        while self._next in self._pending:
+            ready.append((self._next, self._release(self._pending.pop(self._next))))
+            self._next += 1
+        return ready
+
+    @property
+    def buffered(self) -> int:
+        return len(self._pending)
+
+    def _release(self, result: Optional[dict]) -> List[dict]:
+        if result is None:
+            return []
+        if result.get("closing_balance", 0.0) != 0.0:
+            self.closing_balance = result["closing_balance"]
+        transactions = list(result.get("transactions", []))
+        self.released += len(transactions)
+        return transactions
+
+
+def in_statement_order(parsed_rows: List[Tuple[int, dict]], chunk_rows: Dict[int, List[dict]],
+                       chunk_lines: List[int]) -> List[dict]:
+    """
+    Parser rows and LLM rows interleaved by their line in the original statement.
+
+    `parsed_rows` are (line index, transaction) pairs; `chunk_rows` maps a chunk
+    index to its extracted rows and `chunk_lines` gives each chunk's first
+    original line. The LLM doesn't say which line a row came from, so a chunk's
+    rows stay together, in extraction order, at the chunk's first line.
+    """
+    keyed = [(line, 0, i, t) for i, (line, t) in enumerate(parsed_rows)]
+    for index, rows in chunk_rows.items():
+        keyed.extend((chunk_lines[index], 1, index, t) for t in rows)
+    # Python's sort is stable, so rows of one chunk keep their order
+    keyed.sort(key=lambda item: item[:3])
+    return [t for *_, t in keyed]
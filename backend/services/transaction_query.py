@@ -0,0 +1,106 @@
+import base64
+import json
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+import models
+from services.migrations import merchant_key, posted_on
+
+ORDERS = ("desc", "asc")
+
+
+def encode_cursor(date: Optional[str], id: int) -> str:
+    """Opaque token for the (date, id) of the last row of a page."""
+    return base64.urlsafe_b64encode(json.dumps([date, id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[Optional[str], int]:
+    """(date, id) from `encode_cursor`; ValueError if the token wasn't made by it."""
+    try:
+        date, id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(id, int) or not (date is None or isinstance(date, str)):
+        raise ValueError("Invalid cursor")
+    return date, id
+
+
+def _date(value: str, name: str):
+    parsed = posted_on(value)
+    if parsed is None:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date")
+    return parsed
+
+
+def _after(date: str, id: int, order: str):
+    """Rows after (date, id) in `order`, as one row-value comparison the (date, id) index can seek to."""
+    t = models.Transaction
+    if order == "desc":
+        return tuple_(t.date, t.id) < tuple_(date, id)
+    return tuple_(t.date, t.id) > tuple_(date, id)
+
+
+def page_transactions(db: Session, limit: int = 100, cursor: Optional[str] = None, order: str = "desc",
+                      date_from: Optional[str] = None, date_to: Optional[str] = None,
+                      category: Optional[str] = None, type: Optional[str] = None,
+                      merchant: Optional[str] = None, min_amount: Optional[float] = None,
+                      max_amount: Optional[float] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of stored transactions ordered by (date, id), and the cursor of the
+    next page (None on the last one).
+
+    Pages continue from the cursor with a keyset condition instead of OFFSET, so
+    every page costs the same however deep it is, and rows inserted meanwhile
+    don't shift later pages. Category and type filters seek into the matching
+    (column, date, id) index; `merchant` is a case-insensitive prefix (any
+    script), a range on the (merchant_key, date, id) index. Date ranges
+    (YYYY-MM-DD) compare the typed posted_on, so rows whose date isn't a valid
+    date never match one; they and amount ranges are checked while walking the
+    index. Raises ValueError for a bad cursor, order or date.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order '{order}'. Choose one of: {', '.join(ORDERS)}")
+    t = models.Transaction
+    query = select(*t.__table__.columns)
+    if date_from:
+        query = query.where(t.posted_on >= _date(date_from, "date_from"))
+    if date_to:
+        query = query.where(t.posted_on <= _date(date_to, "date_to"))
+    if category:
+        query = query.where(t.category == category)
+    if type:
+        query = query.where(t.type == type)
+    if merchant:
+        prefix = merchant_key(merchant)
+        query = query.where(t.merchant_key >= prefix, t.merchant_key < prefix + "\U0010ffff")
+    if min_amount is not None:
+        query = query.where(t.amount >= min_amount)
+    if max_amount is not None:
+        query = query.where(t.amount <= max_amount)
+    keys = (t.date.desc(), t.id.desc()) if order == "desc" else (t.date.asc(), t.id.asc())
+
+    # Rows without a date sort after dated ones in descending order and before
+    # them in ascending order (as SQLite sorts NULL). They are read by a query
+    # of their own: an OR in the keyset condition would stop the index seek.
+    dated = (True, False) if order == "desc" else (False, True)
+    first, after = 0, None
+    if cursor:
+        date, id = decode_cursor(cursor)
+        first = dated.index(date is not None)
+        after = _after(date, id, order) if date is not None else (t.id < id if order == "desc" else t.id > id)
+
+    # One row more than asked tells whether there is a next page
+    rows = []
+    for has_date in dated[first:]:
+        part = query.where(t.date.is_not(None) if has_date else t.date.is_(None))
+        if after is not None:
+            part, after = part.where(after), None
+        rows += [dict(row._mapping) for row in db.execute(part.order_by(*keys).limit(limit + 1 - len(rows)))]
+        if len(rows) > limit:
+            break
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]["date"], rows[-1]["id"])
@@ -0,0 +1,70 @@
+from typing import List, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+import models
+from services.migrations import posted_on
+
+GROUPS = ("month", "category", "type")
+
+
+def _date(value: Optional[str], name: str):
+    if not value:
+        return None
+    parsed = posted_on(value)
+    if parsed is None:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date")
+    return parsed
+
+
+def summarize(db: Session, group: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+              type: Optional[str] = None, category: Optional[str] = None) -> List[dict]:
+    """
+    Transaction totals grouped by `group`, computed by one GROUP BY over
+    posted_on and amount_cents (index-only on ix_transactions_summary), so
+    sums are exact and no row is loaded into Python:
+
+    - month: {"month", "income", "expense", "count"} newest first, where expense
+      is everything that isn't income (as in TransactionFrame.monthly); undated
+      rows are left out;
+    - category / type: {<group>, "total", "count"}, largest total first.
+
+    Raises ValueError for an unknown group or a malformed date.
+    """
+    if group not in GROUPS:
+        raise ValueError(f"Unknown group '{group}'. Choose one of: {', '.join(GROUPS)}")
+    t = models.Transaction
+    if group == "month":
+        key = func.strftime("%Y-%m", t.posted_on)
+        is_income = t.type == "income"
+        columns = [
+            func.coalesce(func.sum(case((is_income, t.amount_cents), else_=0)), 0),
+            func.coalesce(func.sum(case((is_income, 0), else_=t.amount_cents)), 0),
+        ]
+    else:
+        key = getattr(t, group)
+        columns = [func.coalesce(func.sum(t.amount_cents), 0)]
+    query = select(key, *columns, func.count()).group_by(key)
+
+    start, end = _date(date_from, "date_from"), _date(date_to, "date_to")
+    if start:
+        query = query.where(t.posted_on >= start)
+    if end:
+        query = query.where(t.posted_on <= end)
+    if group == "month":
+        query = query.where(t.posted_on.is_not(None))
+    if type:
+        query = query.where(t.type == type)
+    if category:
+        query = query.where(t.category == category)
+
+    if group == "month":
+        return [
+            {"month": month, "income": income / 100, "expense": expense / 100, "count": count}
+            for month, income, expense, count in db.execute(query.order_by(key.desc()))
+        ]
+    return [
+        {group: value, "total": cents / 100, "count": count}
+        for value, cents, count in db.execute(query.order_by(columns[0].desc(), key))
+    ]
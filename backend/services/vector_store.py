@@ -0,0 +1,200 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from typing import List, Optional
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from services.embeddings import create_embeddings
+from services.statement_parser import DATE, date_order, parse_date
+
+_DATE_RE = re.compile(rf"(?<![\w/-])(?:{DATE})(?![\w/-])")
+
+
+def chunk_id(text: str) -> str:
+    """Content address of a chunk: identical text is stored (and embedded) once."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def _date_range(text: str, day_first: Optional[bool] = None) -> Optional[tuple]:
+    # Dates as YYYYMMDD ints: Chroma's where-filters only compare numbers
+    dates = [parse_date(match.group(0), day_first) for match in _DATE_RE.finditer(text)]
+    dates = [int(d.replace("-", "")) for d in dates if d]
+    return (min(dates), max(dates)) if dates else None
+
+
+class StatementVectorStore:
+    """
+    Persistent Chroma collection of statement text for chat retrieval.
+
+    Chunks are keyed by content hash, so re-uploading a statement (or an
+    overlapping one) only embeds chunks that aren't stored yet, and earlier
+    uploads stay searchable across uploads and restarts. A chunk's metadata is
+    fixed when it is first stored: its chunk_id, the upload_id of that upload
+    and the range of the dates it mentions (date_from/date_to as YYYYMMDD ints).
+    Which uploads contained it is kept in a (upload_id, chunk_id) table in
+    uploads.sqlite3 next to the collection, so reuse never rewrites metadata.
+
+    The collection lives in CHROMA_PERSIST_DIR (default ./chroma_db), one per
+    embedding backend/model (see services.embeddings), and is opened on first use;
+    an OpenAI embedding client is created from the caller's key.
+    """
+
+    def __init__(self, persist_directory: str = None, collection_name: str = None, embedding=None):
+        self.persist_directory = persist_directory or os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+        self.collection_name = collection_name or os.getenv("CHROMA_COLLECTION", "statements")
+        self._embedding = embedding
+        self.embedding = None
+        self._store = None
+        self._lock = threading.Lock()
+        self._splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=20)
+
+    def _members(self) -> sqlite3.Connection:
+        os.makedirs(self.persist_directory, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.persist_directory, "uploads.sqlite3"))
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS upload_chunks ("
+            " upload_id TEXT NOT NULL, chunk_id TEXT NOT NULL, PRIMARY KEY (upload_id, chunk_id))"
+        )
+        return conn
+
+    def upload_chunks(self, upload_id: str) -> List[str]:
+        """Ids of every chunk the upload contained, including ones an earlier upload stored."""
+        with self._lock:
+            conn = self._members()
+            try:
+                rows = conn.execute("SELECT chunk_id FROM upload_chunks WHERE upload_id = ?", (upload_id,)).fetchall()
+            finally:
+                conn.close()
+        return [row[0] for row in rows]
+
+    def _get_store(self, api_key: Optional[str]):
+        if self._store is not None:
+            return self._store
+        with self._lock:
+            if self._store is None:
+                from langchain_chroma import Chroma
+                embedding, collection_name = self._embedding, self.collection_name
+                if embedding is None:
+                    embedding, namespace = create_embeddings(api_key)
+                    # One collection per embedding model: vectors of different models can't be compared
+                    collection_name = f"{self.collection_name}-{namespace}"[:63].rstrip("._-")
+                self.embedding = embedding
+                self._store = Chroma(
+                    collection_name=collection_name,
+                    embedding_function=embedding,
+                    persist_directory=self.persist_directory,
+                )
+        return self._store
+
+    def ingest(self, text_lines: List[str], api_key: str, upload_id: str = None) -> dict:
+        """
+        Splits the statement and stores chunks not already in the collection.
+        Returns {"upload_id", "chunks", "added", "skipped", "date_from", "date_to"}.
+        """
+        upload_id = upload_id or uuid.uuid4().hex
+        texts = list(dict.fromkeys(self._splitter.split_text("\n".join(text_lines)))) if text_lines else []
+        day_first = date_order(text_lines) if text_lines else None
+        statement_range = _date_range("\n".join(text_lines), day_first) if text_lines else None
+        result = {
+            "upload_id": upload_id,
+            "chunks": len(texts),
+            "added": 0,
+            "skipped": 0,
+            "date_from": statement_range[0] if statement_range else None,
+            "date_to": statement_range[1] if statement_range else None,
+        }
+        if not texts:
+            return result
+
+        store = self._get_store(api_key)
+        ids = [chunk_id(text) for text in texts]
+        # Serialize the existence check and the add so concurrent uploads don't embed the same chunk twice
+        with self._lock:
+            existing = set(store.get(ids=ids, include=[])["ids"])
+            new = [(i, text) for i, text in zip(ids, texts) if i not in existing]
+            if new:
+                metadatas = []
+                for i, text in new:
+                    metadata = {"upload_id": upload_id, "chunk_id": i}
+                    chunk_range = _date_range(text, day_first)
+                    if chunk_range:
+                        metadata["date_from"], metadata["date_to"] = chunk_range
+                    metadatas.append(metadata)
+                store.add_texts([text for _, text in new], metadatas=metadatas, ids=[i for i, _ in new])
+            # Chunks already stored become members of this upload too, without re-embedding
+            conn = self._members()
+            try:
+                with conn:
+                    conn.executemany("INSERT OR IGNORE INTO upload_chunks (upload_id, chunk_id) VALUES (?, ?)",
+                                     [(upload_id, i) for i in ids])
+            finally:
+                conn.close()
+        result["added"] = len(new)
+        result["skipped"] = len(texts) - len(new)
+        return result
+
+    def search(self, query: str, api_key: str, k: int = 3, upload_id: str = None,
+               date_from: int = None, date_to: int = None) -> List[str]:
+        """Top-k chunk texts, optionally limited to one upload and/or chunks overlapping a YYYYMMDD date range."""
+        store = self._get_store(api_key)
+        conditions = []
+        if upload_id:
+            # Chunks stored before the membership table only match the upload that first stored them
+            members = self.upload_chunks(upload_id)
+            upload = {"upload_id": upload_id}
+            conditions.append({"$or": [{"chunk_id": {"$in": members}}, upload]} if members else upload)
+        if date_from is not None:
+            conditions.append({"date_to": {"$gte": date_from}})
+        if date_to is not None:
+            conditions.append({"date_from": {"$lte": date_to}})
+        where = None
+        if len(conditions) == 1:
+            where = conditions[0]
+        elif conditions:
+            where = {"$and": conditions}
+        return [doc.page_content for doc in store.similarity_search(query, k=k, filter=where)]
+
+    def clear(self) -> int:
+        """
+        Deletes every collection of this store (all embedding models), e.g. when
+        all data is cleared; the next ingest or search starts from an empty
+        collection. Returns the number of collections deleted.
+        """
+        with self._lock:
+            if self._store is None and not os.path.isdir(self.persist_directory):
+                return 0
+            if self._store is not None:
+                client = self._store._client
+            else:
+                import chromadb
+                client = chromadb.PersistentClient(path=self.persist_directory)
+            names = [getattr(c, "name", c) for c in client.list_collections()]
+            deleted = 0
+            for name in names:
+                if name == self.collection_name or name.startswith(f"{self.collection_name}-"):
+                    client.delete_collection(name)
+                    deleted += 1
+            self._store = None
+            conn = self._members()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM upload_chunks")
+            finally:
+                conn.close()
+        return deleted
+
+    def warm_up(self, api_key: Optional[str]):
+        """Opens the collection in a background thread so the first upload or chat doesn't pay for it."""
+        def load():
+            try:
+                self._get_store(api_key)
+            except Exception as e:
+                print(f"Vector store: warm-up failed ({e})")
+        threading.Thread(target=load, name="vector-store-warmup", daemon=True).start()
+
+
+statement_store = StatementVectorStore()
@@ -0,0 +1,203 @@
+import importlib.util
+import os
+from typing import List
+
+import numpy as np
+
+HYPOTHESIS_TEMPLATE = "This transaction is for {}."
+
+
+class CrossEncoderEngine:
+    """
+    NLI CrossEncoder: scores every (description, hypothesis) pair, i.e.
+    len(texts) x len(categories) forward passes per batch.
+    """
+    name = "cross-encoder"
+    default_model = "cross-encoder/nli-distilroberta-base"
+    requires = ("sentence_transformers",)
+
+    def __init__(self, categories: List[str], model_name: str = None):
+        self.categories = categories
+        self.model_name = model_name or self.default_model
+        self.model = None
+
+    def load(self):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(self.model_name)
+
+    def predict(self, texts: List[str]) -> List[str]:
+        pairs = []
+        for text in texts:
+            for category in self.categories:
+                pairs.append([text, HYPOTHESIS_TEMPLATE.format(category)])
+
+        # Predict scores (N, 3)
+        scores = self.model.predict(pairs, batch_size=32, show_progress_bar=False)
+
+        # Reshape to (Num_Texts, Num_Categories, 3) and take entailment scores (index 1)
+        entailment_scores = scores.reshape(len(texts), len(self.categories), 3)[:, :, 1]
+        return [self.categories[i] for i in entailment_scores.argmax(axis=1)]
+
+
+class BiEncoderEngine:
+    """
+    Sentence-transformers bi-encoder: category hypotheses are embedded once at
+    load time, each description is encoded once, and the category is the
+    cosine-similarity argmax over the whole batch.
+    """
+    name = "bi-encoder"
+    default_model = "sentence-transformers/all-MiniLM-L6-v2"
+    requires = ("sentence_transformers",)
+
+    def __init__(self, categories: List[str], model_name: str = None, batch_size: int = 64):
+        self.categories = categories
+        self.model_name = model_name or self.default_model
+        self.batch_size = batch_size
+        self.model = None
+        self.category_embeddings = None
+
+    def load(self):
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(self.model_name, device="cpu")
+        hypotheses = [HYPOTHESIS_TEMPLATE.format(category) for category in self.categories]
+        self.category_embeddings = model.encode(
+            hypotheses, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+        )
+        self.model = model
+
+    def predict(self, texts: List[str]) -> List[str]:
+        embeddings = self.model.encode(
+            texts, batch_size=self.batch_size, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=False
+        )
+        # Both sides are L2-normalized, so the dot product is the cosine similarity
+        scores = embeddings @ self.category_embeddings.T
+        return [self.categories[i] for i in np.argmax(scores, axis=1)]
+
+
+class OnnxCrossEncoderEngine:
+    """
+    The CrossEncoder exported to ONNX, dynamically quantized to int8 and run
+    under ONNX Runtime on CPU. Pairs are sorted by token length before
+    batching so each batch is padded only to its own longest pair.
+
+    Requires `onnxruntime` and `onnx` (plus torch/transformers for the
+    one-time export). The exported model is kept under ONNX_MODEL_DIR and
+    ONNX_INTRA_OP_THREADS sets the intra-op thread count (0 = runtime default).
+    """
+    name = "onnx"
+    default_model = CrossEncoderEngine.default_model
+    requires = ("onnxruntime", "onnx", "transformers")
+
+    def __init__(self, categories: List[str], model_name: str = None, batch_size: int = 32):
+        self.categories = categories
+        self.model_name = model_name or self.default_model
+        self.batch_size = batch_size
+        self.intra_op_threads = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+        self.model_dir = os.path.join(os.getenv("ONNX_MODEL_DIR", "./onnx_models"), self.model_name.replace("/", "__"))
+        self.model = None
+        self.tokenizer = None
+        self._input_names = []
+
+    def load(self):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        quantized_path = os.path.join(self.model_dir, "model.int8.onnx")
+        if not os.path.exists(quantized_path):
+            self._export(quantized_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.intra_op_threads > 0:
+            options.intra_op_num_threads = self.intra_op_threads
+        session = ort.InferenceSession(quantized_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = [i.name for i in session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        self.model = session
+
+    def _export(self, quantized_path: str):
+        import torch
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        print(f"Exporting {self.model_name} to ONNX (one-time)...")
+        os.makedirs(self.model_dir, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_name).eval()
+        tokenizer.save_pretrained(self.model_dir)
+
+        sample = tokenizer(["sample text"], [HYPOTHESIS_TEMPLATE.format("Dining")], return_tensors="pt")
+        input_names = list(sample.keys())
+        fp32_path = os.path.join(self.model_dir, "model.onnx")
+        export_kwargs = dict(
+            input_names=input_names, output_names=["logits"],
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names}, "logits": {0: "batch"}},
+            opset_version=14,
+        )
+        with torch.no_grad():
+            try:
+                # Newer torch defaults to the dynamo exporter, whose graphs don't quantize cleanly
+                torch.onnx.export(model, tuple(sample[name] for name in input_names), fp32_path, dynamo=False, **export_kwargs)
+            except TypeError:
+                torch.onnx.export(model, tuple(sample[name] for name in input_names), fp32_path, **export_kwargs)
+        quantize_dynamic(fp32_path, quantized_path, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+
+    def predict(self, texts: List[str]) -> List[str]:
+        firsts, seconds = [], []
+        for text in texts:
+            for category in self.categories:
+                firsts.append(text)
+                seconds.append(HYPOTHESIS_TEMPLATE.format(category))
+
+        encoded = self.tokenizer(firsts, seconds, truncation=True)
+        order = np.argsort([len(ids) for ids in encoded["input_ids"]], kind="stable")
+        logits = np.empty((len(firsts), 3), dtype=np.float32)
+
+        for start in range(0, len(order), self.batch_size):
+            batch_idx = order[start:start + self.batch_size]
+            batch = self.tokenizer.pad(
+                {name: [encoded[name][i] for i in batch_idx] for name in encoded.keys()},
+                return_tensors="np",
+            )
+            feeds = {name: batch[name].astype(np.int64) for name in self._input_names}
+            logits[batch_idx] = self.model.run(None, feeds)[0]
+
+        # Same entailment index (1) as the torch CrossEncoder path
+        entailment_scores = logits.reshape(len(texts), len(self.categories), 3)[:, :, 1]
+        return [self.categories[i] for i in entailment_scores.argmax(axis=1)]
+
+
+ENGINES = {
+    CrossEncoderEngine.name: CrossEncoderEngine,
+    BiEncoderEngine.name: BiEncoderEngine,
+    OnnxCrossEncoderEngine.name: OnnxCrossEncoderEngine,
+}
+
+
+def is_available(engine_class) -> bool:
+    """Whether the packages an engine imports in `load()` are installed (without importing them)."""
+    return all(importlib.util.find_spec(module) is not None for module in getattr(engine_class, "requires", ()))
+
+
+def create_engine(categories: List[str], engine: str = None, model_name: str = None):
+    """
+    Builds the zero-shot engine selected by `engine` or the ZERO_SHOT_ENGINE env var
+    (default: cross-encoder; also bi-encoder, onnx). ZERO_SHOT_MODEL overrides the engine's default model.
+    An engine whose packages aren't installed falls back to the cross-encoder, keeping the
+    model only if the engine runs a cross-encoder model too.
+    The model itself is not loaded until `load()` is called.
+    """
+    engine = engine or os.getenv("ZERO_SHOT_ENGINE", CrossEncoderEngine.name)
+    model_name = model_name or os.getenv("ZERO_SHOT_MODEL") or None
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown zero-shot engine '{engine}'. Choose one of: {', '.join(ENGINES)}")
+    engine_class = ENGINES[engine]
+    if engine_class is not CrossEncoderEngine and not is_available(engine_class):
+        print(f"Zero-shot engine '{engine}' needs {', '.join(engine_class.requires)}; "
+              f"falling back to {CrossEncoderEngine.name}")
+        if engine_class.default_model != CrossEncoderEngine.default_model:
+            model_name = None
+        engine_class = CrossEncoderEngine
+    return engine_class(categories, model_name=model_name)
@@ -0,0 +1,46 @@
+import numpy as np
+
+from services.aggregation import EXPENSE, INCOME, TransactionFrame
+
+TRANSACTIONS = [
+    {"date": "2024-01-03", "amount": 2500, "type": "income", "category": "Income"},
+    {"date": "2024-01-05", "amount": 45.5, "type": "expense", "category": "Groceries"},
+    {"date": "2024-01-09", "amount": "12.25", "type": "expense", "category": "Dining"},
+    {"date": "2024-02-01", "amount": 30, "type": "expense", "category": "Groceries"},
+    {"date": "2024-02-11", "amount": 100, "type": "transfer", "category": "Others"},
+    {"date": "2024-02-12", "amount": 9.99, "type": "expense"},
+    {"date": "", "amount": 5, "type": "expense", "category": "Dining"},
+    {"date": "2024-02-13", "amount": "n/a", "type": "expense", "category": "Dining"},
+]
+
+def test_totals_and_categories():
+    frame = TransactionFrame(TRANSACTIONS)
+    assert frame.total(INCOME) == 2500
+    assert frame.total(EXPENSE) == 45.5 + 12.25 + 30 + 9.99 + 5
+    # Unparseable amounts are ignored, categories keep first-appearance order
+    assert frame.category_totals(EXPENSE) == {"Groceries": 75.5, "Dining": 17.25, "Other": 9.99}
+    assert list(frame.category_totals()) == ["Income", "Groceries", "Dining", "Others", "Other"]
+    print("Aggregation totals: SUCCESS")
+
+def test_monthly_breakdown():
+    months = TransactionFrame(TRANSACTIONS).monthly()
+    # Newest first, undated rows left out, anything not income counts as spending
+    assert [m["month"] for m in months] == ["2024-02", "2024-01"]
+    assert months[0] == {"month": "2024-02", "income": 0.0, "expense": 139.99,
+                         "categories": {"Groceries": 30.0, "Others": 100.0, "Other": 9.99}}
+    assert months[1]["income"] == 2500 and months[1]["categories"] == {"Groceries": 45.5, "Dining": 12.25}
+
+    months, categories, sums = TransactionFrame(TRANSACTIONS).month_category_matrix(EXPENSE)
+    assert sums.shape == (len(months), len(categories))
+    assert sums[months.index("2024-01"), categories.index("Groceries")] == 45.5
+    assert np.isclose(sums.sum(), 45.5 + 12.25 + 30 + 9.99 + 5)
+    print("Aggregation months: SUCCESS")
+
+def test_empty():
+    frame = TransactionFrame([])
+    assert frame.total() == 0 and frame.category_totals() == {} and frame.monthly() == []
+
+if __name__ == "__main__":
+    test_totals_and_categories()
+    test_monthly_breakdown()
+    test_empty()
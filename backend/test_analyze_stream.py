@@ -0,0 +1,95 @@
+import asyncio
+import os
+import tempfile
+import threading
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+import services.llm_service as llm_service
+from services.chunking import TokenBudgetChunker
+from services.llm_cache import LLMCache
+from services.llm_service import StatementAnalysis, astream_transactions_from_text
+
+def fake_extraction_chain(api_key, base_url):
+    async def extract(inputs):
+        lines = inputs["text"].split("\n")
+        # Finish chunks out of order: later chunks come back first
+        await asyncio.sleep(0.01 * (5 - int(lines[0].split()[1]) // 200))
+        if "FAIL" in inputs["text"]:
+            raise ValueError("bad chunk")
+        transactions = [
+            {"date": "2024-01-01", "merchant": line, "amount": 1.0, "type": "expense", "category": "Others", "description": line}
+            for line in lines
+        ]
+        closing = 999.0 if "LAST" in inputs["text"] else 0.0
+        return StatementAnalysis(transactions=transactions, closing_balance=closing)
+    return RunnableLambda(extract)
+
+async def fake_classify(transactions, api_key, base_url):
+    for t in transactions:
+        t["category"] = "Shopping"
+
+async def collect(lines):
+    return [event async for event in astream_transactions_from_text(lines, "sk-test", None)]
+
+def test_stream_events(monkeypatch):
+    monkeypatch.setattr(llm_service, "_build_extraction_chain", fake_extraction_chain)
+    monkeypatch.setattr(llm_service, "_aclassify_extracted", fake_classify)
+    monkeypatch.setattr(llm_service, "llm_cache", LLMCache(path=os.path.join(tempfile.mkdtemp(), "llm_cache.db")))
+    # One token per line: 3 chunks of ~200 lines
+    monkeypatch.setattr(llm_service, "chunker", TokenBudgetChunker(target_tokens=201, count=lambda line: 0))
+
+    lines = [f"ROW {i} 1.00" for i in range(600)] + ["ROW 600 LAST 1.00"]
+    events = asyncio.run(collect(lines))
+
+    assert events[-1]["event"] == "summary"
+    batches = [e for e in events if e["event"] == "transactions"]
+    # Later chunks finish first, but are released in statement order
+    assert [e["chunk"] for e in batches] == [0, 1, 2]
+
+    # Every row is emitted exactly once, and every row is classified before it is sent
+    descriptions = [t["description"] for e in batches for t in e["transactions"]]
+    assert len(descriptions) == len(set(descriptions)) == len(lines)
+    assert all(t["category"] == "Shopping" for e in batches for t in e["transactions"])
+
+    summary = events[-1]
+    assert summary["closing_balance"] == 999.0
+    assert summary["total_transactions"] == len(lines)
+    assert summary["failed_chunks"] == []
+
+    # A failed chunk is reported and the rest still stream
+    events = asyncio.run(collect(lines[:299] + ["FAIL 1.00"] + lines[300:]))
+    assert [e["chunk"] for e in events if e["event"] == "error"] == [1]
+    assert events[-1]["failed_chunks"] == [1]
+    print("Analyze stream: SUCCESS")
+
+def test_statement_prep_runs_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def recorded(func):
+        def wrapper(*args):
+            threads.append((func.__name__, threading.get_ident()))
+            return func(*args)
+        return wrapper
+
+    monkeypatch.setattr(llm_service, "_prepare_statement", recorded(llm_service._prepare_statement))
+    monkeypatch.setattr(llm_service, "_chunk_lines", recorded(llm_service._chunk_lines))
+    monkeypatch.setattr(llm_service, "_build_extraction_chain", fake_extraction_chain)
+    monkeypatch.setattr(llm_service, "_aclassify_extracted", fake_classify)
+    monkeypatch.setattr(llm_service, "llm_cache", LLMCache(path=os.path.join(tempfile.mkdtemp(), "llm_cache.db")))
+
+    async def run():
+        loop_thread = threading.get_ident()
+        lines = [f"ROW {i} 1.00" for i in range(10)]
+        await llm_service.aextract_transactions_from_text(lines, "sk-test", None)
+        await collect(lines)
+        return loop_thread
+    loop_thread = asyncio.run(run())
+    # Regex parsing and token counting of the whole statement stay off the event loop
+    assert sorted(name for name, _ in threads) == ["_chunk_lines", "_chunk_lines", "_prepare_statement", "_prepare_statement"]
+    assert all(thread != loop_thread for _, thread in threads)
+    print("Statement preparation off the loop: SUCCESS")
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,64 @@
+import datetime
+import random
+
+import numpy as np
+
+from services.anomaly_detector import AnomalyDetector, robust_z
+
+def expense(date, merchant, amount, category="Dining", **extra):
+    return {"date": date, "merchant": merchant, "amount": amount, "type": "expense", "category": category, **extra}
+
+def history(seed=5):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(300):
+        day = (datetime.date(2024, 1, 1) + datetime.timedelta(days=i)).isoformat()
+        rows.append(expense(day, "STARBUCKS", round(rng.uniform(4, 7), 2), id=i))
+        rows.append(expense(day, "WHOLE FOODS", round(rng.uniform(40, 120), 2), "Groceries", id=1000 + i))
+    return rows
+
+def test_robust_z_ignores_the_outlier_it_scores():
+    values = np.array([10.0, 11, 9, 10, 12, 500])
+    z, median = robust_z(np.zeros(6, dtype=np.int64), values, 1)
+    assert median[0] == 10.5
+    assert z[-1] > 100 and np.all(np.abs(z[:-1]) < 2)
+
+def test_unusual_amount():
+    rows = history() + [expense("2024-06-15", "Starbucks", 85.0, id="big")]
+    findings = AnomalyDetector().detect(rows)
+    assert findings[0]["transaction_id"] == "big"
+    assert findings[0]["type"] == "anomaly" and findings[0]["severity"] == "high"
+    assert "Starbucks $85.00" in findings[0]["description"]
+    # Normal spending is not flagged
+    assert AnomalyDetector().detect(history()) == []
+    print("Anomaly outliers: SUCCESS")
+
+def test_duplicates_and_recurring():
+    rows = history() + [
+        expense("2024-03-02", "NETFLIX.COM", 15.49, "Subscriptions", id="n1"),
+        expense("2024-04-02", "NETFLIX.COM", 15.49, "Subscriptions", id="n2"),
+        expense("2024-05-02", "NETFLIX.COM", 15.49, "Subscriptions", id="n3"),
+        expense("2024-07-10", "BEST BUY", 499.99, "Shopping", id="d1"),
+        expense("2024-07-11", "Best  Buy", 499.99, "Shopping", id="d2"),
+        # Same merchant and amount, but far apart: not a duplicate
+        expense("2024-09-01", "BEST BUY", 499.99, "Shopping", id="d3"),
+    ]
+    findings = AnomalyDetector().detect(rows)
+    duplicates = [f for f in findings if f["description"].startswith("Possible duplicate")]
+    assert [f["transaction_id"] for f in duplicates] == ["d2"]
+    assert "1 day apart" in duplicates[0]["description"]
+    recurring = [f for f in findings if f["type"] == "recurring"]
+    assert [f["transaction_id"] for f in recurring] == ["n3"]
+    print("Anomaly duplicates: SUCCESS")
+
+def test_small_groups_and_income_are_skipped():
+    rows = [expense("2024-01-01", "DENTIST", 40.0, "Health"), expense("2024-02-01", "DENTIST", 900.0, "Health"),
+            {"date": "2024-02-01", "merchant": "ACME", "amount": 90000, "type": "income", "category": "Income"}]
+    assert AnomalyDetector().detect(rows) == []
+    assert AnomalyDetector().detect([]) == []
+
+if __name__ == "__main__":
+    test_robust_z_ignores_the_outlier_it_scores()
+    test_unusual_amount()
+    test_duplicates_and_recurring()
+    test_small_groups_and_income_are_skipped()
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import tempfile
+import threading
+
+import httpx
+import pytest
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+
+import main
+import services.llm_service as llm_service
+from services.anomaly_detector import anomaly_detector
+from services.concurrency import run_blocking
+from services.llm_cache import LLMCache
+
+TRANSACTIONS = [{"date": "2024-01-02", "merchant": "CAFE", "amount": 4.5, "type": "expense", "category": "Dining"}]
+
+class Reply(BaseModel):
+    answer: str
+
+def serve(run):
+    """Runs `run(client)` against the app on one event loop, failing instead of hanging if it stalls."""
+    async def main_loop():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.wait_for(run(client), 10)
+    return asyncio.run(main_loop())
+
+def test_llm_calls_wait_on_the_loop(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    insight_done = {}
+
+    def chat_chain(query, transactions, budgets, goals, retrieved_context, api_key, base_url):
+        async def reply(inputs):
+            # Only answers once /insight has been served: a blocked loop would never get there
+            await insight_done["event"].wait()
+            return Reply(answer="chat")
+        return RunnableLambda(reply), {}
+
+    def insight_chain(transactions, goals, api_key, base_url):
+        async def reply(inputs):
+            insight_done["event"].set()
+            return Reply(answer="insight")
+        return RunnableLambda(reply)
+
+    monkeypatch.setattr(llm_service, "_retrieve_context", lambda query, api_key, upload_id: "")
+    monkeypatch.setattr(llm_service, "_build_chat_chain", chat_chain)
+    monkeypatch.setattr(llm_service, "_build_insight_chain", insight_chain)
+
+    async def run(client):
+        insight_done["event"] = asyncio.Event()
+        return await asyncio.gather(
+            client.post("/chat", json={"query": "coffee?", "transactions": TRANSACTIONS}),
+            client.post("/insight", json={"transactions": TRANSACTIONS, "goals": []}),
+        )
+    chat, insight = serve(run)
+    assert chat.json() == {"answer": "chat"} and insight.json() == {"answer": "insight"}
+    print("LLM calls on the loop: SUCCESS")
+
+def test_blocking_work_leaves_the_loop_free(monkeypatch):
+    release = threading.Event()
+
+    def slow_detect(transactions):
+        if not release.wait(timeout=10):
+            raise RuntimeError("never released")
+        return []
+    monkeypatch.setattr(anomaly_detector, "detect", slow_detect)
+
+    async def run(client):
+        anomalies = asyncio.ensure_future(client.post("/anomalies", json={"transactions": TRANSACTIONS}))
+        # Served while detection is still blocked on its executor thread
+        health = await client.get("/health")
+        assert not anomalies.done()
+        release.set()
+        return health, await anomalies
+    health, anomalies = serve(run)
+    assert health.status_code == 200 and anomalies.json() == {"anomalies": []}
+    print("Blocking work off the loop: SUCCESS")
+
+def test_errors_propagate_from_run_blocking(monkeypatch):
+    def broken(*args):
+        raise ValueError("detector broke")
+
+    async def direct():
+        await run_blocking(broken)
+    with pytest.raises(ValueError, match="detector broke"):
+        asyncio.run(direct())
+
+    monkeypatch.setattr(anomaly_detector, "detect", broken)
+    response = serve(lambda client: client.post("/anomalies", json={"transactions": TRANSACTIONS}))
+    assert response.status_code == 500 and response.json()["detail"] == "detector broke"
+    print("Errors from run_blocking: SUCCESS")
+
+def test_async_llm_classification(monkeypatch):
+    threads = []
+
+    def classification_chain(pending, api_key, base_url):
+        threads.append(threading.get_ident())
+        # Async only: a sync invoke() of this chain would fail
+        async def classify(inputs):
+            threads.append(threading.get_ident())
+            return llm_service.CategoryList(categories=["Dining" for _ in pending])
+        return RunnableLambda(classify)
+
+    monkeypatch.setattr(llm_service, "llm_cache", LLMCache(path=os.path.join(tempfile.mkdtemp(), "llm_cache.db")))
+    monkeypatch.setattr(llm_service, "_build_classification_chain", classification_chain)
+
+    async def run():
+        categories = await llm_service.aclassify_transactions_with_llm(["ZXQ 1", "ZXQ 2", "ZXQ 1"], "sk-test", None)
+        cached = await llm_service.aclassify_transactions_with_llm(["ZXQ 2"], "sk-test", None)
+        return categories, cached, threading.get_ident()
+    categories, cached, loop_thread = asyncio.run(run())
+    assert categories == ["Dining"] * 3 and cached == ["Dining"]
+    # Built on the blocking executor, awaited on the loop; the repeat came from the cache
+    assert len(threads) == 2 and threads[0] != loop_thread and threads[1] == loop_thread
+    print("Async LLM classification: SUCCESS")
+
+if __name__ == "__main__":
+    pytest.main([__file__])
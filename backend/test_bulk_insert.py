@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+import models
+from services.bulk_insert import insert_returning
+
+def row(i):
+    return {"date": f"2024-01-{i % 28 + 1:02d}", "merchant": f"MERCHANT {i}", "amount": i + 0.5,
+            "type": "expense", "category": "Shopping", "description": f"PURCHASE {i}"}
+
+def test_insert_returning_batches(db_engine, db_sessions):
+    statements = []
+    event.listen(db_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    db = db_sessions()
+    created = insert_returning(db, models.Transaction, (row(i) for i in range(1200)), batch_size=500)
+    db.commit()
+    # Ids in input order, defaults filled in, and a few statements rather than one per row
+    assert [t["merchant"] for t in created] == [f"MERCHANT {i}" for i in range(1200)]
+    assert len({t["id"] for t in created}) == 1200 and created[0]["is_recurring"] is False
+    assert sum(1 for s in statements if s.startswith("INSERT")) <= 6
+    assert not any(s.startswith("SELECT") for s in statements)
+    db.close()
+    print("Bulk insert: SUCCESS")
+
+def test_idempotent_create(db_sessions, api_client):
+    payload = [row(i) for i in range(3)]
+    first = api_client.post("/transactions", json=payload, headers={"Idempotency-Key": "upload-1"}).json()
+    assert [t["id"] for t in first] == [1, 2, 3] and first[0]["description"] == "PURCHASE 0"
+    # Retried: same response, nothing inserted again
+    retry = api_client.post("/transactions", json=payload, headers={"Idempotency-Key": "upload-1"}).json()
+    assert retry == first
+    # The same key with another body is a client error, not a replay
+    changed = api_client.post("/transactions", json=payload[:2], headers={"Idempotency-Key": "upload-1"})
+    assert changed.status_code == 422 and "different request body" in changed.json()["detail"]
+    assert len(api_client.post("/transactions", json=payload).json()) == 3
+    db = db_sessions()
+    assert db.query(models.Transaction).count() == 6
+    db.close()
+
+    goals = [{"name": "Car", "target_amount": 5000, "deadline": "2026-01-01"}]
+    created = api_client.post("/goals", json=goals, headers={"Idempotency-Key": "upload-1"}).json()
+    assert created[0]["current_amount"] == 0 and created[0]["id"] == 1
+    assert api_client.post("/goals", json=goals, headers={"Idempotency-Key": "upload-1"}).json() == created
+    print("Idempotency: SUCCESS")
+
+def test_streaming_import(db_sessions, api_client):
+    ndjson = "\n".join(json.dumps(row(i)) for i in range(1100)) + "\n"
+    chunks = (ndjson[i:i + 1000].encode() for i in range(0, len(ndjson), 1000))
+    response = api_client.post("/transactions/import", content=chunks, headers={"Content-Type": "application/x-ndjson"})
+    assert response.json() == {"inserted": 1100}
+
+    csv_body = "date,merchant,amount,type,category,description\n2024-02-01,\"ACME, INC\",12.50,expense,Bills,ACME\n"
+    response = api_client.post("/transactions/import", content=csv_body, headers={"Content-Type": "text/csv", "Idempotency-Key": "csv-1"})
+    assert response.json() == {"inserted": 1}
+    assert api_client.post("/transactions/import", content=csv_body, headers={"Content-Type": "text/csv", "Idempotency-Key": "csv-1"}).json() == {"inserted": 1}
+    other = api_client.post("/transactions/import", content=csv_body.replace("12.50", "13.50"),
+                            headers={"Content-Type": "text/csv", "Idempotency-Key": "csv-1"})
+    assert other.status_code == 422
+
+    # Quoted fields may span lines, even across body chunks
+    multiline = ("date,merchant,amount,type,category,description\n"
+                 "2024-02-02,SHOP,1.00,expense,Shopping,\"GIFT\nFOR \"\"MUM\"\"\"\n"
+                 "\n2024-02-03,SHOP,2.00,expense,Shopping,PLAIN\n")
+    chunks = (multiline[i:i + 7].encode() for i in range(0, len(multiline), 7))
+    response = api_client.post("/transactions/import", content=chunks, headers={"Content-Type": "text/csv"})
+    assert response.json() == {"inserted": 2}
+    bad_csv = multiline + "2024-02-04,SHOP,lots,expense,Shopping,X\n"
+    response = api_client.post("/transactions/import", content=bad_csv, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 400 and response.json()["detail"].startswith("Line 6:")
+
+    # A bad row rejects the whole upload
+    bad = json.dumps(row(1)) + "\n" + json.dumps({**row(2), "amount": "lots"}) + "\n"
+    response = api_client.post("/transactions/import", content=bad)
+    assert response.status_code == 400 and response.json()["detail"].startswith("Line 2:")
+
+    db = db_sessions()
+    assert db.query(models.Transaction).count() == 1103
+    assert db.query(models.Transaction).filter(models.Transaction.merchant == "ACME, INC").one().amount == 12.5
+    assert db.query(models.Transaction).filter(models.Transaction.amount == 1.0).one().description == 'GIFT\nFOR "MUM"'
+    db.close()
+    print("Streaming import: SUCCESS")
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,54 @@
+from services.chunking import TokenBudgetChunker
+
+def count_words(line):
+    return len(line.split())
+
+def test_cuts_only_at_rows_without_overlap():
+    lines = []
+    for i in range(120):
+        lines.append(f"01/{i % 28 + 1:02d}/2024 MERCHANT {i} 12.00")
+        if i % 3 == 0:
+            lines.append(f"    CONTINUED DETAILS FOR {i}")
+
+    chunker = TokenBudgetChunker(target_tokens=100, max_tokens=1000, count=count_words)
+    chunks = chunker.split(lines)
+
+    # Every line exactly once, in order, and every chunk opens with a dated row
+    assert [line for chunk in chunks for line in chunk] == lines
+    assert all(chunk[0].startswith("01/") for chunk in chunks)
+
+    # The fewest chunks that fit the budget, evenly sized
+    sizes = [sum(count_words(line) + 1 for line in chunk) for chunk in chunks]
+    assert len(chunks) == -(-sum(sizes) // 100)
+    assert max(sizes) - min(sizes) <= 10
+    print("Chunking boundaries: SUCCESS")
+
+def test_budget_follows_latency():
+    chunker = TokenBudgetChunker(target_tokens=2000, min_tokens=500, max_tokens=4000, target_seconds=20)
+    assert chunker.budget == 2000
+
+    # 10ms per token -> 2000 tokens fit in 20s
+    chunker.observe(1000, 10.0)
+    assert chunker.budget == 2000
+
+    # The model slows down: chunks shrink, but not below the minimum
+    for _ in range(20):
+        chunker.observe(1000, 100.0)
+    assert chunker.budget == 500
+
+    # Fast responses: chunks grow up to the maximum
+    for _ in range(20):
+        chunker.observe(1000, 1.0)
+    assert chunker.budget == 4000
+    print("Chunking budget: SUCCESS")
+
+def test_unbroken_text_is_still_cut():
+    # No dated rows at all: any line is a cut point (4 tokens per line, 360 total)
+    lines = [f"ITEM {i} 5.00" for i in range(90)]
+    chunks = TokenBudgetChunker(target_tokens=100, max_tokens=1000, count=count_words).split(lines)
+    assert [len(chunk) for chunk in chunks] == [23, 22, 23, 22]
+
+if __name__ == "__main__":
+    test_cuts_only_at_rows_without_overlap()
+    test_budget_follows_latency()
+    test_unbroken_text_is_still_cut()
@@ -1,7 +1,12 @@
+import pytest
+
+from services.classification_cache import ClassificationCache
 from services.classification_service import classifier
 import time
 
-def test_classification():
+def test_classification(db_engine, monkeypatch):
+    # Cached results go to the test database, not sql_app.db
+    monkeypatch.setattr(classifier, "cache", ClassificationCache(classifier.cache.version, bind=db_engine))
     test_cases = [
         ("Uber * Trip", "Transportation"),
         ("Walmart Store", "Groceries"),
@@ -42,4 +47,4 @@ def test_classification():
         f.write(f"Average Time per Item: {duration/len(test_cases):.4f}s\n")
 
 if __name__ == "__main__":
-    test_classification()
+    pytest.main([__file__])
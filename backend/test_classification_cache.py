@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from services.classification_cache import ClassificationCache, normalize_description
+
+def test_lru_eviction_and_stats(db_engine):
+    cache = ClassificationCache(version="v1", max_entries=2, bind=db_engine)
+    cache.put_many({"A": ("Dining", "llm"), "B": ("Shopping", "zero_shot")})
+    assert cache.get_many(["A"]) == {"A": ("Dining", "llm")}  # "A" is now the most recently used
+    cache.put_many({"C": ("Bills", "llm")})
+
+    # "B" left memory but is still on disk
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get_many(["B", "C", "D"]) == {"B": ("Shopping", "zero_shot"), "C": ("Bills", "llm")}
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"], stats["writes"]) == (2, 1, 1, 3)
+    assert stats["hit_rate"] == 0.75
+    assert stats["saved_calls"] == {"llm": 2, "zero_shot": 1}
+    print("Classification cache LRU: SUCCESS")
+
+def test_sqlite_tier_and_versions(db_engine):
+    ClassificationCache(version="v1", bind=db_engine).put_many({normalize_description(" uber  trip "): ("Transportation", "llm")})
+
+    # A new process reads the SQLite tier
+    restarted = ClassificationCache(version="v1", bind=db_engine)
+    assert restarted.get_many(["UBER TRIP"]) == {"UBER TRIP": ("Transportation", "llm")}
+    assert restarted.stats()["disk_hits"] == 1
+
+    # Entries written under another version (keyword map or categories changed) are misses
+    changed = ClassificationCache(version="v2", bind=db_engine)
+    assert changed.get_many(["UBER TRIP"]) == {}
+    assert changed.stats()["misses"] == 1
+
+    restarted.invalidate("Uber Trip")
+    assert ClassificationCache(version="v1", bind=db_engine).get_many(["UBER TRIP"]) == {}
+    assert restarted.stats()["invalidations"] == 1
+    print("Classification cache SQLite tier: SUCCESS")
+
+def test_table_created_on_first_use(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    cache = ClassificationCache(version="v1", bind=engine)
+    # Constructing the cache writes nothing; the first lookup creates the table
+    assert not inspect(engine).has_table("classification_cache")
+    assert cache.get_many(["X"]) == {}
+    assert inspect(engine).has_table("classification_cache")
+    engine.dispose()
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,70 @@
+import random
+
+from services.chunking import count_tokens
+from services.context_selector import ContextSelector
+
+MERCHANTS = [("STARBUCKS STORE 0411", "Dining"), ("WHOLE FOODS MARKET", "Groceries"), ("SHELL OIL 5742", "Transportation"),
+             ("NETFLIX.COM", "Subscriptions"), ("AMAZON MKTP US", "Shopping")]
+
+def history(count, seed=3):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        merchant, category = rng.choice(MERCHANTS)
+        rows.append({"date": f"{2021 + i % 3}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                     "merchant": merchant, "amount": round(rng.uniform(3, 200), 2), "type": "expense", "category": category})
+    return rows
+
+def test_budget_bounds_context():
+    selector = ContextSelector(budget_tokens=500)
+    for count in (500, 50_000):
+        transactions = history(count)
+        selected = selector.select("What did I buy last week?", transactions)
+        used = sum(count_tokens(f"- {t['date']}: {t['merchant']} ({t['category']}) - ${t['amount']}") + 1 for t in selected)
+        assert 0 < used <= 500
+        # Nothing in the query to match: newest rows first
+        dates = [t["date"] for t in selected]
+        assert dates == sorted(dates, reverse=True)
+        assert dates[0] == max(t["date"] for t in transactions)
+    print("Context budget: SUCCESS")
+
+def test_query_terms_rank_rows():
+    transactions = history(5000)
+    selector = ContextSelector(budget_tokens=300)
+
+    selected = selector.select("How much did I spend at Starbucks in March 2022?", transactions)
+    # Merchant and month both match first; then the merchant's other months
+    march = [t for t in transactions if t["merchant"].startswith("STARBUCKS") and t["date"].startswith("2022-03")]
+    assert selected[:len(march)] == sorted(march, key=lambda t: t["date"], reverse=True)[:len(selected)]
+    assert all(t["merchant"].startswith("STARBUCKS") for t in selected)
+
+    # Categories match by word, plural or not
+    assert all(t["category"] == "Groceries" for t in selector.select("groceries", transactions))
+
+    # A month without a year matches it in every year
+    assert all(t["date"][5:7] == "06" for t in selector.select("june", transactions))
+    print("Context relevance: SUCCESS")
+
+def test_context_notes_omitted_rows():
+    transactions = history(2000)
+    text = ContextSelector(budget_tokens=200).context("netflix", transactions)
+    assert text.splitlines()[-1].startswith("(") and "of 2000 transactions shown" in text
+    assert "of 3 transactions" not in ContextSelector(budget_tokens=200).context("netflix", transactions[:3])
+
+def test_smaller_rows_fill_the_rest_of_the_budget():
+    long_row = {"date": "2024-05-02", "merchant": "VERY LONG MERCHANT NAME " * 20, "amount": 9.99, "type": "expense",
+                "category": "Shopping"}
+    short_rows = [{"date": f"2024-04-{day:02d}", "merchant": "CAFE", "amount": 3.5, "type": "expense", "category": "Dining"}
+                  for day in range(1, 6)]
+    budget = sum(count_tokens(f"- {t['date']}: {t['merchant']} ({t['category']}) - ${t['amount']}") + 1
+                 for t in short_rows)
+    # The newest row doesn't fit; the older, smaller ones still do
+    selected = ContextSelector(budget_tokens=budget).select("what did I buy?", [long_row] + short_rows)
+    assert selected == sorted(short_rows, key=lambda t: t["date"], reverse=True)
+    print("Context fills budget: SUCCESS")
+
+if __name__ == "__main__":
+    test_budget_bounds_context()
+    test_query_terms_rank_rows()
+    test_context_notes_omitted_rows()
+    test_smaller_rows_fill_the_rest_of_the_budget()
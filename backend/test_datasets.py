@@ -0,0 +1,65 @@
+import pytest
+
+from fastapi.testclient import TestClient
+
+import main
+import models
+import services.datasets as datasets
+from services.migrations import with_typed_columns
+
+def transaction(**row):
+    return models.Transaction(**with_typed_columns(row))
+
+@pytest.fixture
+def stored_dataset(db_sessions, monkeypatch):
+    """The conftest database, filled with sample rows and used by services.datasets."""
+    db = db_sessions()
+    for month in range(1, 7):
+        for day in range(1, 11):
+            db.add(transaction(date=f"2024-{month:02d}-{day:02d}", merchant="STARBUCKS", amount=5.0, type="expense",
+                               category="Dining", description="STARBUCKS STORE 0411"))
+        db.add(transaction(date=f"2024-{month:02d}-15", merchant="WHOLE FOODS", amount=80.0, type="expense",
+                           category="Groceries", description="WHOLE FOODS MARKET"))
+    db.add(transaction(date="2024-03-20", merchant="STARBUCKS", amount=95.0, type="expense",
+                       category="Dining", description="STARBUCKS STORE 0411"))
+    db.commit()
+    db.close()
+    monkeypatch.setattr(datasets, "SessionLocal", db_sessions)
+
+def test_load_with_filters(stored_dataset):
+    rows = datasets.load_transactions()
+    assert len(rows) == 67
+    # Only the projected columns
+    assert set(rows[0]) == {"id", "date", "merchant", "amount", "type", "category"}
+
+    march = datasets.load_transactions(date_from="2024-03-01", date_to="2024-03-31")
+    assert len(march) == 12 and all(r["date"].startswith("2024-03") for r in march)
+    assert len(datasets.load_transactions(categories=["Groceries"])) == 6
+    assert len(datasets.load_transactions(date_from="2024-06-01", categories=["Groceries", "Dining"])) == 11
+    for bad in ("2024-3-1", "2024-03-01 or 1=1", "March"):
+        try:
+            datasets.load_transactions(date_from=bad)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    print("Dataset filters: SUCCESS")
+
+def test_endpoints_accept_dataset_reference(stored_dataset):
+    client = TestClient(main.app)
+
+    # No transactions in the payload: the stored rows are analyzed
+    findings = client.post("/anomalies", json={}).json()["anomalies"]
+    assert any("$95.00" in f["description"] for f in findings)
+    # Filtered to months without the outlier
+    findings = client.post("/anomalies", json={"dataset": {"date_from": "2024-04-01"}}).json()["anomalies"]
+    assert [f["type"] for f in findings] == ["recurring"]
+
+    # Dates are validated rather than compared as raw strings
+    assert client.post("/anomalies", json={"dataset": {"date_from": "2024-4-1"}}).status_code == 422
+
+    # Explicit transactions still take precedence
+    assert client.post("/anomalies", json={"transactions": []}).json()["anomalies"] == []
+    print("Dataset endpoints: SUCCESS")
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+import numpy as np
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from services.embeddings import CachedEmbeddings, create_embeddings
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+TEXTS = [f"01/{day:02d}/2024 GROCERY STORE #{day} {day * 3}.50" for day in range(1, 11)]
+
+def test_repeats_are_not_encoded():
+    inner = CountingEmbedding(size=8)
+    cache = CachedEmbeddings(inner, tempfile.mkdtemp())
+
+    first = cache.embed_documents(TEXTS)
+    assert inner.embedded == 10
+    assert cache.stats()["misses"] == 10 and cache.stats()["entries"] == 10
+
+    # Same chunks plus one new one: only the new one is encoded
+    second = cache.embed_documents(TEXTS + ["02/01/2024 COFFEE 3.25"])
+    assert inner.embedded == 11
+    assert second[:10] == first
+    assert cache.stats()["hits"] == 10
+
+    # Repeat chat queries hit the cache too
+    query = cache.embed_query("how much did I spend on groceries?")
+    assert cache.embed_query("how much did I spend on groceries?") == query
+    assert inner.embedded == 12
+    print("Embedding cache hits: SUCCESS")
+
+def test_cache_survives_restart():
+    directory = tempfile.mkdtemp()
+    inner = CountingEmbedding(size=8)
+    vectors = CachedEmbeddings(inner, directory).embed_documents(TEXTS)
+
+    reopened = CachedEmbeddings(inner, directory)
+    assert reopened.stats()["entries"] == 10 and reopened.stats()["dim"] == 8
+    assert reopened.embed_documents(TEXTS) == vectors
+    assert inner.embedded == 10
+
+    # A vector written without its key (crash mid-append) is ignored and overwritten
+    with open(os.path.join(directory, "vectors.f32"), "ab") as f:
+        f.write(b"\0" * 4 * 8)
+    reopened = CachedEmbeddings(inner, directory)
+    vector = reopened.embed_query("02/01/2024 COFFEE 3.25")
+    assert np.allclose(vector, inner.embed_query("02/01/2024 COFFEE 3.25"), atol=1e-6)
+    assert CachedEmbeddings(inner, directory).embed_query("02/01/2024 COFFEE 3.25") == vector
+    assert CachedEmbeddings(inner, directory).stats()["entries"] == 11
+    print("Embedding cache persistence: SUCCESS")
+
+def test_backend_selection():
+    os.environ["EMBEDDINGS_CACHE_DIR"] = tempfile.mkdtemp()
+    os.environ["EMBEDDINGS_BACKEND"] = "local"
+    try:
+        embeddings, namespace = create_embeddings(None)
+        assert namespace == "local-sentence-transformers_all-MiniLM-L6-v2"
+        assert isinstance(embeddings, CachedEmbeddings)
+        assert embeddings.directory == os.path.join(os.environ["EMBEDDINGS_CACHE_DIR"], namespace)
+
+        os.environ["EMBEDDINGS_BACKEND"] = "other"
+        try:
+            create_embeddings(None)
+            assert False, "unknown backend accepted"
+        except ValueError:
+            pass
+    finally:
+        del os.environ["EMBEDDINGS_BACKEND"], os.environ["EMBEDDINGS_CACHE_DIR"]
+
+if __name__ == "__main__":
+    test_repeats_are_not_encoded()
+    test_cache_survives_restart()
+    test_backend_selection()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.ingestion import IngestionJobs
+from services.vector_store import statement_store
+
+class GatedIngest:
+    """Fake ingestion that, for "WAIT" uploads, blocks until `release` is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def __call__(self, text_lines, api_key, upload_id):
+        if "WAIT" in text_lines and not self.release.wait(timeout=10):
+            raise RuntimeError("never released")
+        if "FAIL" in text_lines:
+            raise RuntimeError("embedding service unavailable")
+        return {"upload_id": upload_id, "chunks": 1, "added": 1, "skipped": 0, "date_from": None, "date_to": None}
+
+async def fast_extraction(text_lines, api_key, base_url):
+    return {"transactions": [], "closing_balance": 0.0}
+
+def test_ingestion_overlaps_extraction():
+    async def run():
+        ingest = GatedIngest()
+        jobs = IngestionJobs(ingest=ingest)
+        task = jobs.start(["WAIT"], "sk-test", "u1")
+        await asyncio.sleep(0)
+        assert jobs.status("u1")["status"] == "running"
+        # Extraction runs while ingestion is still blocked; only then is ingestion let go
+        await fast_extraction([], "sk-test", None)
+        assert not task.done()
+        ingest.release.set()
+        status = await jobs.wait("u1")
+        return status, await task, jobs
+
+    status, task_status, jobs = asyncio.run(run())
+    assert status == task_status
+    assert status["status"] == "done" and status["added"] == 1
+    assert jobs.status("u1") == status
+    print("Ingestion overlap: SUCCESS")
+
+def test_failure_is_reported_not_raised():
+    async def run():
+        jobs = IngestionJobs(ingest=GatedIngest(), max_jobs=2)
+        statuses = [await jobs.start(["FAIL"], "sk-test", f"u{i}") for i in range(3)]
+        return statuses, jobs
+
+    statuses, jobs = asyncio.run(run())
+    assert statuses[0] == {"upload_id": "u0", "status": "failed", "error": "embedding service unavailable"}
+    # Only the most recent jobs are kept
+    assert jobs.status("u0") is None and jobs.status("u2")["status"] == "failed"
+    print("Ingestion failure: SUCCESS")
+
+def test_analyze_reports_ingestion(db_engine):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+    os.environ["CLASSIFIER_WARMUP"] = "0"
+    ingest = GatedIngest()
+    saved = main.aextract_transactions_from_text, main.ingestion_jobs, statement_store.warm_up, main.engine
+    # Startup migrates the test database, not sql_app.db
+    main.engine = db_engine
+    main.aextract_transactions_from_text = fast_extraction
+    main.ingestion_jobs = jobs = IngestionJobs(ingest=ingest)
+    statement_store.warm_up = lambda api_key: None
+    try:
+        with TestClient(main.app) as client:
+            # By default the response doesn't wait for embedding; its status can be polled
+            body = client.post("/analyze", json={"text": ["WAIT"]}).json()
+            assert body["ingestion"] == {"upload_id": body["upload_id"], "status": "running"}
+            assert client.get(f"/analyze/{body['upload_id']}/ingestion").json()["status"] == "running"
+            ingest.release.set()
+            client.portal.call(jobs.wait, body["upload_id"])
+            assert client.get(f"/analyze/{body['upload_id']}/ingestion").json()["status"] == "done"
+            assert client.get("/analyze/unknown/ingestion").status_code == 404
+
+            # Waiting on request: the outcome is in the response, and failures don't fail the upload
+            body = client.post("/analyze?defer_ingest=false", json={"text": ["01/02/2024 COFFEE 3.25"]}).json()
+            assert body["ingestion"]["status"] == "done" and body["ingestion"]["upload_id"] == body["upload_id"]
+            body = client.post("/analyze?defer_ingest=false", json={"text": ["FAIL"]}).json()
+            assert body["ingestion"]["status"] == "failed" and body["transactions"] == []
+    finally:
+        ingest.release.set()
+        main.aextract_transactions_from_text, main.ingestion_jobs, statement_store.warm_up, main.engine = saved
+        del os.environ["CLASSIFIER_WARMUP"]
+    print("Analyze ingestion status: SUCCESS")
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,32 @@
+from services.keyword_matcher import KeywordMatcher
+
+KEYWORD_MAP = {
+    'Transportation': ['UBER', 'BP'],
+    'Others': ['ETF', 'PHARMACY'],
+    'Dining': ['UBEREATS', 'STARBUCKS'],
+    'Groceries': ['WALMART'],
+    'Shopping': ['WALMART', 'SHOP'],
+}
+
+def test_keyword_matcher():
+    matcher = KeywordMatcher.from_keyword_map(KEYWORD_MAP)
+    test_cases = [
+        ("UBEREATS ORDER", "Transportation"),   # first category in dict order wins
+        ("STARBUCKS COFFEE", "Dining"),
+        ("WALMART STORE", "Groceries"),         # keyword listed under two categories
+        ("NETFLIX.COM", None),                  # short keyword needs word boundaries
+        ("VANGUARD ETF BUY", "Others"),
+        ("BP#1234 FUEL", "Transportation"),
+        ("BPX", None),
+        ("COFFEE SHOP", "Shopping"),
+        ("", None),
+    ]
+    for text, expected in test_cases:
+        predicted = matcher.best(text)
+        assert predicted == expected, f"'{text}': expected {expected}, got {predicted}"
+
+    assert matcher.match_batch(["UBER TRIP", "CVS PHARMACY"]) == ["Transportation", "Others"]
+    print("KeywordMatcher: SUCCESS")
+
+if __name__ == "__main__":
+    test_keyword_matcher()
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+import services.llm_service as llm_service
+from services.chunking import TokenBudgetChunker
+from services.llm_cache import LLMCache, make_key
+from services.llm_service import StatementAnalysis
+
+def test_eviction_and_stats():
+    path = os.path.join(tempfile.mkdtemp(), "llm_cache.db")
+    cache = LLMCache(path=path, max_bytes=1000)
+
+    assert cache.get("extraction", "a") is None
+    cache.put("extraction", "a", {"v": "x" * 400})
+    cache.put("extraction", "b", {"v": "y" * 400})
+    assert cache.get("extraction", "a") == {"v": "x" * 400}  # "a" is now the most recently used
+
+    # Over the limit: the least recently used entry goes first
+    cache.put("extraction", "c", {"v": "z" * 400})
+    assert cache.get("extraction", "b") is None
+    assert cache.get("extraction", "c") is not None
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 1000
+    assert stats["namespaces"]["extraction"]["hits"] == 2
+    assert stats["namespaces"]["extraction"]["misses"] == 2
+
+    # Survives a restart
+    assert LLMCache(path=path, max_bytes=1000).get("extraction", "c") == {"v": "z" * 400}
+    assert make_key("model", "prompt", "text") != make_key("model", "prompt", "text ")
+    print("LLM cache eviction: SUCCESS")
+
+def test_repeat_import_costs_no_llm_calls(monkeypatch):
+    calls = []
+
+    def fake_extraction_chain(api_key, base_url):
+        async def extract(inputs):
+            calls.append(inputs["text"])
+            rows = [{"date": "2024-01-01", "merchant": line, "amount": 1.0, "type": "expense",
+                     "category": "Others", "description": line} for line in inputs["text"].split("\n")]
+            return StatementAnalysis(transactions=rows, closing_balance=0.0)
+        return RunnableLambda(extract)
+
+    monkeypatch.setattr(llm_service, "llm_cache", LLMCache(path=os.path.join(tempfile.mkdtemp(), "llm_cache.db")))
+    monkeypatch.setattr(llm_service, "_build_extraction_chain", fake_extraction_chain)
+    async def skip_classification(transactions, api_key, base_url):
+        pass
+    monkeypatch.setattr(llm_service, "_aclassify_extracted", skip_classification)
+    # One token per line: 2 chunks of 250 lines
+    monkeypatch.setattr(llm_service, "chunker", TokenBudgetChunker(target_tokens=300, count=lambda line: 0))
+
+    lines = [f"ROW {i} 1.00" for i in range(500)]
+    first = asyncio.run(llm_service.aextract_transactions_from_text(lines, "sk-test", None))
+    assert len(calls) == 2
+
+    # Same statement again, then one that shares its first chunk
+    second = asyncio.run(llm_service.aextract_transactions_from_text(lines, "sk-test", None))
+    assert len(calls) == 2
+    assert second == first
+    asyncio.run(llm_service.aextract_transactions_from_text(lines[:250] + ["NEW ROW 1.00"] + lines[251:], "sk-test", None))
+    assert len(calls) == 3
+
+    stats = llm_service.llm_cache.stats()["namespaces"]["extraction"]
+    assert stats["hits"] == 3 and stats["misses"] == 3
+    print("LLM cache extraction: SUCCESS")
+
+if __name__ == "__main__":
+    pytest.main([__file__])
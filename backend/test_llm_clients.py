@@ -0,0 +1,48 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.llm_service import _shared_http_clients, get_llm
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+def test_async_client_survives_new_event_loops(server_url):
+    _, client = _shared_http_clients()
+
+    async def fetch():
+        responses = [await client.get(server_url) for _ in range(2)]
+        return [r.text for r in responses]
+
+    # Each asyncio.run has its own loop; kept-alive connections of the first must not be reused by the next
+    for _ in range(3):
+        assert asyncio.run(fetch()) == ["ok", "ok"]
+    print("Async client across loops: SUCCESS")
+
+def test_llm_clients_are_shared():
+    llm = get_llm("sk-test", None, temperature=0)
+    assert get_llm("sk-test", None, temperature=0) is llm
+    assert get_llm("sk-test", None, temperature=0.7) is not llm
+    print("Shared LLM clients: SUCCESS")
+
+if __name__ == "__main__":
+    pytest.main([__file__])
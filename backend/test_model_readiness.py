@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import services.classification_service as classification_service
+from services.classification_cache import ClassificationCache
+from services.classification_service import TransactionClassifier
+from services.zero_shot import ENGINES
+
+class SlowEngine:
+    """Zero-shot engine whose load takes a while and is counted."""
+    name = "slow"
+    loads = 0
+
+    def __init__(self, categories, model_name=None):
+        self.categories = categories
+        self.model_name = model_name or "slow-model"
+        self.model = None
+
+    def load(self):
+        type(self).loads += 1
+        time.sleep(0.2)
+        self.model = object()
+
+    def predict(self, texts):
+        return [self.categories[0] for _ in texts]
+
+@pytest.fixture
+def cold_classifier(db_engine, db_sessions, monkeypatch):
+    """A classifier on the test database whose model hasn't been loaded, used by the app."""
+    SlowEngine.loads = 0
+    monkeypatch.setitem(ENGINES, SlowEngine.name, SlowEngine)
+    monkeypatch.setattr(classification_service, "SessionLocal", db_sessions)
+    classifier = TransactionClassifier(engine=SlowEngine.name)
+    classifier.cache = ClassificationCache(classifier.cache.version, bind=db_engine)
+    monkeypatch.setattr(classification_service, "classifier", classifier)
+    return classifier
+
+def test_ready_after_warm_up(cold_classifier):
+    client = TestClient(main.app)
+    response = client.get("/health/ready")
+    assert response.status_code == 503 and response.json()["model"] == {"status": "cold", "ready": False, "error": None}
+    # Liveness doesn't depend on the model
+    assert client.get("/health").status_code == 200
+
+    cold_classifier.warm_up().join(timeout=10)
+    response = client.get("/health/ready")
+    assert response.status_code == 200 and response.json()["model"]["status"] == "ready"
+    assert SlowEngine.loads == 1
+    print("Readiness: SUCCESS")
+
+def test_first_requests_load_the_model_once(cold_classifier):
+    results = []
+
+    def classify():
+        results.append(cold_classifier.classify_batch(["ZZQX 0042"]))
+
+    # Rules and keywords don't need the model
+    assert cold_classifier.classify_batch(["UBER TRIP"]) == ["Transportation"] and SlowEngine.loads == 0
+
+    threads = [threading.Thread(target=classify) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert SlowEngine.loads == 1 and cold_classifier.is_model_ready
+    assert results == [[cold_classifier.categories[0]]] * 8
+    print("Lazy load once: SUCCESS")
+
+def test_failed_load_is_reported(cold_classifier, monkeypatch):
+    def broken(self):
+        raise ImportError("No module named 'sentence_transformers'")
+    monkeypatch.setattr(SlowEngine, "load", broken)
+
+    cold_classifier.warm_up().join(timeout=10)
+    response = TestClient(main.app).get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["model"] == {"status": "failed", "ready": False,
+                                        "error": "No module named 'sentence_transformers'"}
+    # Classification still answers, without the model
+    assert cold_classifier.classify_batch(["ZZQX 0042"]) == ["Miscellaneous"]
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from services.rule_index import RuleIndex
+
+def make_rule(rule_id, pattern, category, match_type):
+    return SimpleNamespace(id=rule_id, pattern=pattern, category=category, match_type=match_type)
+
+def test_rule_index():
+    index = RuleIndex()
+    index.load([
+        make_rule(1, "Blue Bottle", "Dining", "contains"),
+        make_rule(2, "BLUE BOTTLE BEANS 12OZ", "Groceries", "exact"),
+        make_rule(3, "Zelle to Landlord", "Bills", "exact"),
+    ])
+
+    # Lowest rule id wins, whether exact or contains
+    assert index.match("BLUE BOTTLE BEANS 12OZ") == "Dining"
+    assert index.match("ZELLE TO LANDLORD") == "Bills"
+    assert index.match("ZELLE TO LANDLORD JAN") is None
+
+    version = index.version
+    index.upsert(3, "Zelle to Landlord", "Rent", "exact")
+    index.upsert(4, "ZELLE", "Transfers", "contains")
+    assert index.version == version + 2
+    assert index.match("ZELLE TO LANDLORD") == "Rent"
+    assert index.match("ZELLE TO LANDLORD JAN") == "Transfers"
+    assert len(index) == 4
+    print("RuleIndex: SUCCESS")
+
+if __name__ == "__main__":
+    test_rule_index()
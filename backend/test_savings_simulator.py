@@ -0,0 +1,111 @@
+import datetime
+
+import numpy as np
+
+from services.savings_simulator import SavingsSimulator
+
+TODAY = datetime.date(2025, 1, 1)
+
+def goal(name, target, current, deadline, **extra):
+    return {"name": name, "targetAmount": target, "currentAmount": current, "deadline": deadline, **extra}
+
+def test_single_goal_closed_form():
+    simulator = SavingsSimulator(as_of=TODAY)
+    # 1200 left, 12 contributions of 100/month -> +100/month halves the time
+    goals = [goal("Car", 1200, 0, "2026-01-01", monthlyContribution=100)]
+    months = simulator.project(goals, [0, 100, 200])[:, 0]
+    assert np.allclose(months, [12, 6, 4])
+
+    scenario = simulator.scenario(goals, 100)
+    assert scenario["new_deadlines"] == [{"goal_name": "Car", "new_date": "2025-07-03", "months_saved": 6.0}]
+    assert scenario["impact_description"].startswith("Saving an extra $100 per month, you reach Car 6 months earlier")
+    print("Savings single goal: SUCCESS")
+
+def test_pace_from_deadline_and_rollover():
+    simulator = SavingsSimulator(as_of=TODAY)
+    goals = [goal("Trip", 600, 0, "2025-07-02"), goal("House", 6000, 0, "2027-01-01", monthlyContribution=250)]
+    baseline = simulator.baseline_months(goals)
+    # Without a contribution, the goal is funded at the pace that meets its deadline
+    assert np.allclose(baseline, [6, 24], atol=0.05)
+    pace = 600 / baseline[0]
+
+    # Nearest deadline: all 100 goes to Trip first (about 3 months instead of 6), then to House
+    months = simulator.project(goals, [100], "nearest_deadline")[0]
+    assert np.isclose(months[0], 600 / (pace + 100))
+    # House got 250/month until then, then 350/month
+    assert np.isclose(months[1], months[0] + (6000 - 250 * months[0]) / 350)
+
+    # Even: 50 each until Trip is done, then House gets all 100
+    trip = 600 / (pace + 50)
+    even = simulator.project(goals, [100], "even")[0]
+    assert np.isclose(even[0], trip)
+    assert np.isclose(even[1], trip + (6000 - 300 * trip) / 350)
+    print("Savings strategies: SUCCESS")
+
+def test_edge_cases():
+    simulator = SavingsSimulator(as_of=TODAY)
+    goals = [goal("Done", 500, 500, "2025-06-01"), goal("Overdue", 1000, 0, "2024-01-01"), goal("Bad date", 1000, 0, "soon")]
+    months = simulator.project(goals, [0, 100], "even")
+    assert months[0].tolist()[:1] == [0.0] and np.isinf(months[0][1:]).all()
+    # Reached goals are left out; nothing to compare overdue goals with
+    deadlines = simulator.scenario(goals, 100)["new_deadlines"]
+    assert [d["goal_name"] for d in deadlines] == ["Overdue", "Bad date"]
+    assert all(d["months_saved"] == 0.0 for d in deadlines)
+    # Both now get 50/month: 20 months
+    assert [d["new_date"] for d in deadlines] == ["2026-09-02", "2026-09-02"]
+    # Goals nothing is paid into keep their deadline
+    assert simulator.scenario(goals, 0)["new_deadlines"][1] == {"goal_name": "Bad date", "new_date": "soon", "months_saved": 0.0}
+    try:
+        simulator.project(goals, [100], "random")
+        assert False, "unknown strategy accepted"
+    except ValueError:
+        pass
+
+def test_trade_off_from_spending():
+    transactions = [
+        {"date": "2025-01-05", "amount": 300, "type": "expense", "category": "Dining"},
+        {"date": "2025-02-05", "amount": 300, "type": "expense", "category": "Dining"},
+        {"date": "2025-02-06", "amount": 1500, "type": "expense", "category": "Rent"},
+    ]
+    text = SavingsSimulator.trade_off_suggestion(transactions, 60)
+    assert text == "Cutting Dining by 20% (about $60 of $300/month) would cover it."
+    assert "Set aside" in SavingsSimulator.trade_off_suggestion([], 60)
+
+def test_sweep_matches_single_scenarios():
+    simulator = SavingsSimulator(as_of=TODAY)
+    goals = [goal("Trip", 600, 0, "2025-07-02"), goal("House", 6000, 0, "2027-01-01", monthlyContribution=250),
+             goal("Done", 100, 100, "2025-03-01")]
+    extras = [0, 25, 50, 100, 400]
+    points = simulator.sweep(goals, extras, ["even", "nearest_deadline"])
+    assert len(points) == 10
+    for point in points:
+        single = simulator.scenario(goals, point["extra_savings"], point["strategy"])
+        assert point["new_deadlines"] == single["new_deadlines"]
+    print("Savings sweep: SUCCESS")
+
+def test_sweep_endpoint():
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    goals = [goal("Trip", 600, 0, "2030-07-02"), goal("House", 6000, 0, "2032-01-01")]
+    body = client.post("/savings-scenario/sweep", json={"goals": goals, "stop": 200, "step": 50,
+                                                        "strategies": ["even", "nearest_deadline"]}).json()
+    assert body["goals"] == ["Trip", "House"]
+    assert [(p["strategy"], p["extra_savings"]) for p in body["points"][:5]] == [("even", v) for v in (0, 50, 100, 150, 200)]
+    # More extra savings never pushes a goal back
+    saved = [p["new_deadlines"][1]["months_saved"] for p in body["points"][:5]]
+    assert saved == sorted(saved) and saved[0] == 0
+    assert client.post("/savings-scenario/sweep", json={"goals": goals, "strategies": ["random"]}).status_code == 422
+    assert client.post("/savings-scenario/sweep", json={"goals": goals, "stop": 10 ** 6, "step": 1}).status_code == 400
+    # Rejected from the requested size alone, without building the range
+    assert client.post("/savings-scenario/sweep", json={"goals": goals, "stop": 1e12, "step": 1}).status_code == 400
+    assert client.post("/savings-scenario/sweep", json={"goals": goals, "stop": 1e308, "step": 1e-308}).status_code == 400
+
+if __name__ == "__main__":
+    test_single_goal_closed_form()
+    test_pace_from_deadline_and_rollover()
+    test_edge_cases()
+    test_trade_off_from_spending()
+    test_sweep_matches_single_scenarios()
+    test_sweep_endpoint()
@@ -0,0 +1,104 @@
+from services.statement_parser import LineLayout, date_order, parse_date, parse_statement, register_layout, LAYOUTS, _transaction
+
+CHECKING = """FIRST NATIONAL BANK                    Page 1 of 2
+Statement Period: 01/01/2024 - 01/31/2024
+Date        Description                      Withdrawals   Deposits     Balance
+01/01/2024  Opening Balance                                             1,000.00
+01/02/2024  ACME CORP PAYROLL                -             2,500.00     3,500.00
+01/03/2024  WHOLE FOODS MARKET #123          84.12         -            3,415.88
+01/05/2024  CHECK 1042                       1,200.00      0.00         2,215.88
+Jan 9, 2024 NETFLIX.COM                      15.99 DR
+09 Jan 2024 VENMO CASHOUT                    40.00 CR
+2024-01-12  SHELL OIL 5742                   -45.10
+2024-01-15  STARBUCKS STORE 0411             6.45       2,209.43
+2024-01-16  INTEREST PAID                    1.02       2,210.45
+01/20/2024  AMAZON MKTP US*2K4
+            ORDER 113-2231 29.99
+Total Withdrawals 1,351.66
+Closing Balance 2,210.45
+""".splitlines()
+
+
+def test_parse_checking_statement():
+    parsed = parse_statement(CHECKING)
+    rows = {t["description"]: t for t in parsed.transactions}
+
+    assert rows["ACME CORP PAYROLL"] == {
+        "date": "2024-01-02", "merchant": "ACME CORP PAYROLL", "amount": 2500.0,
+        "type": "income", "category": "Others", "description": "ACME CORP PAYROLL",
+    }
+    assert (rows["WHOLE FOODS MARKET #123"]["type"], rows["WHOLE FOODS MARKET #123"]["amount"]) == ("expense", 84.12)
+    assert (rows["CHECK 1042"]["type"], rows["CHECK 1042"]["amount"]) == ("expense", 1200.0)
+    assert (rows["NETFLIX.COM"]["date"], rows["NETFLIX.COM"]["type"]) == ("2024-01-09", "expense")
+    assert (rows["VENMO CASHOUT"]["date"], rows["VENMO CASHOUT"]["type"]) == ("2024-01-09", "income")
+    assert (rows["SHELL OIL 5742"]["type"], rows["SHELL OIL 5742"]["amount"]) == ("expense", 45.10)
+
+    # Unsigned amount + balance: direction comes from the running balance
+    assert rows["STARBUCKS STORE 0411"]["type"] == "expense"
+    assert rows["INTEREST PAID"]["type"] == "income"
+
+    assert len(parsed.transactions) == 8
+    assert parsed.closing_balance == 2210.45
+
+    # Only the wrapped Amazon row (plus its description line) is left for the LLM
+    assert parsed.unparsed_lines == ["01/20/2024  AMAZON MKTP US*2K4", "            ORDER 113-2231 29.99"]
+    # Input line indices, to put parser and LLM rows back in statement order
+    assert [CHECKING[i] for i in parsed.unparsed_indices] == parsed.unparsed_lines
+    assert parsed.transaction_lines == sorted(parsed.transaction_lines) and len(parsed.transaction_lines) == 8
+    print("Statement parser: SUCCESS")
+
+
+def test_ambiguous_rows_go_to_llm():
+    # No opening balance, no sign or marker: can't tell withdrawal from deposit
+    parsed = parse_statement(["01/03/2024  TRANSFER 884  250.00  1,250.00"])
+    assert parsed.transactions == []
+    assert parsed.unparsed_lines == ["01/03/2024  TRANSFER 884  250.00  1,250.00"]
+
+
+def test_unsigned_single_amount_goes_to_llm():
+    # No marker, sign or income hint: the LLM decides which way it went
+    parsed = parse_statement(["Jan 9, 2024 NETFLIX.COM 15.99", "Jan 10, 2024 SALARY JAN 900.00"])
+    assert [t["description"] for t in parsed.transactions] == ["SALARY JAN"]
+    assert parsed.unparsed_lines == ["Jan 9, 2024 NETFLIX.COM 15.99"]
+
+
+def test_date_order_per_statement():
+    # DD/MM statement: 13/02 settles the order, so 05/03 is March 5th
+    indian = ["05/03/2024  ZOMATO ORDER  250.00 DR", "13/02/2024  SWIGGY  180.00 DR"]
+    assert date_order(indian) is True
+    assert [t["date"] for t in parse_statement(indian).transactions] == ["2024-03-05", "2024-02-13"]
+    us = ["05/03/2024  NETFLIX.COM  15.99 DR", "02/13/2024  SHELL OIL  40.00 DR"]
+    assert date_order(us) is False
+    assert [t["date"] for t in parse_statement(us).transactions] == ["2024-05-03", "2024-02-13"]
+
+    # Nothing settles the order: dates that read either way go to the LLM
+    unknown = ["05/03/2024  UPI TRANSFER  250.00 DR", "07/07/2024  HDFC ATM  100.00 DR"]
+    parsed = parse_statement(unknown)
+    assert [t["date"] for t in parsed.transactions] == ["2024-07-07"]
+    assert parsed.unparsed_lines == ["05/03/2024  UPI TRANSFER  250.00 DR"]
+    assert date_order(["13/02/2024 A 1.00 DR", "02/13/2024 B 1.00 DR"]) is None
+    assert parse_date("05/03/2024") is None and parse_date("13/02/24") == "2024-02-13"
+
+
+def test_register_layout():
+    # e.g. a card statement with posting and transaction dates
+    layout = LineLayout(
+        "card_two_dates",
+        r"^\s*\d{2}/\d{2}\s+(?P<date>\d{2}/\d{2}/\d{4})\s+(?P<description>.+?)\s+\$(?P<amount>[\d,]+\.\d{2})\s*$",
+        lambda match, date, description, state: _transaction(date, description, float(match.group("amount").replace(",", "")), "expense"),
+    )
+    register_layout(layout)
+    try:
+        parsed = parse_statement(["01/14 01/13/2024 UBER *TRIP $23.10"])
+        assert parsed.layout_counts == {"card_two_dates": 1}
+        assert parsed.transactions[0]["amount"] == 23.10
+    finally:
+        LAYOUTS.remove(layout)
+
+
+if __name__ == "__main__":
+    test_parse_checking_statement()
+    test_ambiguous_rows_go_to_llm()
+    test_unsigned_single_amount_goes_to_llm()
+    test_date_order_per_statement()
+    test_register_layout()
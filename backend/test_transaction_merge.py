@@ -0,0 +1,96 @@
+import asyncio
+import os
+import tempfile
+
+from langchain_core.runnables import RunnableLambda
+
+import services.llm_service as llm_service
+from services.chunking import TokenBudgetChunker
+from services.llm_cache import LLMCache
+from services.llm_service import StatementAnalysis
+from services.transaction_merge import OrderedChunkMerger, in_statement_order
+
+def row(date, description, amount):
+    return {"date": date, "merchant": description, "amount": amount, "type": "expense",
+            "category": "Others", "description": description}
+
+def test_ordered_merge():
+    merger = OrderedChunkMerger()
+    chunk0 = {"transactions": [row("2024-01-01", "COFFEE", 4.5), row("2024-01-01", "COFFEE", 4.5),
+                               row("2024-01-02", "RENT", 1500)], "closing_balance": 0.0}
+    chunk1 = {"transactions": [row("2024-01-02", "RENT", 1500), row("2024-01-03", "GAS", 40)],
+              "closing_balance": 0.0}
+    chunk2 = {"transactions": [row("2024-01-04", "COFFEE", 4.5)], "closing_balance": 321.0}
+
+    # Out of order arrivals are held back until their predecessors are in
+    assert merger.add(2, chunk2) == []
+    assert merger.add(1, chunk1) == []
+    assert merger.buffered == 2
+    released = merger.add(0, chunk0)
+
+    assert [index for index, _ in released] == [0, 1, 2]
+    rows = [(t["description"], t["date"]) for _, transactions in released for t in transactions]
+    # Chunks don't overlap: identical rows, within or across chunks, are real transactions
+    assert rows == [("COFFEE", "2024-01-01"), ("COFFEE", "2024-01-01"), ("RENT", "2024-01-02"),
+                    ("RENT", "2024-01-02"), ("GAS", "2024-01-03"), ("COFFEE", "2024-01-04")]
+    assert merger.released == 6
+    assert merger.closing_balance == 321.0
+    assert merger.buffered == 0
+
+def test_failed_chunk():
+    merger = OrderedChunkMerger()
+    coffee = row("2024-01-08", "COFFEE", 4.5)
+    assert merger.add(0, {"transactions": [coffee], "closing_balance": 0.0}) == [(0, [coffee])]
+    assert merger.add(1, None) == [(1, [])]
+    assert merger.add(2, {"transactions": [coffee], "closing_balance": 0.0}) == [(2, [coffee])]
+
+def test_statement_order():
+    parsed = [(0, row("2024-01-01", "PARSED A", 1)), (5, row("2024-01-05", "PARSED B", 2)),
+              (9, row("2024-01-09", "PARSED C", 3))]
+    # Chunk 0 starts at line 2, chunk 1 at line 7
+    chunk_rows = {1: [row("2024-01-07", "LLM C", 5)], 0: [row("2024-01-02", "LLM A", 4), row("2024-01-03", "LLM B", 4)]}
+    ordered = in_statement_order(parsed, chunk_rows, [2, 7])
+    assert [t["description"] for t in ordered] == ["PARSED A", "LLM A", "LLM B", "PARSED B", "LLM C", "PARSED C"]
+
+def test_extraction_keeps_statement_order():
+    statement = [
+        "2024-01-02  SHELL OIL 5742                   -45.10",
+        "01/03/2024  AMAZON MKTP US*2K4",
+        "            ORDER 113-2231 29.99",
+        "2024-01-04  SHELL OIL 5742                   -45.10",
+        "01/05/2024  AMAZON MKTP US*9Q1",
+        "            ORDER 113-9876 12.00",
+    ]
+
+    def fake_extraction_chain(api_key, base_url):
+        async def extract(inputs):
+            first = inputs["text"].split("\n")[0]
+            rows = [{"date": first[:10], "merchant": first[12:], "amount": 1.0, "type": "expense",
+                     "category": "Others", "description": first[12:]}]
+            return StatementAnalysis(transactions=rows, closing_balance=0.0)
+        return RunnableLambda(extract)
+
+    async def skip_classification(transactions, api_key, base_url):
+        pass
+
+    saved = (llm_service._build_extraction_chain, llm_service._aclassify_extracted, llm_service.llm_cache, llm_service.chunker)
+    llm_service._build_extraction_chain = fake_extraction_chain
+    llm_service._aclassify_extracted = skip_classification
+    llm_service.llm_cache = LLMCache(path=os.path.join(tempfile.mkdtemp(), "llm_cache.db"))
+    # One token per line: the two wrapped rows go to the LLM as two chunks
+    llm_service.chunker = TokenBudgetChunker(target_tokens=2, count=lambda line: 0)
+    try:
+        result = asyncio.run(llm_service.aextract_transactions_from_text(statement, "sk-test", None))
+    finally:
+        llm_service._build_extraction_chain, llm_service._aclassify_extracted, llm_service.llm_cache, llm_service.chunker = saved
+    assert [(t["date"], t["description"]) for t in result["transactions"]] == [
+        ("2024-01-02", "SHELL OIL 5742"), ("01/03/2024", "AMAZON MKTP US*2K4"),
+        ("2024-01-04", "SHELL OIL 5742"), ("01/05/2024", "AMAZON MKTP US*9Q1"),
+    ]
+
+if __name__ == "__main__":
+    test_ordered_merge()
+    test_failed_chunk()
+    test_statement_order()
+    test_extraction_keeps_statement_order()
+    print("Transaction merge: SUCCESS")
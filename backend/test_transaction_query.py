@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import text
+
+import models
+from services.migrations import create_indexes, with_typed_columns
+from services.transaction_query import decode_cursor, encode_cursor, page_transactions
+
+def stored(db_sessions, rows):
+    db = db_sessions()
+    db.add_all(models.Transaction(**with_typed_columns(r)) for r in rows)
+    db.commit()
+    return db
+
+def row(i):
+    return {"date": f"2024-{i % 3 + 1:02d}-{i % 5 + 1:02d}", "merchant": ["Amazon", "amex fee", "Uber"][i % 3],
+            "amount": float(i), "type": "income" if i % 4 == 0 else "expense",
+            "category": ["Shopping", "Bills", "Transport"][i % 3], "description": f"ROW {i}"}
+
+def all_pages(db, limit, **filters):
+    rows, cursor = page_transactions(db, limit, **filters)
+    pages = [rows]
+    while cursor:
+        rows, cursor = page_transactions(db, limit, cursor, **filters)
+        pages.append(rows)
+    return pages
+
+def test_pages_follow_date_and_id(db_sessions):
+    db = stored(db_sessions, [row(i) for i in range(50)] + [dict(row(50), date=None)])
+    pages = all_pages(db, 7)
+    ids = [r["id"] for page in pages for r in page]
+    expected = sorted((r for r in db.query(models.Transaction) if r.date), key=lambda r: (r.date, r.id), reverse=True)
+    # Newest first, every row exactly once, the undated row last
+    assert ids == [r.id for r in expected] + [51]
+    assert all(len(page) == 7 for page in pages[:-1])
+
+    ascending = [r["id"] for page in all_pages(db, 6, order="asc") for r in page]
+    assert ascending == list(reversed(ids))
+    db.close()
+    print("Keyset pages: SUCCESS")
+
+def test_filters(db_sessions):
+    db = stored(db_sessions, [row(i) for i in range(60)])
+    shopping = [r for page in all_pages(db, 4, category="Shopping", type="expense") for r in page]
+    assert shopping and all(r["category"] == "Shopping" and r["type"] == "expense" for r in shopping)
+    assert len(shopping) == sum(1 for i in range(60) if i % 3 == 0 and i % 4)
+
+    merchants = {r["merchant"] for page in all_pages(db, 10, merchant="AM") for r in page}
+    assert merchants == {"Amazon", "amex fee"}
+    ranged, _ = page_transactions(db, 100, date_from="2024-02-01", date_to="2024-02-03", min_amount=10, max_amount=40)
+    assert ranged and all("2024-02-01" <= r["date"] <= "2024-02-03" and 10 <= r["amount"] <= 40 for r in ranged)
+    with pytest.raises(ValueError, match="date_from"):
+        page_transactions(db, 10, date_from="Feb 2024")
+    db.close()
+    print("Filters: SUCCESS")
+
+def test_merchant_prefix_beyond_ascii(db_sessions):
+    merchants = ["ÉPICERIE DU COIN", "épicerie bio", "Straße Café", "Ölmühle", "EPICERIE"]
+    db = stored(db_sessions, [dict(row(i), merchant=m) for i, m in enumerate(merchants)])
+    found = lambda prefix: {r["merchant"] for page in all_pages(db, 10, merchant=prefix) for r in page}
+    assert found("Épicerie") == {"ÉPICERIE DU COIN", "épicerie bio"}
+    assert found("STRASSE") == {"Straße Café"} and found("öl") == {"Ölmühle"}
+    # Decomposed input (E + combining acute) finds the same rows
+    assert found("E\u0301pi") == {"ÉPICERIE DU COIN", "épicerie bio"}
+    db.close()
+    print("Merchant prefix: SUCCESS")
+
+def test_cursor_tokens():
+    assert decode_cursor(encode_cursor("2024-01-02", 17)) == ("2024-01-02", 17)
+    assert decode_cursor(encode_cursor(None, 3)) == (None, 3)
+    for bad in ("not-a-cursor", encode_cursor("2024-01-02", 17)[:-3]):
+        try:
+            decode_cursor(bad)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    print("Cursor tokens: SUCCESS")
+
+def test_endpoint_and_indexes(db_engine, db_sessions, api_client):
+    db = stored(db_sessions, [row(i) for i in range(30)])
+    with db_engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_transactions_type_date_id"))
+    # Existing databases get the indexes declared after they were created
+    create_indexes(db_engine)
+    create_indexes(db_engine)
+    names = set(db.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    assert {"ix_transactions_category_date_id", "ix_transactions_type_date_id", "ix_transactions_merchant_key_date_id"} <= names
+    db.close()
+
+    first = api_client.get("/transactions", params={"limit": 20})
+    assert len(first.json()) == 20 and first.headers["X-Next-Cursor"]
+    second = api_client.get("/transactions", params={"limit": 20, "cursor": first.headers["X-Next-Cursor"]})
+    assert len(second.json()) == 10 and "X-Next-Cursor" not in second.headers
+    assert not {t["id"] for t in first.json()} & {t["id"] for t in second.json()}
+    assert api_client.get("/transactions", params={"cursor": "garbage"}).status_code == 400
+    assert api_client.get("/transactions", params={"date_from": "2024-13-01"}).status_code == 400
+    assert api_client.get("/transactions", params={"limit": 0}).status_code == 422
+
+    # The deprecated skip offsets into the same order, and the cursor continues after the page
+    skipped = api_client.get("/transactions", params={"limit": 5, "skip": 15})
+    assert [t["id"] for t in skipped.json()] == [t["id"] for t in first.json()][15:20]
+    rest = api_client.get("/transactions", params={"limit": 20, "cursor": skipped.headers["X-Next-Cursor"]})
+    assert [t["id"] for t in rest.json()] == [t["id"] for t in first.json() + second.json()][20:]
+    print("Endpoint: SUCCESS")
+
+if __name__ == "__main__":
+    pytest.main([__file__])
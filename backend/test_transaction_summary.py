@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+import models
+from bench_aggregation import synthetic_transactions
+from services.aggregation import EXPENSE, TransactionFrame
+from services.migrations import DATA_MIGRATIONS, migrate, posted_on, schema_version, to_cents, with_typed_columns
+from services.transaction_summary import summarize
+
+LEGACY_SCHEMA = """CREATE TABLE transactions (
+    id INTEGER NOT NULL PRIMARY KEY, date VARCHAR, amount FLOAT, description VARCHAR,
+    merchant VARCHAR, category VARCHAR, type VARCHAR, is_recurring BOOLEAN
+)"""
+
+def test_typed_values():
+    assert str(posted_on("2024-03-09")) == "2024-03-09" and str(posted_on("2024-03-09T10:00")) == "2024-03-09"
+    assert posted_on("2024-02-30") is None and posted_on("20240309") is None and posted_on(None) is None
+    assert to_cents(12.345) == 1235 and to_cents(0.125) == 13 and to_cents(-0.125) == -13 and to_cents(0.1 + 0.2) == 30
+    print("Typed values: SUCCESS")
+
+def test_migrates_legacy_database(tmp_path):
+    # Not db_engine: the database must start with the old table, not the current schema
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    legacy = [("2024-01-05", 10.1), ("2024-02-30", 0.125), ("not a date", -7.005), (None, 3.0), ("2024-01-31T23:59", 19.99),
+              ("2024-03-01", None)]
+    with engine.begin() as connection:
+        connection.execute(text(LEGACY_SCHEMA))
+        connection.execute(text("CREATE INDEX ix_transactions_merchant_date_id ON transactions (lower(merchant), date, id)"))
+        for date, amount in legacy:
+            connection.execute(text("INSERT INTO transactions (date, amount, merchant, type)"
+                                    " VALUES (:d, :a, 'CAFÉ', 'expense')"), {"d": date, "a": amount})
+    migrate(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("transactions")}
+    assert {"posted_on", "amount_cents", "merchant_key"} <= columns
+    db = sessionmaker(bind=engine)()
+    # The backfill agrees with what the writers store
+    for t in db.query(models.Transaction).order_by(models.Transaction.id):
+        assert (t.posted_on, t.amount_cents) == (posted_on(t.date), to_cents(t.amount)), (t.date, t.amount)
+        assert t.merchant_key == "café"
+    names = set(db.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    assert {"ix_transactions_summary", "ix_transactions_merchant_key_date_id"} <= names
+    assert "ix_transactions_merchant_date_id" not in names
+    db.close()
+    assert schema_version(engine) == len(DATA_MIGRATIONS)
+
+    # Later starts don't rescan, not even for dates the backfill couldn't parse
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE transactions SET posted_on = NULL WHERE date = '2024-03-01'"))
+    migrate(engine)  # Idempotent
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM transactions WHERE posted_on IS NULL")).scalar() == 4
+    engine.dispose()
+    print("Legacy migration: SUCCESS")
+
+def test_summaries_match_frame(db_sessions):
+    transactions = synthetic_transactions(3000)
+    db = db_sessions()
+    db.execute(models.Transaction.__table__.insert(), [with_typed_columns(t) for t in transactions])
+    db.commit()
+
+    frame = TransactionFrame(transactions)
+    monthly = summarize(db, "month")
+    expected = frame.monthly()
+    assert [m["month"] for m in monthly] == [m["month"] for m in expected]
+    for got, want in zip(monthly, expected):
+        assert abs(got["income"] - want["income"]) < 0.005 and abs(got["expense"] - want["expense"]) < 0.005
+
+    categories = summarize(db, "category", type="expense")
+    want = frame.category_totals(EXPENSE)
+    assert {c["category"]: c["total"] for c in categories}.keys() == want.keys()
+    assert all(abs(c["total"] - want[c["category"]]) < 0.005 for c in categories)
+    assert [c["total"] for c in categories] == sorted((c["total"] for c in categories), reverse=True)
+
+    by_type = {t["type"]: t for t in summarize(db, "type", date_from="2021-01-01", date_to="2021-12-31")}
+    in_2021 = [t for t in transactions if "2021-01-01" <= t["date"] <= "2021-12-31"]
+    assert sum(t["count"] for t in by_type.values()) == len(in_2021)
+    assert by_type["income"]["total"] == sum(to_cents(t["amount"]) for t in in_2021 if t["type"] == "income") / 100
+
+    # Answered from the covering index alone
+    plan = db.execute(text("EXPLAIN QUERY PLAN SELECT strftime('%Y-%m', posted_on), sum(amount_cents) "
+                           "FROM transactions WHERE posted_on >= '2021-01-01' GROUP BY 1")).fetchall()
+    assert "COVERING INDEX ix_transactions_summary" in " ".join(row[-1] for row in plan)
+    db.close()
+    print("Summaries: SUCCESS")
+
+def test_endpoint(api_client):
+    payload = [
+        {"date": "2024-01-03", "merchant": "Cafe", "amount": 0.1, "type": "expense", "category": "Dining", "description": ""},
+        {"date": "2024-01-04", "merchant": "Cafe", "amount": 0.2, "type": "expense", "category": "Dining", "description": ""},
+        {"date": "2024-02-01", "merchant": "Employer", "amount": 2500, "type": "income", "category": "Income", "description": ""},
+    ]
+    created = api_client.post("/transactions", json=payload).json()
+    assert created[0]["posted_on"] == "2024-01-03" and created[0]["amount_cents"] == 10
+    assert api_client.get("/transactions/summary/month").json() == [
+        {"month": "2024-02", "income": 2500.0, "expense": 0.0, "count": 1},
+        {"month": "2024-01", "income": 0.0, "expense": 0.3, "count": 2},
+    ]
+    assert api_client.get("/transactions/summary/category", params={"type": "expense"}).json() == [
+        {"category": "Dining", "total": 0.3, "count": 2},
+    ]
+    assert api_client.get("/transactions/summary/type", params={"date_from": "2024-13-01"}).status_code == 400
+    assert api_client.get("/transactions/summary/merchant").status_code == 422
+    print("Endpoint: SUCCESS")
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,100 @@
+import tempfile
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from sqlalchemy.orm import Session
+
+import models
+import services.llm_service as llm_service
+from services.context_selector import ContextSelector
+from services.vector_store import StatementVectorStore, statement_store
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+JANUARY = [f"01/{day:02d}/2024 GROCERY STORE #{day} {day * 3}.50" for day in range(1, 29)]
+FEBRUARY = [f"02/{day:02d}/2024 COFFEE SHOP #{day} {day}.25" for day in range(1, 29)]
+
+def test_incremental_persistent_ingest():
+    directory = tempfile.mkdtemp()
+    embedding = CountingEmbedding(size=16)
+    store = StatementVectorStore(persist_directory=directory, collection_name="test", embedding=embedding)
+
+    first = store.ingest(JANUARY, "sk-test", upload_id="jan")
+    assert first["added"] == first["chunks"] > 1 and first["skipped"] == 0
+    assert (first["date_from"], first["date_to"]) == (20240101, 20240128)
+    embedded = embedding.embedded
+
+    # Re-upload: nothing new to embed
+    again = store.ingest(JANUARY, "sk-test", upload_id="jan-again")
+    assert again["added"] == 0 and again["skipped"] == first["chunks"]
+    assert embedding.embedded == embedded
+
+    store.ingest(FEBRUARY, "sk-test", upload_id="feb")
+
+    # A new process sees both uploads and can filter by upload or date range
+    reopened = StatementVectorStore(persist_directory=directory, collection_name="test", embedding=embedding)
+    assert all("COFFEE" in text for text in reopened.search("coffee", "sk-test", k=3, upload_id="feb"))
+    assert all("GROCERY" in text for text in reopened.search("coffee", "sk-test", k=3, date_to=20240131))
+    assert all("COFFEE" in text for text in reopened.search("coffee", "sk-test", k=3, date_from=20240201))
+
+    # Uploads find every chunk they contained, including ones an earlier upload stored
+    assert reopened.search("grocery", "sk-test", k=3, upload_id="jan-again")
+    overlap = reopened.ingest(JANUARY[:10] + FEBRUARY[:10], "sk-test", upload_id="mixed")
+    found = reopened.search("store", "sk-test", k=50, upload_id="mixed")
+    assert overlap["added"] < overlap["chunks"] and len(found) == overlap["chunks"]
+    assert all("GROCERY" in text for text in reopened.search("grocery", "sk-test", k=50, upload_id="jan"))
+
+    # Reused chunks keep the metadata they were stored with; membership lives in its own table
+    stored = reopened._get_store("sk-test").get(include=["metadatas"])
+    assert all(set(m) <= {"upload_id", "chunk_id", "date_from", "date_to"} for m in stored["metadatas"])
+    assert len(reopened.upload_chunks("mixed")) == overlap["chunks"]
+
+    # Clearing removes the stored text; the store starts empty afterwards
+    assert reopened.clear() == 1
+    assert reopened.search("coffee", "sk-test", k=3) == []
+    assert reopened.upload_chunks("feb") == []
+    assert reopened.ingest(FEBRUARY, "sk-test", upload_id="feb")["added"] > 0
+    print("Vector store: SUCCESS")
+
+def test_chat_retrieval_filters_on_the_month_asked_about(monkeypatch):
+    store = StatementVectorStore(persist_directory=tempfile.mkdtemp(), collection_name="test",
+                                 embedding=CountingEmbedding(size=16))
+    store.ingest(JANUARY, "sk-test", upload_id="jan")
+    store.ingest(FEBRUARY, "sk-test", upload_id="feb")
+    monkeypatch.setattr(llm_service, "statement_store", store)
+
+    assert ContextSelector.date_range("coffee in February 2024?") == (20240201, 20240229)
+    assert ContextSelector.date_range("coffee in February?") is None
+    february = llm_service._retrieve_context("what did I buy in February 2024?", "sk-test")
+    assert "COFFEE" in february and "GROCERY" not in february
+    # Nothing stored for the period: falls back to unfiltered retrieval
+    assert llm_service._retrieve_context("what did I buy in March 2023?", "sk-test")
+    print("Date-filtered retrieval: SUCCESS")
+
+def test_clear_data_commits_before_clearing_the_store(db_sessions, api_client, monkeypatch):
+    cleared = []
+    monkeypatch.setattr(statement_store, "clear", lambda: cleared.append(True))
+    db = db_sessions()
+    db.add(models.Transaction(date="2024-01-02", merchant="CAFE", amount=3.0, type="expense"))
+    db.commit()
+
+    # A failed commit leaves both the rows and the stored statement text
+    def failing_commit(self):
+        raise RuntimeError("database is locked")
+    with monkeypatch.context() as patch:
+        patch.setattr(Session, "commit", failing_commit)
+        assert api_client.delete("/transactions").status_code == 500
+    assert cleared == [] and db.query(models.Transaction).count() == 1
+
+    assert api_client.delete("/transactions").status_code == 200
+    assert cleared == [True] and db.query(models.Transaction).count() == 0
+    db.close()
+    print("Clear data: SUCCESS")
+
+if __name__ == "__main__":
+    pytest.main([__file__])
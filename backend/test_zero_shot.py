@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from services.zero_shot import (
+    BiEncoderEngine, CrossEncoderEngine, HYPOTHESIS_TEMPLATE, OnnxCrossEncoderEngine, create_engine, is_available,
+)
+
+CATEGORIES = ["Dining", "Groceries", "Transportation", "Miscellaneous"]
+TEXTS = ["dining out downtown", "weekly groceries run", "transportation pass", "nothing to see"]
+
+def entailment(text, hypothesis):
+    """Fake NLI score: the hypothesis' category appears in the text."""
+    category = hypothesis[len(HYPOTHESIS_TEMPLATE.format("")) - 1:-1]
+    return 1.0 if category.lower() in text else 0.0
+
+class FakeCrossEncoder:
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        # (contradiction, entailment, neutral) logits per pair
+        return np.array([[0.5, entailment(text, hypothesis), 0.2] for text, hypothesis in pairs])
+
+class FakeSentenceModel:
+    def encode(self, texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False):
+        # One dimension per category, plus one so no vector is zero
+        vectors = np.array([[float(c.lower() in t.lower()) for c in CATEGORIES] + [0.1] for t in texts])
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+class FakeTokenizer:
+    """Encodes pair i as ids [i, i, ...] of varying length, so batches need sorting and padding."""
+
+    def __call__(self, firsts, seconds, truncation=True):
+        self.pairs = list(zip(firsts, seconds))
+        ids = [[i] * (1 + (7 * i) % 5) for i in range(len(firsts))]
+        return {"input_ids": ids, "attention_mask": [[1] * len(row) for row in ids]}
+
+    def pad(self, features, return_tensors="np"):
+        width = max(len(row) for row in features["input_ids"])
+        return {name: np.array([row + [0] * (width - len(row)) for row in rows]) for name, rows in features.items()}
+
+class FakeSession:
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def run(self, outputs, feeds):
+        pairs = [self.tokenizer.pairs[i] for i in feeds["input_ids"][:, 0]]
+        return [np.array([[0.5, entailment(text, hypothesis), 0.2] for text, hypothesis in pairs], dtype=np.float32)]
+
+def loaded(engine_class, **attributes):
+    engine = engine_class(CATEGORIES)
+    for name, value in attributes.items():
+        setattr(engine, name, value)
+    return engine
+
+def test_engine_selection(monkeypatch):
+    monkeypatch.delenv("ZERO_SHOT_ENGINE", raising=False)
+    monkeypatch.delenv("ZERO_SHOT_MODEL", raising=False)
+    assert type(create_engine(CATEGORIES)) is CrossEncoderEngine
+    assert type(create_engine(CATEGORIES, engine="bi-encoder")) is BiEncoderEngine
+
+    monkeypatch.setenv("ZERO_SHOT_ENGINE", "bi-encoder")
+    monkeypatch.setenv("ZERO_SHOT_MODEL", "my/model")
+    engine = create_engine(CATEGORIES)
+    assert type(engine) is BiEncoderEngine and engine.model_name == "my/model" and engine.model is None
+    # An explicit engine beats the environment
+    assert type(create_engine(CATEGORIES, engine="cross-encoder")) is CrossEncoderEngine
+
+    with pytest.raises(ValueError, match="Unknown zero-shot engine 'gpt'"):
+        create_engine(CATEGORIES, engine="gpt")
+    print("Engine selection: SUCCESS")
+
+def test_missing_packages_fall_back_to_cross_encoder(monkeypatch):
+    monkeypatch.setattr(BiEncoderEngine, "requires", ("package_that_is_not_installed",))
+    engine = create_engine(CATEGORIES, engine="bi-encoder", model_name="sentence-transformers/some-model")
+    # A bi-encoder model can't run as a cross-encoder: the default model is used
+    assert type(engine) is CrossEncoderEngine and engine.model_name == CrossEncoderEngine.default_model
+
+    monkeypatch.setattr(OnnxCrossEncoderEngine, "requires", ("package_that_is_not_installed",))
+    engine = create_engine(CATEGORIES, engine="onnx", model_name="cross-encoder/other-nli")
+    assert type(engine) is CrossEncoderEngine and engine.model_name == "cross-encoder/other-nli"
+    print("Engine fallback: SUCCESS")
+
+def test_bi_encoder_label_contract():
+    cross = loaded(CrossEncoderEngine, model=FakeCrossEncoder()).predict(TEXTS)
+    bi_engine = BiEncoderEngine(CATEGORIES)
+    bi_engine.model = FakeSentenceModel()
+    bi_engine.category_embeddings = bi_engine.model.encode([HYPOTHESIS_TEMPLATE.format(c) for c in CATEGORIES])
+    bi = bi_engine.predict(TEXTS)
+
+    # One category per text, in input order, drawn from the configured categories
+    assert cross == ["Dining", "Groceries", "Transportation", "Dining"]
+    assert bi == cross
+    print("Bi-encoder labels: SUCCESS")
+
+@pytest.mark.skipif(not is_available(OnnxCrossEncoderEngine), reason="onnxruntime is not installed")
+def test_onnx_engine_selection(monkeypatch, tmp_path):
+    monkeypatch.setenv("ZERO_SHOT_ENGINE", "onnx")
+    monkeypatch.setenv("ONNX_MODEL_DIR", str(tmp_path))
+    monkeypatch.setenv("ONNX_INTRA_OP_THREADS", "2")
+    engine = create_engine(CATEGORIES)
+    assert type(engine) is OnnxCrossEncoderEngine and engine.model is None
+    # Same model as the default engine, exported under ONNX_MODEL_DIR
+    assert engine.model_name == CrossEncoderEngine.default_model and engine.intra_op_threads == 2
+    assert engine.model_dir == str(tmp_path / CrossEncoderEngine.default_model.replace("/", "__"))
+    print("ONNX engine selection: SUCCESS")
+
+def test_onnx_label_contract():
+    tokenizer = FakeTokenizer()
+    onnx = loaded(OnnxCrossEncoderEngine, tokenizer=tokenizer, model=FakeSession(tokenizer),
+                  _input_names=["input_ids", "attention_mask"], batch_size=3)
+    # Pairs are run sorted by length in batches of 3; the labels still line up with the inputs
+    assert onnx.predict(TEXTS) == loaded(CrossEncoderEngine, model=FakeCrossEncoder()).predict(TEXTS)
+    print("ONNX labels: SUCCESS")
+
+def cached_model(name: str) -> bool:
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return False
+    return isinstance(try_to_load_from_cache(name, "config.json"), str)
+
+@pytest.mark.skipif(not is_available(OnnxCrossEncoderEngine), reason="onnxruntime is not installed")
+@pytest.mark.skipif(not cached_model(CrossEncoderEngine.default_model), reason="CrossEncoder model not downloaded")
+def test_onnx_matches_default_engine(tmp_path, monkeypatch):
+    monkeypatch.setenv("ONNX_MODEL_DIR", str(tmp_path))
+    descriptions = ["STARBUCKS STORE 0411", "SHELL OIL 5742", "WHOLE FOODS MARKET", "DELTA AIR 0062",
+                    "NETFLIX.COM", "ACME CORP PAYROLL", "CITY WATER BILL", "AMAZON MKTP US"]
+    cross, onnx = CrossEncoderEngine(CATEGORIES), OnnxCrossEncoderEngine(CATEGORIES)
+    cross.load()
+    onnx.load()
+    agree = sum(a == b for a, b in zip(cross.predict(descriptions), onnx.predict(descriptions)))
+    # int8 weights may flip a near-tie, not the bulk of the labels
+    assert agree >= len(descriptions) - 1
+    print(f"ONNX parity: {agree}/{len(descriptions)}")
+
+if __name__ == "__main__":
+    pytest.main([__file__])